@@ -12,7 +12,15 @@ const PROJECTS  = path.join(ROOT, 'projects')
 const CFG_FILE  = path.join(ROOT, 'api_config.json')
 
 let win = null
-let activeChild = null  // track active pipeline process
+
+// Pipeline jalan sebagai satu proses Python persistent (run.py --daemon).
+// Import modul + load model Whisper cuma sekali, job berikutnya langsung jalan.
+let worker      = null   // child process daemon
+let pyCmd       = null   // perintah Python, dideteksi sekali saja
+let activeJob   = null   // job_id run yang sedang tampil di UI
+let eventTarget = null   // webContents penerima pipeline-event
+let rpcSeq      = 0
+const rpcPending = new Map()
 
 // ── Window ────────────────────────────────────────────────────────────────────
 function createWindow() {
@@ -111,26 +119,28 @@ ipcMain.handle('delete-project', (_, id) => {
 })
 
 // ── Pipeline ──────────────────────────────────────────────────────────────────
-ipcMain.on('stop-pipeline', () => {
-  if (activeChild) { activeChild.kill(); activeChild = null }
-})
-
-ipcMain.on('run-pipeline', (event, cfg) => {
-  // Kill previous run jika masih jalan
-  if (activeChild) { activeChild.kill(); activeChild = null }
-
-  // Cari Python yang tersedia di PATH
+function detectPython() {
+  if (pyCmd) return pyCmd
   const candidates = process.platform === 'win32'
     ? ['python', 'python3', 'py']
     : ['python3', 'python']
 
-  let pyCmd = 'python'
+  pyCmd = 'python'
   for (const cmd of candidates) {
     try { execSync(`${cmd} --version`, { stdio: 'ignore' }); pyCmd = cmd; break }
     catch {}
   }
+  return pyCmd
+}
 
-  activeChild = spawn(pyCmd, [PY_RUNNER], {
+function sendEvent(data) {
+  if (eventTarget && !eventTarget.isDestroyed()) eventTarget.send('pipeline-event', data)
+}
+
+function getWorker() {
+  if (worker) return worker
+
+  const child = spawn(detectPython(), [PY_RUNNER, '--daemon'], {
     cwd: path.join(ROOT, 'pipeline'),
     stdio: ['pipe', 'pipe', 'pipe'],
     env: {
@@ -139,42 +149,87 @@ ipcMain.on('run-pipeline', (event, cfg) => {
       PYTHONUTF8: '1',             // Python 3.7+ UTF-8 mode
     },
   })
+  worker = child
 
-  // Kirim config ke Python via stdin (satu baris JSON)
-  activeChild.stdin.write(JSON.stringify(cfg) + '\n')
-  activeChild.stdin.end()
-
-  // Stream stdout JSON lines ke renderer
+  // stdout: JSON lines — balasan RPC (ada "id") atau event pipeline (ada "event")
   let buf = ''
-  activeChild.stdout.on('data', chunk => {
+  child.stdout.on('data', chunk => {
     buf += chunk.toString()
     const lines = buf.split('\n')
     buf = lines.pop()
     for (const line of lines) {
       if (!line.trim()) continue
-      try {
-        event.sender.send('pipeline-event', JSON.parse(line))
-      } catch {}
+      let msg
+      try { msg = JSON.parse(line) } catch { continue }
+
+      if (msg.event) {
+        // Event dari job lama (sudah di-stop / diganti) tidak diteruskan ke UI
+        if (msg.job_id && msg.job_id !== activeJob) continue
+        if (msg.event === 'job_end') { activeJob = null; continue }
+        sendEvent(msg)
+      } else if (msg.id != null && rpcPending.has(msg.id)) {
+        const cb = rpcPending.get(msg.id)
+        rpcPending.delete(msg.id)
+        cb(msg)
+      }
     }
   })
 
-  activeChild.stderr.on('data', chunk => {
+  child.stderr.on('data', chunk => {
     const txt = chunk.toString().trim()
-    if (txt) event.sender.send('pipeline-event', { event: 'log', msg: txt, level: 'warn' })
+    if (txt && activeJob) sendEvent({ event: 'log', msg: txt, level: 'warn' })
   })
 
-  activeChild.on('exit', code => {
-    if (code !== 0) event.sender.send('pipeline-event', {
-      event: 'error', msg: `Pipeline berhenti (kode: ${code})`
-    })
+  child.on('exit', code => {
+    if (worker === child) worker = null
+    rpcPending.clear()
+    if (activeJob) {
+      activeJob = null
+      sendEvent({ event: 'error', msg: `Pipeline berhenti (kode: ${code})` })
+    }
   })
 
-  activeChild.on('error', err => {
-    event.sender.send('pipeline-event', {
+  child.on('error', err => {
+    if (worker === child) worker = null
+    activeJob = null
+    sendEvent({
       event: 'error',
       msg: `Tidak bisa jalankan Python: ${err.message}\nPastikan Python ada di PATH.`
     })
   })
+
+  return child
+}
+
+function rpc(method, params, cb) {
+  const id = ++rpcSeq
+  if (cb) rpcPending.set(id, cb)
+  getWorker().stdin.write(JSON.stringify({ jsonrpc: '2.0', id, method, params }) + '\n')
+}
+
+function cancelActive() {
+  if (activeJob) { rpc('cancel', { job_id: activeJob }); activeJob = null }
+}
+
+ipcMain.on('stop-pipeline', () => cancelActive())
+
+ipcMain.on('run-pipeline', (event, cfg) => {
+  // Batalkan run sebelumnya jika masih jalan (worker-nya tetap hidup)
+  cancelActive()
+  eventTarget = event.sender
+
+  const method = cfg && cfg.resume_project_id ? 'resume' : 'run'
+  const params = method === 'resume'
+    ? { ...cfg, project_id: cfg.resume_project_id }
+    : cfg
+  rpc(method, params, res => {
+    if (res.error) sendEvent({ event: 'error', msg: res.error.message })
+    else activeJob = res.result.job_id
+  })
+})
+
+app.on('before-quit', () => {
+  if (worker) worker.stdin.end()   // EOF → daemon cancel job & keluar sendiri
 })
 
 // ── Ads ──────────────────────────────────────────────────────────────────────
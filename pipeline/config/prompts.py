@@ -152,3 +152,46 @@ DEFAULT_HASHTAGS = {
     "quran_hadith": ["#quran", "#hadits", "#dakwah", "#tafsir", "#belajarislam"],
     "beginner":     ["#islamforbeginners", "#belajarislam", "#dakwah", "#islamitu", "#pemula"],
 }
+
+# ─── Kata Kunci per Kategori (pre-ranker lokal, core/preranker.py) ───────────
+# Dicocokkan sebagai substring huruf kecil. Bobot per kategori ada di
+# preranker; yang di sini cukup daftar frasa yang khas untuk tiap kriteria
+# di DAKWAH_ANALYSIS_PROMPT.
+
+CATEGORY_KEYWORDS = {
+    "knowledge": [
+        "hukumnya", "wajib", "sunnah", "haram", "makruh", "mubah", "syarat",
+        "rukun", "batal", "dalilnya", "para ulama", "menurut", "pendapat",
+        "madzhab", "fiqih", "artinya", "maksudnya", "pelajaran",
+    ],
+    "viral_quote": [
+        "ingat", "jangan pernah", "kalau kamu", "kalau antum", "orang yang",
+        "sebaik-baik", "seburuk-buruk", "bukan karena", "justru", "rahasianya",
+        "kuncinya", "hidup ini", "dunia ini",
+    ],
+    "emotional": [
+        "kematian", "meninggal", "kubur", "akhirat", "neraka", "surga",
+        "taubat", "menangis", "air mata", "ibu", "orang tua", "ujian",
+        "musibah", "ampunan", "dosa", "sakaratul",
+    ],
+    "quran_hadith": [
+        "allah berfirman", "firman allah", "dalam surat", "surat al", "ayat",
+        "rasulullah bersabda", "nabi bersabda", "sabda nabi", "hadits",
+        "hadis", "diriwayatkan", "riwayat", "shahih", "bukhari", "muslim",
+        "shallallahu", "tafsir",
+    ],
+    "beginner": [
+        "apa itu", "apa sih", "bagaimana cara", "gimana caranya", "kenapa",
+        "mengapa", "pertanyaannya", "ada yang bertanya", "bolehkah", "bolehkah kita",
+        "bagi yang baru", "sederhananya", "contohnya",
+    ],
+}
+
+# Frasa pertanyaan (hook) dan frasa yang sebaiknya tidak jadi klip
+QUESTION_CUES = ["?", "apa ", "kenapa", "mengapa", "bagaimana", "gimana", "bolehkah", "pernahkah"]
+
+AVOID_CUES = [
+    "assalamualaikum", "assalamu'alaikum", "terima kasih", "terimakasih",
+    "hadirin", "panitia", "pengumuman", "infaq", "mari kita tutup",
+    "wassalamualaikum", "subhanakallahumma", "doa penutup", "sholawat",
+]
@@ -50,6 +50,9 @@ class GeminiConfig:
 class GroqConfig:
     api_key: str             = ""
     model: str               = "llama-3.3-70b-versatile"
+    stream_window: int       = 600       # detik audio per window analisis selagi Whisper jalan, 0 = off
+    api_keys: list           = field(default_factory=list)   # key cadangan, dirotasi saat rate limit
+    max_concurrency: int     = 8         # request Groq bersamaan (semua job)
 
 @dataclass
 class WhisperConfig:
@@ -57,6 +60,16 @@ class WhisperConfig:
     language: str            = "id"      # id=Indonesia, auto=detect otomatis
     device: str              = "cpu"     # cpu (GPU tidak diperlukan)
     compute_type: str        = "int8"    # int8 = lebih cepat di CPU
+    workers: int             = 1         # >1 = transkripsi paralel per potongan audio, 0 = otomatis
+    cpu_threads: int         = 0         # thread per model Whisper, 0 = core / workers
+    draft_model: str         = ""        # tiny/base = pass cepat dulu, model_size hanya untuk bagian yang perlu
+    refine_scope: str        = "confidence"   # confidence = segmen ragu | clips = rentang klip terpilih
+    refine_logprob: float    = -1.0      # avg_logprob segmen di bawah ini → transkripsi ulang (tiny/base jarang di atas -0.6)
+    refine_word_prob: float  = 0.5       # ... atau ≥ 25% kata dengan probability di bawah ini
+    clip_words: bool         = False     # True = pass pertama tanpa word timestamps, kata hanya di rentang klip
+    batch_size: int          = 0         # >0 = BatchedInferencePipeline (potongan VAD di-batch)
+    use_tuned: bool          = True      # pakai hasil `run.py --calibrate` untuk host ini
+    tuned: dict              = field(default_factory=dict)   # model_size → setting tercepat hasil kalibrasi
 
 @dataclass
 class ClipConfig:
@@ -65,6 +78,13 @@ class ClipConfig:
     num_clips: int           = 5
     overlap_tolerance: float = 2.0
 
+@dataclass
+class PrerankConfig:
+    enabled: bool            = True      # seleksi kandidat lokal sebelum Groq (butuh numpy)
+    top_k: int               = 0         # kandidat dikirim ke Groq, 0 = num_clips x 3
+    context_sec: float       = 15.0      # konteks transkrip di kiri-kanan tiap kandidat
+    offline_fallback: bool   = True      # Groq gagal → pakai ranking lokal
+
 @dataclass
 class FaceConfig:
     model: str                   = "mediapipe"
@@ -100,6 +120,33 @@ class SubtitleConfig:
     shadow_color: str        = "&H00000000&"
     remove_punctuation: bool = True
 
+@dataclass
+class RenderConfig:
+    mode: str                = "staged"  # staged = cut→crop→subtitle | fused = 1x encode per klip
+    schedule: str            = "stage"   # stage = semua klip per tahap | clip = tiap klip langsung sampai final
+    loudnorm: bool           = True      # normalisasi loudness (hanya mode fused)
+    workers: int             = 0         # klip dirender bersamaan, 0 = otomatis (core / 4)
+    threads: int             = 0         # -threads FFmpeg per job, 0 = core / workers
+
+@dataclass
+class CacheConfig:
+    enabled: bool            = True
+    dir: str                 = ""        # kosong = ~/.cache/mahiraclipper/stages
+    max_size_gb: float       = 20.0      # lewat batas → LRU eviction
+    llm: bool                = True      # cache respons Groq/Gemini (False = selalu request baru)
+    llm_ttl_days: float      = 30.0      # respons lebih tua dari ini dianggap basi
+    llm_max_size_mb: float   = 200.0
+    transcripts: bool        = True      # store transkrip global per fingerprint audio
+    transcripts_max_size_mb: float = 2048.0
+
+@dataclass
+class QueueConfig:
+    max_active: int          = 4         # job batch yang jalan bersamaan
+    download: int            = 2         # slot per resource (lihat core/job_queue.py)
+    whisper: int             = 1
+    groq: int                = 1
+    ffmpeg: int              = 1
+
 @dataclass
 class UploadConfig:
     tiktok_enabled: bool             = False
@@ -114,8 +161,12 @@ class AppConfig:
     groq:     GroqConfig     = field(default_factory=GroqConfig)
     whisper:  WhisperConfig  = field(default_factory=WhisperConfig)
     clip:     ClipConfig     = field(default_factory=ClipConfig)
+    prerank:  PrerankConfig  = field(default_factory=PrerankConfig)
     face:     FaceConfig     = field(default_factory=FaceConfig)
     subtitle: SubtitleConfig = field(default_factory=SubtitleConfig)
+    render:   RenderConfig   = field(default_factory=RenderConfig)
+    cache:    CacheConfig    = field(default_factory=CacheConfig)
+    queue:    QueueConfig    = field(default_factory=QueueConfig)
     upload:   UploadConfig   = field(default_factory=UploadConfig)
     video_quality: str       = "best"
     translate_target: Optional[str] = None
@@ -153,6 +204,41 @@ def save_config(cfg: AppConfig, path: Optional[Path] = None):
         log.error("Gagal simpan config: %s", e)
 
 
+def update_config_file(patch: dict, path: Optional[Path] = None):
+    """
+    Gabungkan `patch` (nested dict) ke file config tanpa menulis ulang nilai
+    lain — save_config() akan ikut menyimpan override dari environment.
+    File yang ada tapi tidak bisa dibaca tidak ditimpa (API key di dalamnya
+    bisa hilang) → RuntimeError. Tulis atomic: file .tmp lalu rename.
+    """
+    target = Path(path or CONFIG_FILE)
+    data = {}
+    if target.exists():
+        try:
+            with open(target, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            raise RuntimeError(f"Config {target.name} tidak bisa dibaca ({e}) — tidak ditimpa, perbaiki dulu.")
+        if not isinstance(data, dict):
+            raise RuntimeError(f"Config {target.name} bukan objek JSON — tidak ditimpa, perbaiki dulu.")
+
+    def merge(dst: dict, src: dict):
+        for k, v in src.items():
+            if isinstance(v, dict) and isinstance(dst.get(k), dict):
+                merge(dst[k], v)
+            else:
+                dst[k] = v
+
+    merge(data, patch)
+    tmp = target.with_name(target.name + ".tmp")
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4, ensure_ascii=True)
+        os.replace(tmp, target)
+    except IOError as e:
+        log.error("Gagal simpan config: %s", e)
+
+
 def _apply_json(cfg: AppConfig, data: dict):
     g = data.get("gemini", {})
     if g.get("api_key"):    cfg.gemini.api_key = g["api_key"]
@@ -163,6 +249,12 @@ def _apply_json(cfg: AppConfig, data: dict):
     if c.get("max_duration"): cfg.clip.max_duration = int(c["max_duration"])
     if c.get("num_clips"):    cfg.clip.num_clips    = int(c["num_clips"])
 
+    pr = data.get("prerank", {})
+    if "enabled" in pr:          cfg.prerank.enabled          = bool(pr["enabled"])
+    if "top_k" in pr:            cfg.prerank.top_k            = int(pr["top_k"])
+    if "context_sec" in pr:      cfg.prerank.context_sec      = float(pr["context_sec"])
+    if "offline_fallback" in pr: cfg.prerank.offline_fallback = bool(pr["offline_fallback"])
+
     f = data.get("face", {})
     if f.get("model"):        cfg.face.model        = f["model"]
     if f.get("mode"):         cfg.face.mode         = f["mode"]
@@ -175,10 +267,48 @@ def _apply_json(cfg: AppConfig, data: dict):
     gr = data.get("groq", {})
     if gr.get("api_key"):  cfg.groq.api_key = gr["api_key"]
     if gr.get("model"):    cfg.groq.model   = gr["model"]
+    if "stream_window" in gr: cfg.groq.stream_window = int(gr["stream_window"])
+    if gr.get("api_keys"):
+        keys = gr["api_keys"]
+        cfg.groq.api_keys = keys.split(",") if isinstance(keys, str) else list(keys)
+    if gr.get("max_concurrency"): cfg.groq.max_concurrency = int(gr["max_concurrency"])
 
     wh = data.get("whisper", {})
     if wh.get("model_size"):  cfg.whisper.model_size  = wh["model_size"]
     if wh.get("language"):    cfg.whisper.language    = wh["language"]
+    if "workers" in wh:       cfg.whisper.workers     = int(wh["workers"])
+    if "cpu_threads" in wh:   cfg.whisper.cpu_threads = int(wh["cpu_threads"])
+    if "draft_model" in wh:   cfg.whisper.draft_model = wh["draft_model"] or ""
+    if wh.get("refine_scope"):        cfg.whisper.refine_scope     = wh["refine_scope"]
+    if "refine_logprob" in wh:        cfg.whisper.refine_logprob   = float(wh["refine_logprob"])
+    if "refine_word_prob" in wh:      cfg.whisper.refine_word_prob = float(wh["refine_word_prob"])
+    if "clip_words" in wh:            cfg.whisper.clip_words       = bool(wh["clip_words"])
+    if wh.get("compute_type"):        cfg.whisper.compute_type     = wh["compute_type"]
+    if "batch_size" in wh:            cfg.whisper.batch_size       = int(wh["batch_size"])
+    if "use_tuned" in wh:             cfg.whisper.use_tuned        = bool(wh["use_tuned"])
+    if isinstance(wh.get("tuned"), dict): cfg.whisper.tuned        = wh["tuned"]
+
+    r = data.get("render", {})
+    if r.get("mode"):         cfg.render.mode     = r["mode"]
+    if r.get("schedule"):     cfg.render.schedule = r["schedule"]
+    if "loudnorm" in r:       cfg.render.loudnorm = bool(r["loudnorm"])
+    if "workers" in r:        cfg.render.workers  = int(r["workers"])
+    if "threads" in r:        cfg.render.threads  = int(r["threads"])
+
+    ca = data.get("cache", {})
+    if "enabled" in ca:       cfg.cache.enabled     = bool(ca["enabled"])
+    if ca.get("dir"):         cfg.cache.dir         = ca["dir"]
+    if ca.get("max_size_gb"): cfg.cache.max_size_gb = float(ca["max_size_gb"])
+    if "llm" in ca:           cfg.cache.llm         = bool(ca["llm"])
+    if ca.get("llm_ttl_days"):    cfg.cache.llm_ttl_days    = float(ca["llm_ttl_days"])
+    if ca.get("llm_max_size_mb"): cfg.cache.llm_max_size_mb = float(ca["llm_max_size_mb"])
+    if "transcripts" in ca:       cfg.cache.transcripts     = bool(ca["transcripts"])
+    if ca.get("transcripts_max_size_mb"):
+        cfg.cache.transcripts_max_size_mb = float(ca["transcripts_max_size_mb"])
+
+    q = data.get("queue", {})
+    for key in ("max_active", "download", "whisper", "groq", "ffmpeg"):
+        if q.get(key): setattr(cfg.queue, key, int(q[key]))
 
     u = data.get("upload", {})
     if u.get("tiktok_session_id"):
@@ -196,5 +326,10 @@ def _apply_env(cfg: AppConfig):
         cfg.subtitle.auto_select = False
     if os.getenv("MAHIRA_GROQ_KEY"):    cfg.groq.api_key       = os.environ["MAHIRA_GROQ_KEY"]
     if os.getenv("MAHIRA_WHISPER_MODEL"): cfg.whisper.model_size = os.environ["MAHIRA_WHISPER_MODEL"]
+    if os.getenv("MAHIRA_RENDER_MODE"):   cfg.render.mode       = os.environ["MAHIRA_RENDER_MODE"]
+    if os.getenv("MAHIRA_CACHE", "").lower() in ("0","false","no"):
+        cfg.cache.enabled = False
+    if os.getenv("MAHIRA_LLM_CACHE", "").lower() in ("0","false","no"):
+        cfg.cache.llm = False
     if os.getenv("MAHIRA_VERBOSE", "").lower() in ("1","true","yes"):
         cfg.verbose = True
@@ -7,6 +7,7 @@ from core.gemini_processor import process as gemini_process, generate_caption
 from core.cutter           import cut_clips
 from core.face_crop        import crop_all_clips, crop_to_vertical
 from core.subtitle         import process_all_clips as subtitle_all_clips, process_subtitles
+from core.render           import render_all_clips, render_clip_fused
 from core.subtitle_styles  import get_style, list_styles, recommend_styles, STYLES, STYLE_BY_CATEGORY
 from core.project          import ProjectManager, Project, ProjectStatus
 
@@ -16,6 +17,7 @@ __all__ = [
     "cut_clips",
     "crop_all_clips", "crop_to_vertical",
     "subtitle_all_clips", "process_subtitles",
+    "render_all_clips", "render_clip_fused",
     "get_style", "list_styles", "recommend_styles", "STYLES", "STYLE_BY_CATEGORY",
     "ProjectManager", "Project", "ProjectStatus",
 ]
@@ -0,0 +1,153 @@
+"""
+MahiraClipper — Audio Features
+Fitur "excitement" per detik dari PCM 16kHz mono yang sudah di-decode
+untuk Whisper (core/audio_stream) — tanpa decode ulang.
+
+PCM diproses per blok, lalu per frame 20ms dihitung RMS dan
+zero-crossing rate. Per detik disimpan 3 angka:
+  rms_db    : loudness (dBFS)
+  pitch_var : simpangan ZCR antar frame bersuara (proxy variasi nada)
+  pause     : porsi frame hening dalam detik itu
+Hasilnya array float16 (n_detik, 3) di audio_features.npy, di sebelah
+transkrip (~6 byte per detik, ±21 KB per jam).
+
+Dipakai pre-ranker (core/preranker.py) sebagai sinyal tambahan untuk
+momen emosional: suara naik, nada bervariasi, jeda sebelum penekanan.
+"""
+
+import hashlib
+from pathlib import Path
+from typing import Optional
+
+from config.settings import log
+
+SAMPLE_RATE   = 16000
+FRAMES_PER_SEC = 50                          # frame 20ms
+FRAME_LEN     = SAMPLE_RATE // FRAMES_PER_SEC
+BLOCK_SEC     = 600                          # diproses per 10 menit (batas RAM)
+SILENCE_DB    = 25.0                         # frame < median - ini → hening
+FEATURES_FILE = "audio_features.npy"
+FEATURES      = ("rms_db", "pitch_var", "pause")
+FP_SAMPLES    = 32                           # fingerprint: jumlah sampel PCM
+FP_SAMPLE_BYTES = 64 * 1024
+
+
+# ─── Ekstraksi ────────────────────────────────────────────────────────────────
+
+def extract(pcm, out_path: Optional[Path] = None):
+    """
+    Hitung fitur per detik dari PCM int16 16kHz mono. Return array
+    (n_detik, 3) float16, dan simpan ke out_path kalau diberikan.
+    """
+    import numpy as np
+
+    n_sec = len(pcm) // SAMPLE_RATE
+    if n_sec == 0:
+        return np.zeros((0, len(FEATURES)), dtype=np.float16)
+
+    frame_db  = np.empty((n_sec, FRAMES_PER_SEC), dtype=np.float32)
+    frame_zcr = np.empty((n_sec, FRAMES_PER_SEC), dtype=np.float32)
+    for a in range(0, n_sec, BLOCK_SEC):
+        b      = min(n_sec, a + BLOCK_SEC)
+        frames = pcm[a * SAMPLE_RATE:b * SAMPLE_RATE].reshape(b - a, FRAMES_PER_SEC, FRAME_LEN)
+        x      = frames.astype(np.float32) * (1.0 / 32768)
+        power  = np.einsum("ijk,ijk->ij", x, x) / FRAME_LEN
+        frame_db[a:b] = 10.0 * np.log10(power + 1e-10)
+        neg = frames < 0
+        frame_zcr[a:b] = np.count_nonzero(neg[..., 1:] != neg[..., :-1], axis=2) / FRAME_LEN
+
+    silence = frame_db < (np.median(frame_db) - SILENCE_DB)
+    voiced  = ~silence
+    n_voiced = voiced.sum(axis=1)
+
+    sec_power = np.mean(10.0 ** (frame_db / 10.0), axis=1)
+    rms_db    = 10.0 * np.log10(sec_power + 1e-10)
+
+    zcr_v     = np.where(voiced, frame_zcr, 0.0)
+    mean_zcr  = zcr_v.sum(axis=1) / np.maximum(n_voiced, 1)
+    var_zcr   = (np.where(voiced, (frame_zcr - mean_zcr[:, None]) ** 2, 0.0).sum(axis=1)
+                 / np.maximum(n_voiced, 1))
+    pitch_var = np.where(n_voiced >= 5, np.sqrt(var_zcr), 0.0)
+
+    pause = silence.mean(axis=1)
+
+    feats = np.stack([rms_db, pitch_var * 100.0, pause], axis=1).astype(np.float16)
+    if out_path:
+        np.save(out_path, feats)
+    log.info("Fitur audio: %d detik → %s", n_sec, Path(out_path).name if out_path else "memori")
+    return feats
+
+
+def load(path: Path):
+    """Baca audio_features.npy; None kalau tidak ada / numpy tidak tersedia."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        import numpy as np
+        return np.load(path)
+    except (ImportError, OSError, ValueError) as e:
+        log.debug("Gagal baca fitur audio %s: %s", path.name, e)
+        return None
+
+
+# ─── Excitement ───────────────────────────────────────────────────────────────
+
+def excitement(feats):
+    """
+    Skor excitement per detik (>= 0): loudness & variasi nada di atas
+    median ceramah (z-score), plus bonus untuk penekanan setelah jeda.
+    Detik hening = 0.
+    """
+    import numpy as np
+
+    f      = np.asarray(feats, dtype=np.float32)
+    if not len(f):
+        return np.zeros(0, dtype=np.float32)
+    voiced = f[:, 2] < 0.8
+    if voiced.sum() < 10:
+        return np.zeros(len(f), dtype=np.float32)
+
+    def z(col):
+        ref = col[voiced]
+        return (col - np.median(ref)) / (ref.std() + 1e-6)
+
+    loud  = np.clip(z(f[:, 0]), 0, 3)
+    pitch = np.clip(z(f[:, 1]), 0, 3)
+    score = 0.5 * loud + 0.5 * pitch
+    # Jeda lalu suara naik = penekanan
+    score[1:] += 0.5 * ((f[:-1, 2] > 0.5) & (loud[1:] > 1.0))
+    score[~voiced] = 0.0
+    return score
+
+
+def per_unit(units: list, per_second):
+    """Jumlah nilai per detik di rentang tiap unit (prefix sum)."""
+    import numpy as np
+
+    values = np.asarray(per_second, dtype=np.float64)
+    prefix = np.concatenate([[0.0], np.cumsum(values)])
+    n      = len(values)
+    starts = np.clip(np.array([int(u["start"]) for u in units]), 0, n)
+    ends   = np.clip(np.array([int(np.ceil(u["end"])) for u in units]), 0, n)
+    return prefix[np.maximum(ends, starts)] - prefix[starts]
+
+
+# ─── Fingerprint ──────────────────────────────────────────────────────────────
+
+def fingerprint(pcm) -> tuple:
+    """
+    (hash, durasi detik) dari isi PCM int16 — format/container video tidak
+    berpengaruh. Hash = format + panjang data + FP_SAMPLES sampel 64KB yang
+    tersebar rata (seluruh data kalau pendek), jadi cepat untuk audio berjam-jam.
+    """
+    data    = memoryview(pcm).cast("B")
+    n_bytes = len(data)
+    h = hashlib.sha256(f"pcm:{SAMPLE_RATE}:1:16:{n_bytes}".encode())
+    if n_bytes <= FP_SAMPLES * FP_SAMPLE_BYTES:
+        h.update(data)
+    else:
+        step = (n_bytes - FP_SAMPLE_BYTES) // (FP_SAMPLES - 1)
+        for i in range(FP_SAMPLES):
+            h.update(data[i * step:i * step + FP_SAMPLE_BYTES])
+    return h.hexdigest(), round(n_bytes / 2 / SAMPLE_RATE, 2)
@@ -0,0 +1,189 @@
+"""
+MahiraClipper — Audio Stream
+Decode audio video langsung ke memori, tanpa audio.wav di folder project.
+
+FFmpeg menulis PCM 16kHz mono s16le ke pipe; thread pembaca menyalinnya ke
+buffer int16 (dialokasikan sekali dari durasi ffprobe, ±115 MB per jam).
+Transcriber bisa mulai transkripsi begitu bagian awal audio tersedia —
+wait() menunggu sampai detik tertentu ter-decode, read() mengambil
+potongan sebagai float32 untuk Whisper.
+
+decode_range() untuk potongan pendek (refine rentang klip): FFmpeg seek
+langsung ke rentang itu, tanpa decode seluruh audio.
+"""
+
+import json
+import subprocess
+import threading
+from pathlib import Path
+from typing import Optional
+
+from config.settings import log
+
+SAMPLE_RATE = 16000
+READ_BYTES  = 1 << 20            # ukuran baca dari pipe FFmpeg
+
+
+def probe_duration(video_path: Path) -> float:
+    """Durasi audio (detik) dari ffprobe; 0 kalau tidak diketahui."""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "quiet", "-print_format", "json",
+             "-show_format", "-show_streams", "-select_streams", "a:0", str(video_path)],
+            capture_output=True, text=True,
+        )
+        info = json.loads(result.stdout or "{}")
+        streams = info.get("streams") or [{}]
+        return float(streams[0].get("duration") or info.get("format", {}).get("duration") or 0)
+    except Exception as e:
+        log.debug("ffprobe error: %s", e)
+        return 0.0
+
+
+def decode_range(video_path: Path, start_sec: float, end_sec: float):
+    """Satu rentang audio sebagai float32 [-1, 1] 16kHz mono (input seek FFmpeg)."""
+    import numpy as np
+
+    start_sec = max(0.0, start_sec)
+    cmd = [
+        "ffmpeg", "-nostdin", "-v", "error",
+        "-ss", f"{start_sec:.3f}", "-t", f"{max(0.0, end_sec - start_sec):.3f}",
+        "-i", str(video_path),
+        "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE),
+        "-f", "s16le", "-acodec", "pcm_s16le", "pipe:1",
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True)
+    except FileNotFoundError:
+        raise RuntimeError("FFmpeg tidak ditemukan. Install FFmpeg terlebih dahulu.")
+    if result.returncode != 0:
+        err = result.stderr.decode("utf-8", "replace")
+        raise RuntimeError(f"FFmpeg decode audio gagal:\n{err[-300:]}")
+    raw = result.stdout[:len(result.stdout) // 2 * 2]
+    return np.frombuffer(raw, dtype="<i2").astype(np.float32) * (1.0 / 32768)
+
+
+class PcmStream:
+    """PCM int16 hasil decode FFmpeg yang terus bertambah selama decode jalan."""
+
+    def __init__(self, video_path: Path):
+        import numpy as np
+
+        self.video_path = Path(video_path)
+        self.expected   = probe_duration(self.video_path)   # 0 = tidak diketahui
+        cap = int((self.expected + 5) * SAMPLE_RATE) if self.expected else 600 * SAMPLE_RATE
+        self._buf   = np.empty(cap, dtype=np.int16)
+        self._n     = 0
+        self._cond  = threading.Condition()
+        self._done  = False
+        self._error = None
+        self._proc  = None
+        self._thread = None
+
+    # ── Decode ──────────────────────────────────────────────────────────────
+
+    def start(self) -> "PcmStream":
+        log.info("Decode audio dari: %s", self.video_path.name)
+        cmd = [
+            "ffmpeg", "-nostdin", "-v", "error",
+            "-i", str(self.video_path),
+            "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE),   # 16kHz mono — yang Whisper minta
+            "-f", "s16le", "-acodec", "pcm_s16le", "pipe:1",
+        ]
+        try:
+            self._proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except FileNotFoundError:
+            raise RuntimeError("FFmpeg tidak ditemukan. Install FFmpeg terlebih dahulu.")
+        self._thread = threading.Thread(target=self._pump, name="audio-decode", daemon=True)
+        self._thread.start()
+        return self
+
+    def _pump(self):
+        import numpy as np
+
+        tail = b""
+        try:
+            while True:
+                chunk = self._proc.stdout.read(READ_BYTES)
+                if not chunk:
+                    break
+                chunk = tail + chunk
+                usable = len(chunk) // 2 * 2
+                tail = chunk[usable:]
+                samples = np.frombuffer(chunk[:usable], dtype="<i2")
+                with self._cond:
+                    self._ensure(self._n + len(samples))
+                    self._buf[self._n:self._n + len(samples)] = samples
+                    self._n += len(samples)
+                    self._cond.notify_all()
+            stderr = self._proc.stderr.read().decode("utf-8", "replace")
+            if self._proc.wait() != 0:
+                self._error = RuntimeError(f"FFmpeg decode audio gagal:\n{stderr[-300:]}")
+        except Exception as e:
+            self._error = e
+        finally:
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+            if self._error is None:
+                log.info("Audio ter-decode: %.0f detik (%.1f MB di memori)",
+                         self._n / SAMPLE_RATE, self._n * 2 / 1024 / 1024)
+
+    def _ensure(self, size: int):
+        import numpy as np
+        if size <= len(self._buf):
+            return
+        grown = np.empty(max(size, len(self._buf) * 2), dtype=np.int16)
+        grown[:self._n] = self._buf[:self._n]
+        self._buf = grown
+
+    def close(self):
+        """Hentikan FFmpeg kalau masih jalan (cancel / error)."""
+        if self._proc and self._proc.poll() is None:
+            self._proc.kill()
+        if self._thread:
+            self._thread.join()
+
+    # ── Baca ────────────────────────────────────────────────────────────────
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    @property
+    def available(self) -> float:
+        """Detik audio yang sudah ter-decode."""
+        return self._n / SAMPLE_RATE
+
+    @property
+    def duration(self) -> float:
+        """Durasi final kalau decode selesai, kalau belum perkiraan ffprobe."""
+        return self.available if self._done else max(self.expected, self.available)
+
+    def wait(self, sec: Optional[float] = None, timeout: Optional[float] = None) -> bool:
+        """
+        Tunggu sampai `sec` detik ter-decode (None = sampai selesai).
+        Return False kalau timeout; error FFmpeg di-raise di sini.
+        """
+        need = None if sec is None else int(sec * SAMPLE_RATE)
+        with self._cond:
+            ok = self._cond.wait_for(
+                lambda: self._done or (need is not None and self._n >= need), timeout)
+        if self._error:
+            raise self._error
+        return ok
+
+    def pcm(self):
+        """Seluruh PCM int16 yang sudah ter-decode (view, tanpa copy)."""
+        with self._cond:
+            return self._buf[:self._n]
+
+    def read(self, start_sec: float, end_sec: Optional[float] = None):
+        """Potongan sebagai float32 [-1, 1] (format input Whisper)."""
+        import numpy as np
+
+        with self._cond:            # buffer bisa diganti saat tumbuh
+            buf, n = self._buf, self._n
+        a = min(n, max(0, int(start_sec * SAMPLE_RATE)))
+        b = n if end_sec is None else min(n, max(a, int(end_sec * SAMPLE_RATE)))
+        return buf[a:b].astype(np.float32) * (1.0 / 32768)
@@ -0,0 +1,317 @@
+"""
+MahiraClipper — Stage Cache
+Cache hasil tiap tahap pipeline, dipakai bersama oleh SEMUA project.
+
+Key = hash dari input (fingerprint file) + parameter tahap itu, misal:
+  transcript : fingerprint video + model Whisper + bahasa
+  analysis   : hash transkrip + ClipConfig + model Groq
+  cut/crop/final : fingerprint sumber + rentang waktu + parameter filter
+
+Jadi ceramah yang sama diproses ulang dengan style subtitle lain hanya
+mengulang tahap burn. Ukuran cache dibatasi, entry paling lama tidak
+dipakai dibuang duluan (LRU berdasarkan mtime yang di-touch tiap hit).
+
+Respons LLM (Groq / Gemini) punya cache sendiri di <root>/llm: key =
+model + hash prompt + temperature, dengan TTL dan batas ukuran terpisah,
+supaya retry / re-run tidak menghabiskan kuota harian.
+
+Transkrip Whisper punya store global sendiri di <root>/transcripts: key =
+fingerprint audio (bukan file video) + model + bahasa + parameter decode,
+jadi video yang sama di project baru (retry, download ulang) tidak
+ditranskripsi ulang walaupun entry stage cache-nya sudah ter-evict.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from config.settings import CacheConfig, log
+
+SAMPLE_BYTES = 1 << 20   # 1MB per sampel untuk fingerprint file besar
+EVICT_TO     = 0.9       # evict sampai 90% max_bytes → put berikutnya tidak langsung scan lagi
+
+_default_cache = None
+_llm_cache     = None
+_llm_ready     = False
+_transcripts   = None
+_transcripts_ready = False
+_fp_memo       = {}
+_fp_lock       = threading.Lock()
+
+
+# ─── Keys ─────────────────────────────────────────────────────────────────────
+
+def make_key(*parts) -> str:
+    """Hash stabil dari parameter apapun yang bisa di-JSON-kan."""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def fingerprint_file(path: Path) -> str:
+    """
+    Fingerprint cepat: ukuran + sampel awal/tengah/akhir untuk file besar,
+    seluruh isi untuk file kecil. Di-memo per (path, size, mtime).
+    """
+    path = Path(path)
+    st   = path.stat()
+    memo_key = (str(path.resolve()), st.st_size, st.st_mtime_ns)
+    with _fp_lock:
+        if memo_key in _fp_memo:
+            return _fp_memo[memo_key]
+
+    h = hashlib.sha256(str(st.st_size).encode())
+    with open(path, "rb") as f:
+        if st.st_size <= SAMPLE_BYTES * 4:
+            h.update(f.read())
+        else:
+            for offset in (0, st.st_size // 2, st.st_size - SAMPLE_BYTES):
+                f.seek(offset)
+                h.update(f.read(SAMPLE_BYTES))
+    digest = h.hexdigest()
+
+    with _fp_lock:
+        _fp_memo[memo_key] = digest
+    return digest
+
+
+# ─── Cache ────────────────────────────────────────────────────────────────────
+
+class StageCache:
+    """Cache file content-addressed di disk dengan batas ukuran + LRU."""
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root      = Path(root)
+        self.max_bytes = max_bytes
+        self._lock     = threading.Lock()
+        self._total    = None     # total byte berjalan; None = belum pernah di-scan
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _entry(self, key: str, suffix: str) -> Path:
+        return self.root / key[:2] / f"{key}{suffix}"
+
+    # ── File ────────────────────────────────────────────────────────────────
+
+    def get_file(self, key: str, dest: Path) -> bool:
+        """Salin/link entry ke dest. True kalau cache hit."""
+        entry = self._entry(key, dest.suffix)
+        if not entry.exists():
+            return False
+        try:
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            if dest.exists():
+                dest.unlink()
+            try:
+                os.link(entry, dest)          # hardlink: instan, tanpa copy
+            except OSError:
+                shutil.copy2(entry, dest)     # beda filesystem / tidak support
+            os.utime(entry)                   # LRU: tandai baru dipakai
+            log.info("Cache hit: %s", dest.name)
+            return True
+        except OSError as e:
+            log.warning("Gagal ambil cache %s: %s", key[:12], e)
+            return False
+
+    def put_file(self, key: str, src: Path):
+        """Simpan salinan src ke cache, lalu evict kalau melebihi batas."""
+        entry = self._entry(key, src.suffix)
+        old   = _size(entry)
+        try:
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            tmp = entry.with_name(entry.name + ".tmp")
+            try:
+                os.link(src, tmp)
+            except OSError:
+                shutil.copy2(src, tmp)
+            tmp.replace(entry)
+        except OSError as e:
+            log.warning("Gagal simpan cache %s: %s", src.name, e)
+            return
+        self._stored(entry, old)
+
+    # ── JSON ────────────────────────────────────────────────────────────────
+
+    def get_json(self, key: str) -> Optional[dict]:
+        entry = self._entry(key, ".json")
+        if not entry.exists():
+            return None
+        try:
+            with open(entry, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            os.utime(entry)
+            return data
+        except (json.JSONDecodeError, OSError):
+            return None
+
+    def put_json(self, key: str, data: dict):
+        entry = self._entry(key, ".json")
+        old   = _size(entry)
+        try:
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            tmp = entry.with_name(entry.name + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=True)
+            tmp.replace(entry)
+        except OSError as e:
+            log.warning("Gagal simpan cache JSON: %s", e)
+            return
+        self._stored(entry, old)
+
+    # ── Eviction ────────────────────────────────────────────────────────────
+
+    def _stored(self, entry: Path, old: int):
+        """
+        Entry baru ditulis (menggantikan `old` byte): tambah ke total berjalan.
+        Folder cache hanya di-scan saat pertama kali dan kalau total lewat
+        max_bytes — bukan di tiap put (worker paralel tidak saling antre).
+        """
+        delta = _size(entry) - old
+        with self._lock:
+            if self._total is not None:
+                self._total += delta
+                if self._total <= self.max_bytes:
+                    return
+        self.evict()
+
+    def evict(self):
+        """Kalau total > max_bytes, hapus entry paling lama tidak dipakai sampai EVICT_TO × max_bytes."""
+        with self._lock:
+            entries = []
+            total   = 0
+            for p in self.root.glob("*/*"):
+                if p.name.endswith(".tmp"):
+                    continue
+                try:
+                    st = p.stat()
+                except FileNotFoundError:
+                    continue
+                if not p.is_file():
+                    continue          # sub-cache (llm/) diurus instance-nya sendiri
+                entries.append((st.st_mtime, st.st_size, p))
+                total += st.st_size
+
+            if total > self.max_bytes:
+                entries.sort()
+                for _, size, p in entries:
+                    if total <= self.max_bytes * EVICT_TO:
+                        break
+                    try:
+                        p.unlink()
+                        total -= size
+                        log.debug("Cache evict: %s", p.name)
+                    except FileNotFoundError:
+                        pass
+            # Total hasil scan juga menyerap perubahan dari proses lain di folder yang sama
+            self._total = total
+
+
+class ResponseCache(StageCache):
+    """Cache teks respons LLM. Entry lebih tua dari ttl_sec dianggap miss."""
+
+    def __init__(self, root: Path, max_bytes: int, ttl_sec: float):
+        super().__init__(root, max_bytes)
+        self.ttl_sec = ttl_sec
+
+    @staticmethod
+    def key(model: str, prompt: str, temperature: float, **params) -> str:
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return make_key("llm", model, prompt_hash, float(temperature), params)
+
+    def get_text(self, key: str) -> Optional[str]:
+        data = self.get_json(key)
+        if not data:
+            return None
+        if self.ttl_sec and time.time() - data.get("created", 0) > self.ttl_sec:
+            self._entry(key, ".json").unlink(missing_ok=True)
+            return None
+        log.info("Cache hit: respons %s", data.get("model", "LLM"))
+        return data.get("text")
+
+    def put_text(self, key: str, text: str, model: str = ""):
+        self.put_json(key, {"created": time.time(), "model": model, "text": text})
+
+
+def _size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+# ─── Default Instance ─────────────────────────────────────────────────────────
+
+def _cache_root(cfg: CacheConfig) -> Path:
+    return Path(cfg.dir) if cfg.dir else Path(os.environ.get(
+        "MAHIRA_CACHE_DIR",
+        Path.home() / ".cache" / "mahiraclipper" / "stages",
+    ))
+
+
+def configure(config: Optional[CacheConfig] = None) -> Optional[StageCache]:
+    """Set cache global proses ini. enabled=False → get_cache() return None."""
+    global _default_cache
+    cfg = config or CacheConfig()
+    configure_llm(cfg)
+    configure_transcripts(cfg)
+    if not cfg.enabled:
+        _default_cache = None
+        return None
+    root = _cache_root(cfg)
+    _default_cache = StageCache(root, int(cfg.max_size_gb * 1024 ** 3))
+    log.info("Stage cache: %s (maks %.1f GB)", root, cfg.max_size_gb)
+    return _default_cache
+
+
+def get_cache() -> Optional[StageCache]:
+    return _default_cache
+
+
+def configure_llm(config: Optional[CacheConfig] = None) -> Optional[ResponseCache]:
+    """Set cache respons LLM. llm=False → get_llm_cache() return None (bypass)."""
+    global _llm_cache, _llm_ready
+    cfg = config or CacheConfig()
+    _llm_ready = True
+    if not cfg.llm:
+        _llm_cache = None
+        return None
+    _llm_cache = ResponseCache(
+        _cache_root(cfg) / "llm",
+        int(cfg.llm_max_size_mb * 1024 ** 2),
+        cfg.llm_ttl_days * 86400,
+    )
+    return _llm_cache
+
+
+def get_llm_cache() -> Optional[ResponseCache]:
+    """Di luar run() (mis. generate_caption dari UI) → konfigurasi dari api_config.json."""
+    if not _llm_ready:
+        from config.settings import load_config
+        configure_llm(load_config().cache)
+    return _llm_cache
+
+
+def configure_transcripts(config: Optional[CacheConfig] = None) -> Optional[StageCache]:
+    """Set store transkrip global. enabled/transcripts=False → get_transcript_cache() None."""
+    global _transcripts, _transcripts_ready
+    cfg = config or CacheConfig()
+    _transcripts_ready = True
+    if not (cfg.enabled and cfg.transcripts):
+        _transcripts = None
+        return None
+    _transcripts = StageCache(
+        _cache_root(cfg) / "transcripts",
+        int(cfg.transcripts_max_size_mb * 1024 ** 2),
+    )
+    return _transcripts
+
+
+def get_transcript_cache() -> Optional[StageCache]:
+    """Di luar run() (transcriber dipanggil langsung) → konfigurasi dari api_config.json."""
+    if not _transcripts_ready:
+        from config.settings import load_config
+        configure_transcripts(load_config().cache)
+    return _transcripts
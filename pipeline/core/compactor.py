@@ -0,0 +1,148 @@
+"""
+MahiraClipper — Transcript Compactor
+Ringkas transkrip Whisper sebelum dikirim ke LLM.
+
+  - Segmen yang ditandai Whisper sendiri sebagai bukan ucapan
+    (no_speech_prob tinggi + avg_logprob rendah), confidence sangat rendah,
+    atau teks berulang (halusinasi "Terima kasih." di bagian hening) dibuang.
+  - Segmen pendek digabung jadi satu unit per kalimat.
+  - Penanda waktu ringkas: "[725] teks" = detik mulai unit, bukan
+    "[12:05 → 12:30]" per segmen.
+  - Panjang prompt dihitung dalam token (tiktoken kalau terpasang,
+    kalau tidak perkiraan ~4 karakter per token).
+"""
+
+import re
+import threading
+
+from config.settings import log
+
+NO_SPEECH_PROB  = 0.6     # sama dengan no_speech_threshold Whisper
+LOGPROB_SILENT  = -1.0    # dipasangkan dengan NO_SPEECH_PROB
+LOGPROB_MIN     = -1.5    # di bawah ini hampir pasti halusinasi
+MAX_UNIT_SEC    = 25.0    # satu unit tidak lebih panjang dari ini
+MAX_GAP_SEC     = 1.5     # jeda lebih lama → unit baru walau kalimat belum selesai
+GAP_MARK_SEC    = 30.0    # jeda lebih lama → ditandai "(...)" di prompt
+TIKTOKEN_ENCODING = "cl100k_base"
+
+_SENTENCE_END = re.compile(r"[.!?…]['\")\]]*$")
+
+_encoder      = None
+_encoder_lock = threading.Lock()
+_encoder_ok   = None
+
+
+# ─── Filter ───────────────────────────────────────────────────────────────────
+
+def is_noise(seg: dict) -> bool:
+    """True kalau Whisper sendiri ragu segmen ini ucapan."""
+    no_speech = seg.get("no_speech_prob", 0) or 0
+    logprob   = seg.get("avg_logprob", 0) or 0
+    if no_speech > NO_SPEECH_PROB and logprob < LOGPROB_SILENT:
+        return True
+    return logprob < LOGPROB_MIN
+
+
+def _norm(text: str) -> str:
+    return re.sub(r"\W+", " ", text.lower()).strip()
+
+
+# ─── Compaction ───────────────────────────────────────────────────────────────
+
+def compact_segments(
+    segments: list,
+    max_unit_sec: float = MAX_UNIT_SEC,
+    max_gap_sec: float = MAX_GAP_SEC,
+) -> list:
+    """
+    Segmen Whisper → unit per kalimat {"start", "end", "text"}.
+    Segmen noise dan pengulangan berturut-turut dibuang.
+    """
+    units, cur = [], None
+    last_norm, dropped = "", 0
+
+    for seg in segments:
+        text = seg.get("text", "").strip()
+        if not text or is_noise(seg):
+            dropped += 1
+            continue
+        norm = _norm(text)
+        if norm and norm == last_norm:
+            dropped += 1
+            continue
+        last_norm = norm
+
+        start, end = float(seg.get("start", 0)), float(seg.get("end", 0))
+        if cur and (start - cur["end"] > max_gap_sec or end - cur["start"] > max_unit_sec):
+            units.append(cur)
+            cur = None
+        if cur is None:
+            cur = {"start": start, "end": end, "text": text}
+        else:
+            cur["end"]   = end
+            cur["text"] += " " + text
+        if _SENTENCE_END.search(text):
+            units.append(cur)
+            cur = None
+
+    if cur:
+        units.append(cur)
+    if dropped:
+        log.debug("Compactor: %d segmen dibuang, %d segmen → %d unit",
+                  dropped, len(segments), len(units))
+    return units
+
+
+def format_unit(unit: dict) -> str:
+    """Satu unit → "[detik] teks"."""
+    text = unit.get("text", "").strip()
+    if not text:
+        return ""
+    return f"[{int(unit.get('start', 0))}] {text}"
+
+
+def format_units(units: list) -> str:
+    """
+    Unit → teks prompt. Jeda lebih dari GAP_MARK_SEC (hening / bagian yang
+    dilewati) ditandai "[detik] (...)"; baris terakhir menandai akhir unit
+    terakhir.
+    """
+    lines, prev = [], None
+    for unit in units:
+        line = format_unit(unit)
+        if not line:
+            continue
+        if prev and unit.get("start", 0) - prev.get("end", 0) > GAP_MARK_SEC:
+            lines.append(f"[{int(round(prev.get('end', 0)))}] (...)")
+        lines.append(line)
+        prev = unit
+    if prev:
+        lines.append(f"[{int(round(prev.get('end', 0)))}] (akhir)")
+    return "\n".join(lines)
+
+
+# ─── Token Counting ───────────────────────────────────────────────────────────
+
+def count_tokens(text: str) -> int:
+    """Jumlah token; tiktoken kalau ada, kalau tidak ~4 karakter per token."""
+    enc = _get_encoder()
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def _get_encoder():
+    global _encoder, _encoder_ok
+    if _encoder_ok is not None:
+        return _encoder
+    with _encoder_lock:
+        if _encoder_ok is None:
+            try:
+                import tiktoken
+                _encoder = tiktoken.get_encoding(TIKTOKEN_ENCODING)
+                _encoder_ok = True
+            except Exception as e:
+                # tidak terpasang / file BPE tidak bisa diunduh → heuristik
+                log.debug("tiktoken tidak tersedia (%s), pakai perkiraan karakter", e)
+                _encoder_ok = False
+    return _encoder
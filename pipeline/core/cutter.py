@@ -9,6 +9,11 @@ from pathlib import Path
 from typing import Optional, Callable
 
 from config.settings import log
+from core.workers import plan_workers, run_parallel, ProgressAggregator
+from core.cache import get_cache, make_key, fingerprint_file
+from core.transcript_index import index_for
+
+CUT_PARAMS = "libx264-crf18-fast/aac192k"   # ganti kalau parameter encode berubah
 
 
 def cut_clips(
@@ -18,7 +23,14 @@ def cut_clips(
     transcript_data: Optional[dict] = None,
     skip_existing: bool = True,
     progress_callback: Optional[Callable[[str, float], None]] = None,
+    workers: int = 1,
+    threads: int = 0,
+    extras: bool = True,
 ) -> list:
+    """
+    Potong semua klip approved. extras=False → hanya MP4; thumbnail &
+    subtitle JSON dibuat terpisah (generate_thumbnails / build_subtitle_jsons).
+    """
     output_folder.mkdir(parents=True, exist_ok=True)
     subs_folder   = output_folder.parent / "subs"
     thumbs_folder = output_folder.parent / "thumbnails"
@@ -33,64 +45,139 @@ def cut_clips(
         log.warning("Tidak ada segmen yang approved.")
         return segments
 
-    log.info("Memotong %d klip...", total)
-    results   = list(segments)
-    done      = 0
+    workers, threads = plan_workers(workers, total, threads)
+    log.info("Memotong %d klip (%d paralel, %d thread/job)...", total, workers, threads)
+    results  = list(segments)
+    progress = ProgressAggregator(total, "cutting", progress_callback)
+    jobs     = [i for i, seg in enumerate(results) if seg.get("is_approved", True)]
 
-    for i, seg in enumerate(results):
-        if not seg.get("is_approved", True):
-            continue
+    def job(i):
+        update = cut_one(
+            video_path, results[i], i, output_folder, transcript_segs,
+            skip_existing=skip_existing, threads=threads, extras=extras,
+        )
+        progress.update(i, 1.0)
+        return update
 
-        safe     = _safe_name(seg.get("title", f"clip_{i}"))
-        filename = f"{i:03d}_{safe}"
-        out_mp4  = output_folder / f"{filename}.mp4"
-
-        if skip_existing and out_mp4.exists() and out_mp4.stat().st_size > 10000:
-            log.info("Skip (sudah ada): %s", out_mp4.name)
-            results[i]["raw_cut_path"]       = str(out_mp4)
-            results[i]["is_cut"]             = True
-            results[i]["subtitle_json_path"] = str(subs_folder / f"{filename}.json")
-            done += 1
-            if progress_callback:
-                progress_callback("cutting", done / total)
-            continue
+    def apply(i, update):
+        results[i].update(update)
+
+    run_parallel(jobs, job, workers, on_result=apply)
+    return results
 
-        start    = float(seg.get("start_time", 0))
-        end      = float(seg.get("end_time", start + 60))
-        duration = end - start
 
-        if duration <= 1:
-            log.warning("Skip segmen durasi terlalu pendek (%.1fs): %s", duration, seg.get("title"))
-            continue
+def cut_one(
+    video_path: Path,
+    seg: dict,
+    index: int,
+    output_folder: Path,
+    transcript_segs: list,
+    skip_existing: bool = True,
+    threads: int = 0,
+    extras: bool = True,
+) -> dict:
+    """Potong satu klip (+ thumbnail + subtitle JSON kalau extras). Return dict update untuk clip."""
+    subs_folder   = output_folder.parent / "subs"
+    thumbs_folder = output_folder.parent / "thumbnails"
+
+    filename = clip_filename(seg, index)
+    out_mp4  = output_folder / f"{filename}.mp4"
+
+    start    = float(seg.get("start_time", 0))
+    end      = float(seg.get("end_time", start + 60))
+    duration = end - start
+
+    # Key lineage klip: dipakai juga untuk key cache crop & final
+    cache     = get_cache()
+    cache_key = make_key("cut", fingerprint_file(video_path), start, end, CUT_PARAMS)
 
-        # Cut video
-        success = _ffmpeg_cut(video_path, out_mp4, start, duration)
+    if skip_existing and out_mp4.exists() and out_mp4.stat().st_size > 10000:
+        log.info("Skip (sudah ada): %s", out_mp4.name)
+        return {
+            "raw_cut_path":       str(out_mp4),
+            "is_cut":             True,
+            "subtitle_json_path": str(subs_folder / f"{filename}.json"),
+            "cache_key":          cache_key,
+        }
+
+    if duration <= 1:
+        log.warning("Skip segmen durasi terlalu pendek (%.1fs): %s", duration, seg.get("title"))
+        return {}
+
+    # Cut video (atau ambil dari cache)
+    if not (cache and cache.get_file(cache_key, out_mp4)):
+        success = _ffmpeg_cut(video_path, out_mp4, start, duration, threads)
         if not success:
             log.error("Gagal potong klip: %s", filename)
-            results[i]["is_cut"] = False
-            continue
+            return {"is_cut": False}
+        if cache:
+            cache.put_file(cache_key, out_mp4)
+
+    update = {"raw_cut_path": str(out_mp4), "is_cut": True, "cache_key": cache_key}
+    if not extras:
+        log.info("Cut: %s (%.1fs)", filename, duration)
+        return update
+
+    # Thumbnail
+    thumb = thumbs_folder / f"{filename}.jpg"
+    _generate_thumbnail(out_mp4, thumb)
+    update["thumbnail_path"] = str(thumb) if thumb.exists() else None
+
+    # Subtitle JSON — extract dari transkrip Gemini
+    sub_json = subs_folder / f"{filename}.json"
+    _build_subtitle_json(seg, sub_json, transcript_segs)
+    update["subtitle_json_path"] = str(sub_json)
+
+    log.info("Cut: %s (%.1fs)", filename, duration)
+    return update
+
 
-        results[i]["raw_cut_path"] = str(out_mp4)
-        results[i]["is_cut"]       = True
+def generate_thumbnails(
+    clips: list,
+    thumbs_folder: Path,
+    progress_callback: Optional[Callable[[str, float], None]] = None,
+    workers: int = 1,
+) -> list:
+    """Thumbnail JPG dari raw cut tiap klip. Return list clip dengan thumbnail_path."""
+    thumbs_folder.mkdir(parents=True, exist_ok=True)
+    results = [dict(c) for c in clips]
+    jobs    = [i for i, c in enumerate(results) if c.get("raw_cut_path")]
+    workers, _ = plan_workers(workers, len(jobs))
+    progress = ProgressAggregator(len(jobs), "thumbnail", progress_callback)
 
-        # Thumbnail
-        thumb = thumbs_folder / f"{filename}.jpg"
-        _generate_thumbnail(out_mp4, thumb)
-        results[i]["thumbnail_path"] = str(thumb) if thumb.exists() else None
+    def job(i):
+        thumb = thumbs_folder / f"{Path(results[i]['raw_cut_path']).stem}.jpg"
+        if not thumb.exists():
+            _generate_thumbnail(Path(results[i]["raw_cut_path"]), thumb)
+        progress.update(i, 1.0)
+        return str(thumb) if thumb.exists() else None
 
-        # Subtitle JSON — extract dari transkrip Gemini
-        sub_json = subs_folder / f"{filename}.json"
-        _build_subtitle_json(seg, sub_json, transcript_segs)
-        results[i]["subtitle_json_path"] = str(sub_json)
+    def apply(i, path):
+        results[i]["thumbnail_path"] = path
+
+    run_parallel(jobs, job, workers, on_result=apply)
+    return results
 
-        done += 1
-        log.info("[%d/%d] Cut: %s (%.1fs)", done, total, filename, duration)
-        if progress_callback:
-            progress_callback("cutting", done / total)
 
+def build_subtitle_jsons(clips: list, subs_folder: Path, transcript_data: Optional[dict] = None) -> list:
+    """Subtitle JSON tiap klip approved (cukup timestamp, tidak perlu file cut)."""
+    subs_folder.mkdir(parents=True, exist_ok=True)
+    transcript_segs = transcript_data.get("segments", []) if transcript_data else []
+    results = [dict(c) for c in clips]
+    for i, c in enumerate(results):
+        if not c.get("is_approved", True):
+            continue
+        sub_json = subs_folder / f"{clip_filename(c, i)}.json"
+        _build_subtitle_json(c, sub_json, transcript_segs)
+        c["subtitle_json_path"] = str(sub_json)
     return results
 
 
+def clip_filename(seg: dict, index: int) -> str:
+    """Nama dasar file klip (tanpa ekstensi): 003_Judul_Klip."""
+    return f"{index:03d}_{_safe_name(seg.get('title', f'clip_{index}'))}"
+
+
 def _build_subtitle_json(seg: dict, output_path: Path, transcript_segs: list):
     """
     Buat subtitle JSON dari transkrip Gemini untuk klip ini.
@@ -99,20 +186,17 @@ def _build_subtitle_json(seg: dict, output_path: Path, transcript_segs: list):
     clip_start = float(seg.get("start_time", 0))
     clip_end   = float(seg.get("end_time", clip_start + 60))
 
-    # Filter transkrip yang masuk ke range klip
+    # Segmen transkrip yang masuk ke range klip (bisect di index bersama)
     clip_transcript = []
-    for ts in transcript_segs:
-        ts_start = float(ts.get("start", 0))
-        ts_end   = float(ts.get("end", 0))
-        if ts_start < clip_end + 1.0 and ts_end > clip_start - 1.0:
-            # Konversi ke waktu relatif
-            rel_start = max(0.0, ts_start - clip_start)
-            rel_end   = max(0.0, ts_end   - clip_start)
-            clip_transcript.append({
-                "start": round(rel_start, 3),
-                "end":   round(rel_end,   3),
-                "text":  ts.get("text", "").strip(),
-            })
+    for ts in index_for(transcript_segs).segments_in(clip_start, clip_end, 1.0):
+        # Konversi ke waktu relatif
+        rel_start = max(0.0, float(ts.get("start", 0)) - clip_start)
+        rel_end   = max(0.0, float(ts.get("end", 0))   - clip_start)
+        clip_transcript.append({
+            "start": round(rel_start, 3),
+            "end":   round(rel_end,   3),
+            "text":  ts.get("text", "").strip(),
+        })
 
     data = {
         "clip_id":    seg.get("id"),
@@ -132,7 +216,9 @@ def _build_subtitle_json(seg: dict, output_path: Path, transcript_segs: list):
         log.warning("Gagal simpan subtitle JSON: %s", e)
 
 
-def _ffmpeg_cut(video_path: Path, output_path: Path, start: float, duration: float) -> bool:
+def _ffmpeg_cut(
+    video_path: Path, output_path: Path, start: float, duration: float, threads: int = 0,
+) -> bool:
     cmd = [
         "ffmpeg", "-y",
         "-ss", str(start),
@@ -142,13 +228,20 @@ def _ffmpeg_cut(video_path: Path, output_path: Path, start: float, duration: flo
         "-c:a", "aac", "-b:a", "192k",
         "-movflags", "+faststart",
         "-avoid_negative_ts", "make_zero",
-        str(output_path),
     ]
+    if threads > 0:
+        cmd += ["-threads", str(threads)]
+    # Tulis ke .part dulu → file setengah jadi (proses di-kill) tidak pernah
+    # dianggap selesai oleh skip_existing / resume
+    tmp_path = output_path.with_name(output_path.stem + ".part" + output_path.suffix)
+    cmd.append(str(tmp_path))
     try:
         result = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8", errors="replace")
         if result.returncode != 0:
             log.error("FFmpeg cut error:\n%s", result.stderr[-300:])
+            tmp_path.unlink(missing_ok=True)
             return False
+        tmp_path.replace(output_path)
         return True
     except FileNotFoundError:
         raise RuntimeError("FFmpeg tidak ditemukan. Install FFmpeg dan tambahkan ke PATH.")
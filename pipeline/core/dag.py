@@ -0,0 +1,195 @@
+"""
+MahiraClipper — Stage DAG
+Eksekutor kecil untuk pipeline: tiap stage mendeklarasikan artifact yang
+dibutuhkan (inputs) dan yang dihasilkan (outputs). Stage yang semua
+input-nya sudah ada langsung jalan, jadi stage yang tidak saling
+bergantung (thumbnail, subtitle JSON, crop) jalan bersamaan.
+
+Bookkeeping (ProjectManager step, log, event) tidak diurus di sini —
+dipasang lewat StageHooks oleh pemanggil.
+
+Resume: stage di-skip kalau hooks.is_done(stage) dan stage.valid() True
+DAN tidak ada stage hulu yang jalan ulang di eksekusi ini. Begitu satu
+stage jalan, semua turunannya ikut jalan.
+"""
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from config.settings import log
+from core.job_queue import resource
+
+
+# ─── Definisi ─────────────────────────────────────────────────────────────────
+
+@dataclass
+class Stage:
+    name: str                                    # = nama step di ProjectManager
+    fn: Callable[[], None]
+    inputs: tuple = ()                           # artifact yang dibutuhkan
+    outputs: tuple = ()                          # artifact yang dihasilkan
+    resource: str = ""                           # slot di core/job_queue.resource
+    label: str = ""                              # untuk pesan error ("Cut gagal: ...")
+    optional: bool = False                       # gagal → turunannya tetap jalan
+    fallback: Optional[Callable[[Exception], None]] = None   # dipanggil kalau optional gagal
+    valid: Optional[Callable[[], bool]] = None   # artifact di disk masih valid (resume)
+
+
+class StageFailed(Exception):
+    def __init__(self, stage: Stage, error: Exception):
+        super().__init__(f"{stage.label or stage.name} gagal: {error}")
+        self.stage = stage
+        self.error = error
+
+
+class StageHooks:
+    """Callback bookkeeping. Semua dipanggil di thread koordinator."""
+
+    def is_done(self, stage: Stage) -> bool:
+        return False
+
+    def on_skip(self, stage: Stage):
+        pass
+
+    def on_start(self, stage: Stage):
+        pass
+
+    def on_done(self, stage: Stage):
+        pass
+
+    def on_fail(self, stage: Stage, error: Exception, fatal: bool):
+        pass
+
+
+# ─── Graph ────────────────────────────────────────────────────────────────────
+
+class StageGraph:
+
+    def __init__(self, stages: list, provided: tuple = ()):
+        self.stages   = list(stages)
+        self.provided = set(provided)
+        self._by_name = {s.name: s for s in self.stages}
+        self._producer = {}
+        for s in self.stages:
+            for out in s.outputs:
+                if out in self._producer:
+                    raise ValueError(f"Artifact '{out}' dihasilkan 2 stage: "
+                                     f"{self._producer[out]} & {s.name}")
+                self._producer[out] = s.name
+        for s in self.stages:
+            missing = [i for i in s.inputs if i not in self._producer and i not in self.provided]
+            if missing:
+                raise ValueError(f"Stage '{s.name}' butuh artifact yang tidak ada: {missing}")
+        self._order = self._toposort()
+
+    def _toposort(self) -> list:
+        order, state = [], {}
+
+        def visit(name, path):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError("Siklus di DAG: " + " → ".join(path + [name]))
+            state[name] = "visiting"
+            for dep in self.dependencies(name):
+                visit(dep, path + [name])
+            state[name] = "done"
+            order.append(name)
+
+        for s in self.stages:
+            visit(s.name, [])
+        return order
+
+    def dependencies(self, name: str) -> set:
+        """Stage yang langsung menghasilkan input stage `name`."""
+        return {self._producer[i] for i in self._by_name[name].inputs if i in self._producer}
+
+    def upstream(self, name: str) -> set:
+        """Semua leluhur stage `name` (transitif)."""
+        seen, todo = set(), list(self.dependencies(name))
+        while todo:
+            dep = todo.pop()
+            if dep not in seen:
+                seen.add(dep)
+                todo.extend(self.dependencies(dep))
+        return seen
+
+    # ── Eksekusi ────────────────────────────────────────────────────────────
+
+    def run(
+        self,
+        hooks: Optional[StageHooks] = None,
+        max_parallel: int = 4,
+        check: Optional[Callable[[], None]] = None,
+    ) -> set:
+        """
+        Jalankan semua stage sesuai dependensi.
+        Return set nama stage yang benar-benar jalan (bukan di-skip).
+        Raise StageFailed kalau stage non-optional gagal (stage lain yang
+        sedang jalan ditunggu dulu, stage baru tidak dimulai).
+        """
+        hooks     = hooks or StageHooks()
+        available = set(self.provided)
+        pending   = [n for n in self._order]
+        ran       = set()
+        running   = {}
+        failure   = None
+
+        def schedule(pool):
+            progressed = True
+            while progressed and failure is None:
+                progressed = False
+                for name in list(pending):
+                    stage = self._by_name[name]
+                    if not all(i in available for i in stage.inputs):
+                        continue
+                    pending.remove(name)
+                    progressed = True
+                    if self._can_skip(stage, hooks, ran):
+                        hooks.on_skip(stage)
+                        available.update(stage.outputs)
+                        continue
+                    hooks.on_start(stage)
+                    ctx = contextvars.copy_context()
+                    running[pool.submit(ctx.run, self._call, stage, check)] = stage
+
+        with ThreadPoolExecutor(max_workers=max(1, max_parallel), thread_name_prefix="stage") as pool:
+            schedule(pool)
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    stage = running.pop(fut)
+                    ran.add(stage.name)
+                    try:
+                        fut.result()
+                    except Exception as e:
+                        fatal = not stage.optional
+                        log.error("Stage '%s' gagal: %s", stage.name, e)
+                        hooks.on_fail(stage, e, fatal)
+                        if fatal:
+                            failure = failure or StageFailed(stage, e)
+                            continue
+                        if stage.fallback:
+                            stage.fallback(e)
+                    else:
+                        hooks.on_done(stage)
+                    available.update(stage.outputs)
+                schedule(pool)
+
+        if failure:
+            raise failure
+        return ran
+
+    def _can_skip(self, stage: Stage, hooks: StageHooks, ran: set) -> bool:
+        if self.upstream(stage.name) & ran:
+            return False
+        if not hooks.is_done(stage):
+            return False
+        return stage.valid is None or bool(stage.valid())
+
+    @staticmethod
+    def _call(stage: Stage, check):
+        with resource(stage.resource, check):
+            stage.fn()
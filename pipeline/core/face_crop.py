@@ -9,12 +9,14 @@ Mode:
   face    = tracking satu wajah
 """
 
-import json
 import subprocess
+from dataclasses import asdict
 from pathlib import Path
 from typing import Optional, Callable
 
 from config.settings import FaceConfig, log
+from core.workers import plan_workers, run_parallel, ProgressAggregator
+from core.cache import get_cache, make_key, fingerprint_file
 
 
 # ─── Main Entry ──────────────────────────────────────────────────────────────
@@ -26,10 +28,13 @@ def crop_to_vertical(
     progress_callback: Optional[Callable[[str, float], None]] = None,
     target_w: int = 1080,
     target_h: int = 1920,
+    threads: int = 0,
+    cache_key: Optional[str] = None,
 ) -> bool:
     """
     Crop video ke format target (default 9:16 = 1080x1920).
     target_w/target_h bisa diset dari UI untuk format lain (1:1, 16:9, 4:5).
+    cache_key (dari crop_cache_key) → hasil diambil/disimpan di stage cache.
 
     Returns:
         True jika berhasil, False jika gagal
@@ -42,36 +47,81 @@ def crop_to_vertical(
         log.info("Skip crop (sudah ada): %s", output_path.name)
         return True
 
+    cache = get_cache() if cache_key else None
+    if cache and cache.get_file(cache_key, output_path):
+        return True
+
+    vf = compute_crop_filter(
+        video_path, config=cfg, progress_callback=progress_callback,
+        target_w=target_w, target_h=target_h,
+    )
+    if vf is None:
+        return False
+
+    # Jika video sudah sesuai target ratio, skip crop
+    if vf == "":
+        import shutil
+        shutil.copy2(video_path, output_path)
+        return True
+
+    success = _run_ffmpeg_vf(video_path, output_path, vf, threads)
+    if success and cache:
+        cache.put_file(cache_key, output_path)
+
+    _progress(progress_callback, 1.0)
+    return success
+
+
+def crop_cache_key(base_key: str, config: FaceConfig, target_w: int, target_h: int) -> str:
+    """Key cache hasil crop: lineage klip + semua parameter yang mempengaruhi crop."""
+    return make_key("crop", base_key, asdict(config), target_w, target_h)
+
+
+def compute_crop_filter(
+    video_path: Path,
+    config: Optional[FaceConfig] = None,
+    progress_callback: Optional[Callable[[str, float], None]] = None,
+    target_w: int = 1080,
+    target_h: int = 1920,
+    start: float = 0.0,
+    duration: Optional[float] = None,
+) -> Optional[str]:
+    """
+    Tentukan filter crop/scale FFmpeg (-vf) tanpa encode apapun.
+    start/duration membatasi analisis wajah ke satu rentang di video sumber,
+    dipakai oleh render fused yang crop langsung dari video asli.
+
+    Returns:
+        string filter, "" jika rasio sudah sesuai target, None jika gagal baca video
+    """
+    cfg = config or FaceConfig()
+
     # Cek dimensi video
     info = _get_video_info(video_path)
     if not info:
         log.warning("Tidak bisa baca info video: %s", video_path.name)
-        return False
+        return None
 
     w, h = info["width"], info["height"]
     log.info("Video input: %dx%d | Target: %dx%d", w, h, target_w, target_h)
 
     _progress(progress_callback, 0.1)
 
-    # Jika video sudah sesuai target ratio, skip crop
     target_ratio_val = target_w / target_h
     src_ratio = w / h
     if abs(src_ratio - target_ratio_val) < 0.05:
         log.info("Video sudah sesuai rasio target, skip crop.")
-        import shutil
-        shutil.copy2(video_path, output_path)
-        return True
+        return ""
 
     # Pilih metode crop
     if cfg.mode == "center" or not _check_mediapipe():
         log.info("Pakai center crop (mediapipe tidak tersedia).")
-        success = _center_crop(video_path, output_path, w, h, cfg, target_w, target_h)
-    else:
-        log.info("Pakai face tracking dengan MediaPipe.")
-        success = _face_tracking_crop(video_path, output_path, w, h, cfg, progress_callback, target_w, target_h)
+        return _center_crop_filter(w, h, cfg, target_w, target_h)
 
-    _progress(progress_callback, 1.0)
-    return success
+    log.info("Pakai face tracking dengan MediaPipe.")
+    return _face_tracking_filter(
+        video_path, w, h, cfg, progress_callback, target_w, target_h, start, duration,
+    )
 
 
 # ─── Batch Crop ───────────────────────────────────────────────────────────────
@@ -84,6 +134,8 @@ def crop_all_clips(
     progress_callback: Optional[Callable[[str, float], None]] = None,
     target_w: int = 1080,
     target_h: int = 1920,
+    workers: int = 1,
+    threads: int = 0,
 ) -> list:
     """Crop semua klip yang sudah di-cut ke format target (default 9:16)."""
     cropped_folder.mkdir(parents=True, exist_ok=True)
@@ -91,67 +143,65 @@ def crop_all_clips(
 
     approved = [c for c in clips if c.get("is_approved", True) and c.get("is_cut", False)]
     total    = len(approved)
-    done     = 0
 
     if total == 0:
         log.warning("Tidak ada klip untuk di-crop.")
         return clips
 
-    log.info("Cropping %d klip ke format 9:16...", total)
-    results = list(clips)
-
-    for i, clip in enumerate(results):
-        if not clip.get("is_approved", True) or not clip.get("is_cut", False):
-            continue
-
-        raw_cut = clip.get("raw_cut_path")
-        if not raw_cut or not Path(raw_cut).exists():
-            continue
+    workers, threads = plan_workers(workers, total, threads)
+    log.info("Cropping %d klip ke format 9:16 (%d paralel)...", total, workers)
+    results  = list(clips)
+    progress = ProgressAggregator(total, "cropping", progress_callback)
+    jobs     = [
+        i for i, c in enumerate(results)
+        if c.get("is_approved", True) and c.get("is_cut", False)
+        and c.get("raw_cut_path") and Path(c["raw_cut_path"]).exists()
+    ]
 
+    def job(i):
+        clip     = results[i]
+        raw_cut  = clip["raw_cut_path"]
         safe     = _safe_name(clip.get("title", f"clip_{i}"))
         filename = f"{i:03d}_{safe}_cropped.mp4"
         out_path = cropped_folder / filename
 
-        def cb(step, pct):
-            overall = (done + pct) / total
-            if progress_callback:
-                progress_callback("cropping", overall)
-
+        key = crop_cache_key(clip.get("cache_key") or fingerprint_file(Path(raw_cut)),
+                             cfg, target_w, target_h)
         success = crop_to_vertical(
             video_path=Path(raw_cut),
             output_path=out_path,
             config=cfg,
-            progress_callback=cb,
+            progress_callback=progress.reporter(i),
             target_w=target_w,
             target_h=target_h,
+            threads=threads,
+            cache_key=key,
         )
+        progress.update(i, 1.0)
+        log.info("Crop selesai: %s", filename)
 
         if success:
-            results[i]["cropped_path"] = str(out_path)
-            results[i]["is_cropped"]   = True
-        else:
-            # Fallback: pakai raw cut tanpa crop
-            results[i]["cropped_path"] = raw_cut
-            results[i]["is_cropped"]   = False
-            log.warning("Crop gagal untuk: %s, pakai original.", clip.get("title",""))
+            return {"cropped_path": str(out_path), "is_cropped": True, "cache_key": key}
+        # Fallback: pakai raw cut tanpa crop
+        log.warning("Crop gagal untuk: %s, pakai original.", clip.get("title",""))
+        return {"cropped_path": raw_cut, "is_cropped": False}
 
-        done += 1
-        log.info("[%d/%d] Crop selesai: %s", done, total, filename)
+    def apply(i, update):
+        results[i].update(update)
 
+    run_parallel(jobs, job, workers, on_result=apply)
     return results
 
 
 # ─── Center Crop (no face detection) ─────────────────────────────────────────
 
-def _center_crop(
-    video_path: Path,
-    output_path: Path,
+def _center_crop_filter(
     src_w: int,
     src_h: int,
     cfg: FaceConfig,
     target_w: int = 1080,
     target_h: int = 1920,
-) -> bool:
+) -> str:
     """
     Crop tengah video ke target ratio.
     Kalau video lebih lebar: crop sisi kiri-kanan.
@@ -172,23 +222,24 @@ def _center_crop(
         # Padding hitam (letterbox)
         vf = f"scale={target_w}:{target_h}:force_original_aspect_ratio=decrease,pad={target_w}:{target_h}:(ow-iw)/2:(oh-ih)/2:black"
 
-    return _run_ffmpeg_vf(video_path, output_path, vf)
+    return vf
 
 
 # ─── Face Tracking Crop ───────────────────────────────────────────────────────
 
-def _face_tracking_crop(
+def _face_tracking_filter(
     video_path: Path,
-    output_path: Path,
     src_w: int,
     src_h: int,
     cfg: FaceConfig,
     progress_callback,
     target_w: int = 1080,
     target_h: int = 1920,
-) -> bool:
+    start: float = 0.0,
+    duration: Optional[float] = None,
+) -> str:
     """
-    Deteksi wajah per-frame, buat crop coordinates, apply dengan FFmpeg.
+    Deteksi wajah per-frame, buat crop coordinates, jadikan filter FFmpeg.
     """
     try:
         import mediapipe as mp
@@ -196,7 +247,7 @@ def _face_tracking_crop(
         import numpy as np
     except ImportError:
         log.warning("mediapipe/cv2 tidak tersedia. Fallback ke center crop.")
-        return _center_crop(video_path, output_path, src_w, src_h, cfg, target_w, target_h)
+        return _center_crop_filter(src_w, src_h, cfg, target_w, target_h)
 
     _progress(progress_callback, 0.2)
 
@@ -216,6 +267,11 @@ def _face_tracking_crop(
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
     detect_every = max(1, int(fps_src * cfg.detect_interval_1face))
 
+    # Rentang analisis (render fused baca langsung dari video sumber)
+    if start > 0:
+        cap.set(cv2.CAP_PROP_POS_MSEC, start * 1000)
+    max_frames = int(duration * fps_src) if duration else None
+
     face_detection = mp.solutions.face_detection.FaceDetection(
         model_selection=1,
         min_detection_confidence=cfg.confidence_threshold,
@@ -227,7 +283,7 @@ def _face_tracking_crop(
     last_cx  = center_x
 
     frame_idx = 0
-    while True:
+    while max_frames is None or frame_idx < max_frames:
         ret, frame = cap.read()
         if not ret:
             break
@@ -263,19 +319,6 @@ def _face_tracking_crop(
 
     _progress(progress_callback, 0.6)
 
-    # Simpan crop data ke JSON (untuk FFmpeg sendcmd)
-    crop_data = {
-        "src_w": src_w, "src_h": src_h,
-        "crop_w": crop_w, "crop_h": crop_h,
-        "fps": fps_src,
-        "frames": crop_x_per_frame,
-    }
-    crop_json = output_path.parent / f"{output_path.stem}_crop.json"
-    with open(crop_json, "w") as f:
-        json.dump(crop_data, f)
-
-    _progress(progress_callback, 0.7)
-
     # Buat crop filter yang smooth
     # Karena FFmpeg tidak bisa baca JSON per-frame langsung,
     # kita gunakan pendekatan: temukan crop X yang paling sering muncul
@@ -288,22 +331,16 @@ def _face_tracking_crop(
     else:
         median_x = center_x
 
-    crop_y = max(0, (src_h - crop_h) // 2)
-    vf = (f"crop={crop_w}:{crop_h}:{median_x}:{crop_y},"
-          f"scale={target_w}:{target_h}")
-
-    success = _run_ffmpeg_vf(video_path, output_path, vf)
-
-    # Cleanup
-    if crop_json.exists():
-        crop_json.unlink()
+    _progress(progress_callback, 0.7)
 
-    return success
+    crop_y = max(0, (src_h - crop_h) // 2)
+    return (f"crop={crop_w}:{crop_h}:{median_x}:{crop_y},"
+            f"scale={target_w}:{target_h}")
 
 
 # ─── FFmpeg Helper ────────────────────────────────────────────────────────────
 
-def _run_ffmpeg_vf(video_path: Path, output_path: Path, vf: str) -> bool:
+def _run_ffmpeg_vf(video_path: Path, output_path: Path, vf: str, threads: int = 0) -> bool:
     """Jalankan FFmpeg dengan video filter."""
     cmd = [
         "ffmpeg", "-y",
@@ -314,8 +351,11 @@ def _run_ffmpeg_vf(video_path: Path, output_path: Path, vf: str) -> bool:
         "-preset", "fast",
         "-c:a", "copy",
         "-movflags", "+faststart",
-        str(output_path),
     ]
+    if threads > 0:
+        cmd += ["-threads", str(threads)]
+    tmp_path = output_path.with_name(output_path.stem + ".part" + output_path.suffix)
+    cmd.append(str(tmp_path))
     try:
         result = subprocess.run(
             cmd, capture_output=True, text=True,
@@ -323,7 +363,9 @@ def _run_ffmpeg_vf(video_path: Path, output_path: Path, vf: str) -> bool:
         )
         if result.returncode != 0:
             log.error("FFmpeg crop error:\n%s", result.stderr[-300:])
+            tmp_path.unlink(missing_ok=True)
             return False
+        tmp_path.replace(output_path)
         return True
     except FileNotFoundError:
         raise RuntimeError("FFmpeg tidak ditemukan.")
@@ -20,6 +20,7 @@ from pathlib import Path
 from typing import Callable, Optional
 
 from config.settings import GeminiConfig, ClipConfig, log
+from core.cache import get_llm_cache
 from config.prompts import (
     DAKWAH_ANALYSIS_PROMPT,
     CAPTION_PROMPT,
@@ -580,8 +581,16 @@ def generate_caption(
         generation_config={"temperature": 0.7, "max_output_tokens": 1000},
     )
 
+    # Caption yang sama diminta ulang dari UI → ambil dari cache, hemat kuota
+    cache     = get_llm_cache()
+    cache_key = cache.key(gcfg.model, prompt, 0.7, max_tokens=1000) if cache else None
+
     try:
-        raw    = model.generate_content(prompt).text
+        raw = cache.get_text(cache_key) if cache_key else None
+        if raw is None:
+            raw = model.generate_content(prompt).text
+            if cache_key and _extract_json(raw):
+                cache.put_text(cache_key, raw, gcfg.model)
         result = _extract_json(raw)
         return result or {
             "short": clip.get("caption_suggestion", ""),
@@ -12,21 +12,32 @@ Kenapa Groq:
 Daftar API key gratis: https://console.groq.com (pakai akun Google)
 """
 
+import contextvars
 import json
 import re
-import time
+import threading
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
 from pathlib import Path
 from typing import Callable, Optional
 
-from config.settings import ClipConfig, log
+from config.settings import ClipConfig, PrerankConfig, log
 from config.prompts import DAKWAH_ANALYSIS_PROMPT, DEFAULT_HASHTAGS
+from core.groq_client import get_client, GroqAuthError
+from core.compactor import compact_segments, format_unit, format_units, count_tokens
+from core import preranker, audio_features
 
 # Model Groq terbaik untuk analisis teks
 GROQ_MODEL        = "llama-3.3-70b-versatile"
 GROQ_MODEL_FAST   = "llama-3.1-8b-instant"   # fallback kalau 70B kena limit
-GROQ_API_URL      = "https://api.groq.com/openai/v1/chat/completions"
-MAX_TRANSCRIPT_CHARS = 12000   # batasi panjang transkrip yang dikirim per request
+WINDOW_TOKENS     = 3000    # budget transkrip per request (window map-reduce)
+MAX_OUTPUT_TOKENS = 4096
+MODEL_CONTEXT     = {                  # context window per model (token)
+    "llama-3.3-70b-versatile": 131072,
+    "llama-3.1-8b-instant":    131072,
+}
+DEFAULT_CONTEXT   = 8192
 
 
 # ─── Main Entry ──────────────────────────────────────────────────────────────
@@ -36,14 +47,27 @@ def analyze(
     clip_config: Optional[ClipConfig] = None,
     groq_api_key: str = "",
     progress_callback: Optional[Callable[[str, float], None]] = None,
+    model: str = GROQ_MODEL,
+    prerank_config: Optional[PrerankConfig] = None,
+    audio_features_path: Optional[Path] = None,
 ) -> dict:
     """
     Analisis transkrip ceramah → temukan segmen viral terbaik.
 
+    Kalau numpy ada, pre-ranker lokal memilih top-K kandidat dulu dan
+    hanya potongan itu yang dikirim ke Groq; kalau Groq gagal (rate limit /
+    koneksi), ranking lokal dipakai sebagai hasil.
+
+    Transkrip panjang dibagi ke window yang saling overlap (map), tiap
+    window dianalisis paralel, lalu kandidatnya digabung (reduce) —
+    seluruh ceramah teranalisis, bukan cuma ~15 menit pertama.
+
     Args:
         transcript: hasil dari whisper_transcriber.transcribe()
         clip_config: berisi num_clips, min_duration, max_duration
         groq_api_key: key dari console.groq.com (gratis)
+        prerank_config: seleksi kandidat lokal (core/preranker.py)
+        audio_features_path: audio_features.npy (sinyal excitement untuk pre-ranker)
 
     Returns:
         {
@@ -63,8 +87,8 @@ def analyze(
         )
 
     ccfg      = clip_config or ClipConfig()
+    pcfg      = prerank_config or PrerankConfig()
     segments  = transcript.get("segments", [])
-    full_text = transcript.get("full_text", "")
     duration  = transcript.get("duration", 0)
 
     if not segments:
@@ -72,18 +96,42 @@ def analyze(
 
     log.info("Mulai analisis Groq: %d segmen, durasi=%.0fs", len(segments), duration)
 
-    # ── Bagi transkrip kalau terlalu panjang ─────────────────────────────
-    transcript_text = _format_transcript_for_llm(segments, max_chars=MAX_TRANSCRIPT_CHARS)
-    _progress(progress_callback, 0.15)
-
-    # ── Kirim ke Groq ─────────────────────────────────────────────────────
-    prompt = _build_prompt(transcript_text, ccfg, duration)
-    raw_response = _call_groq(prompt, groq_api_key, progress_callback)
+    # ── Pre-rank lokal: hanya kandidat terbaik yang dikirim ──────────────
+    units      = compact_segments(segments)
+    audio      = audio_features.load(audio_features_path) if audio_features_path else None
+    candidates = _prerank(units, ccfg, pcfg, pcfg.top_k or ccfg.num_clips * 3, audio)
+    llm_units  = preranker.shortlist_units(units, candidates, pcfg.context_sec) if candidates else units
 
-    _progress(progress_callback, 0.80)
+    # ── Map: window overlap, dikirim paralel ─────────────────────────────
+    windows = _split_windows(llm_units, _window_budget(model, ccfg), overlap_sec=ccfg.max_duration)
+    log.info("Transkrip: %d segmen → %d unit (%d dikirim), dibagi ke %d window",
+             len(segments), len(units), len(llm_units), len(windows))
+    _progress(progress_callback, 0.15)
 
-    # ── Parse respons JSON dari LLM ────────────────────────────────────────
-    result = _parse_response(raw_response, segments, ccfg)
+    failed = []
+    try:
+        results, failed = _analyze_windows(
+            windows, ccfg, groq_api_key, model, duration,
+            partial=len(windows) > 1,
+            shortlist=bool(candidates),
+            progress=lambda pct: _progress(progress_callback, 0.15 + pct * 0.70),
+        )
+    except GroqAuthError:
+        raise
+    except Exception as e:
+        if not (candidates and pcfg.offline_fallback):
+            raise
+        log.warning("Groq gagal (%s) — pakai ranking lokal", e)
+        result = _parse_response(json.dumps(preranker.to_analysis(units, candidates, ccfg)), units, ccfg)
+        result["offline"] = True        # bukan hasil LLM → jangan di-cache (run.py)
+        results = [result]
+
+    # ── Reduce: gabung + dedup kandidat ───────────────────────────────────
+    result = results[0] if len(results) == 1 else _merge_candidates(results, ccfg)
+    if failed:
+        # Sebagian transkrip tidak dianalisis → hasil tidak boleh di-cache (run.py)
+        result["partial"] = True
+        log.warning("Analisis Groq tidak lengkap: %d/%d window gagal", len(failed), len(windows))
 
     _progress(progress_callback, 1.0)
     log.info("Groq analisis selesai: %d segmen ditemukan, tema=%s",
@@ -92,25 +140,270 @@ def analyze(
     return result
 
 
-# ─── Helpers ─────────────────────────────────────────────────────────────────
+# ─── Streaming (analisis selagi Whisper jalan) ───────────────────────────────
+
+class StreamingAnalyzer:
+    """
+    Terima segmen transkrip satu per satu (dari whisper_transcriber), kirim
+    ke Groq per window `window_sec` detik audio selagi transkripsi masih
+    jalan, lalu gabungkan kandidat di finish().
+
+    Tiap window membawa ekor `max_duration` detik dari window sebelumnya,
+    supaya momen yang melewati batas window tetap utuh; duplikatnya
+    dibuang di _merge_candidates.
+
+    slot() (opsional) → context manager yang dipegang selama satu request,
+    misal slot resource "groq" dari job queue.
+    """
+
+    def __init__(
+        self,
+        clip_config: Optional[ClipConfig] = None,
+        groq_api_key: str = "",
+        window_sec: int = 600,
+        model: str = GROQ_MODEL,
+        slot: Optional[Callable] = None,
+        prerank_config: Optional[PrerankConfig] = None,
+        audio_features_path: Optional[Path] = None,
+    ):
+        self.ccfg       = clip_config or ClipConfig()
+        self.pcfg       = prerank_config or PrerankConfig()
+        self.audio_path = audio_features_path   # ditulis transcriber begitu decode audio selesai
+        self.api_key    = groq_api_key
+        self.window_sec = max(60, window_sec)
+        self.model      = model
+        self.slot       = slot or nullcontext
+        self._buf       = []
+        self._win_start = 0.0
+        self._sent_end  = 0.0
+        self._futures   = []
+        self._lock      = threading.Lock()
+        self._pool      = ThreadPoolExecutor(max_workers=1, thread_name_prefix="groq-stream")
+
+    def feed(self, seg: dict):
+        """Dipanggil per segmen Whisper. Tidak pernah raise."""
+        with self._lock:
+            self._buf.append(seg)
+            if seg.get("end", 0) - self._win_start >= self.window_sec:
+                self._flush()
+
+    def finish(self, duration: float = 0) -> dict:
+        """
+        Kirim sisa transkrip, tunggu semua window, gabungkan hasilnya.
+        Window yang gagal diulang sekali; kalau tetap gagal hasilnya
+        ditandai partial (tidak di-cache run.py).
+        """
+        with self._lock:
+            if self._buf and self._buf[-1].get("end", 0) > self._sent_end:
+                self._flush()
+        results, partial, last_error = [], False, None
+        for fut, window in self._futures:
+            try:
+                res, complete = self._result(fut, window)
+                results.extend(res)
+                partial = partial or not complete
+            except Exception as e:
+                log.warning("Window analisis Groq gagal: %s", e)
+                partial, last_error = True, e
+        self._pool.shutdown()
+        if not results:
+            raise last_error or RuntimeError("Transkrip kosong — tidak ada yang bisa dianalisis.")
+        merged = _merge_candidates(results, self.ccfg)
+        if partial:
+            merged["partial"] = True
+        log.info("Streaming analisis: %d window → %d klip (durasi=%.0fs)",
+                 len(results), len(merged["segments"]), duration)
+        return merged
+
+    def abort(self):
+        """Transkripsi gagal/di-cancel: buang window yang belum terkirim."""
+        for fut, _ in self._futures:
+            fut.cancel()
+        self._pool.shutdown(wait=False)
+
+    def _flush(self):
+        window   = list(self._buf)
+        win_from = self._win_start
+        win_to   = window[-1].get("end", 0)
+        self._sent_end  = win_to
+        self._win_start = win_to
+        # Ekor window ini ikut ke window berikutnya sebagai konteks
+        self._buf = [s for s in window if s.get("end", 0) > win_to - self.ccfg.max_duration]
+        ctx = contextvars.copy_context()
+        fut = self._pool.submit(ctx.run, self._analyze, window, win_from, win_to)
+        self._futures.append((fut, (window, win_from, win_to)))
+        log.info("Window analisis %s–%s dikirim ke Groq", _fmt_time(win_from), _fmt_time(win_to))
+
+    def _result(self, fut, window: tuple) -> tuple:
+        """(hasil, lengkap?) satu window; kalau ada yang gagal, window diulang sekali."""
+        try:
+            results, failed = fut.result()
+            if not failed:
+                return results, True
+            log.warning("Window analisis %s–%s: %d bagian gagal, diulang",
+                        _fmt_time(window[1]), _fmt_time(window[2]), len(failed))
+        except GroqAuthError:
+            raise
+        except Exception as e:
+            log.warning("Window analisis %s–%s gagal (%s), diulang",
+                        _fmt_time(window[1]), _fmt_time(window[2]), e)
+        # Bagian yang sudah berhasil diambil dari cache LLM, bukan request baru
+        results, failed = self._analyze(*window)
+        return results, not failed
+
+    def _analyze(self, window: list, win_from: float, win_to: float) -> tuple:
+        # Window audio bisa melebihi budget token (bicara cepat) → pecah lagi
+        units = compact_segments(window)
+        if not units:
+            return [], []
+        # Per window cukup num_clips kandidat; top-N akhir dipilih di finish()
+        audio      = audio_features.load(self.audio_path) if self.audio_path else None
+        candidates = _prerank(units, self.ccfg, self.pcfg, max(2, self.ccfg.num_clips), audio)
+        if candidates:
+            units = preranker.shortlist_units(units, candidates, self.pcfg.context_sec)
+        parts = _split_windows(units, _window_budget(self.model, self.ccfg),
+                               overlap_sec=self.ccfg.max_duration)
+        return _analyze_windows(parts, self.ccfg, self.api_key, self.model, win_to,
+                                partial=True, shortlist=bool(candidates), slot=self.slot)
+
+
+def _merge_candidates(results: list, ccfg: ClipConfig) -> dict:
+    """
+    Gabungkan hasil beberapa window: kandidat yang overlap lebih dari
+    overlap_tolerance detik dianggap momen yang sama (ambil skor tertinggi),
+    lalu top-N kronologis seperti analyze().
+    """
+    candidates = [seg for r in results for seg in r.get("segments", [])]
+    candidates.sort(key=lambda s: s["viral_score"], reverse=True)
+
+    picked = []
+    for seg in candidates:
+        dup = any(
+            min(seg["end_time"], p["end_time"]) - max(seg["start_time"], p["start_time"])
+            > ccfg.overlap_tolerance
+            for p in picked
+        )
+        if not dup:
+            picked.append(seg)
+        if len(picked) >= ccfg.num_clips:
+            break
+
+    picked.sort(key=lambda s: s["start_time"])
+    for i, seg in enumerate(picked):
+        seg["id"] = f"clip_{i+1:03d}"
+
+    themes = [r.get("dominant_theme") for r in results if r.get("dominant_theme")]
+    return {
+        "segments":       picked,
+        "video_summary":  " ".join(r.get("video_summary", "") for r in results).strip()[:500],
+        "dominant_theme": max(set(themes), key=themes.count) if themes else "",
+        "speaker_style":  next((r["speaker_style"] for r in results if r.get("speaker_style")), ""),
+    }
+
+
+# ─── Map-Reduce ──────────────────────────────────────────────────────────────
+
+def _window_budget(model: str, ccfg: ClipConfig) -> int:
+    """Token transkrip per window: WINDOW_TOKENS, dibatasi context window model."""
+    overhead = count_tokens(_build_prompt("", ccfg, 0, window=(0, 0)))
+    room     = MODEL_CONTEXT.get(model, DEFAULT_CONTEXT) - overhead - MAX_OUTPUT_TOKENS
+    return max(500, min(WINDOW_TOKENS, room))
+
+
+def _prerank(units: list, ccfg: ClipConfig, pcfg: PrerankConfig, top_k: int, audio=None) -> list:
+    """Kandidat pre-ranker, [] kalau nonaktif / numpy tidak ada / gagal."""
+    if not pcfg.enabled or not units or not preranker.available():
+        return []
+    try:
+        return preranker.rank(units, ccfg, top_k, audio)
+    except Exception as e:
+        log.warning("Pre-ranker gagal (%s), transkrip dikirim penuh", e)
+        return []
+
 
-def _format_transcript_for_llm(segments: list, max_chars: int = 12000) -> str:
-    """Format transkrip ke teks dengan timestamp — mudah dibaca LLM."""
-    lines = []
-    total = 0
+def _split_windows(segments: list, max_tokens: int = WINDOW_TOKENS, overlap_sec: float = 90.0) -> list:
+    """
+    Bagi unit transkrip (hasil compact_segments) ke window dengan budget token. Window berikutnya dimulai
+    `overlap_sec` detik sebelum akhir window sebelumnya (maksimal separuh
+    budget), supaya momen di perbatasan tetap utuh di salah satu window.
+    """
+    windows, cur, cur_tokens = [], [], 0
     for seg in segments:
-        start = seg.get("start", 0)
-        end   = seg.get("end", 0)
-        text  = seg.get("text", "").strip()
-        if not text:
+        line = format_unit(seg)
+        if not line:
             continue
-        line = f"[{_fmt_time(start)} → {_fmt_time(end)}] {text}"
-        total += len(line)
-        if total > max_chars:
-            lines.append(f"... (transkrip dipotong, total lebih dari {max_chars} karakter)")
-            break
-        lines.append(line)
-    return "\n".join(lines)
+        tokens = count_tokens(line)
+        if cur and cur_tokens + tokens > max_tokens:
+            windows.append(cur)
+            tail_from = cur[-1].get("end", 0) - overlap_sec
+            cur = [s for s in cur if s.get("end", 0) > tail_from]
+            cur_tokens = sum(count_tokens(format_unit(s)) for s in cur)
+            while cur and cur_tokens > max_tokens // 2:
+                cur_tokens -= count_tokens(format_unit(cur.pop(0)))
+        cur.append(seg)
+        cur_tokens += tokens
+    if cur:
+        windows.append(cur)
+    return windows
+
+
+def _analyze_windows(
+    windows: list,
+    ccfg: ClipConfig,
+    api_key: str,
+    model: str,
+    total_duration: float,
+    partial: bool = True,
+    shortlist: bool = False,
+    slot: Optional[Callable] = None,
+    progress: Optional[Callable[[float], None]] = None,
+) -> tuple:
+    """
+    Kirim semua window ke Groq sekaligus; concurrency dan rate limit diatur
+    client (core/groq_client). slot() dipegang selama seluruh batch.
+    Return (hasil per window, window yang gagal). Window gagal tidak
+    menghentikan yang lain; error hanya di-raise kalau SEMUA gagal.
+    """
+    client = get_client()
+
+    def prompt(window):
+        span = (window[0].get("start", 0), window[-1].get("end", 0)) if partial else None
+        return _build_prompt(_format_transcript_for_llm(window), ccfg, total_duration,
+                             window=span, shortlist=shortlist)
+
+    results, failed, last_error = [], [], None
+    with (slot or nullcontext)():
+        futures = {
+            client.submit(prompt(w), api_key, model, fallback_model=GROQ_MODEL_FAST,
+                          validate=_is_analysis): w
+            for w in windows
+        }
+        try:
+            for n, fut in enumerate(as_completed(futures), 1):
+                try:
+                    results.append(_parse_response(fut.result(), futures[fut], ccfg))
+                except GroqAuthError:
+                    raise                  # semua key ditolak → percuma lanjut
+                except Exception as e:
+                    log.warning("Window analisis Groq gagal: %s", e)
+                    failed.append(futures[fut])
+                    last_error = e
+                if progress:
+                    progress(n / len(futures))
+        finally:
+            for fut in futures:
+                fut.cancel()
+
+    if not results:
+        raise last_error or RuntimeError("Semua window analisis Groq gagal.")
+    return results, failed
+
+
+# ─── Helpers ─────────────────────────────────────────────────────────────────
+
+def _format_transcript_for_llm(units: list) -> str:
+    """Format unit transkrip ke teks prompt ("[detik] kalimat")."""
+    return format_units(units)
 
 
 def _fmt_time(secs: float) -> str:
@@ -118,18 +411,34 @@ def _fmt_time(secs: float) -> str:
     return f"{m:02d}:{s:02d}"
 
 
-def _build_prompt(transcript_text: str, ccfg: ClipConfig, total_duration: float) -> str:
-    """Buat prompt analisis dakwah untuk LLM."""
+def _build_prompt(
+    transcript_text: str,
+    ccfg: ClipConfig,
+    total_duration: float,
+    window: Optional[tuple] = None,
+    shortlist: bool = False,
+) -> str:
+    """
+    Buat prompt analisis dakwah untuk LLM. window=(dari, sampai) → hanya
+    sebagian video; shortlist → transkrip berisi kandidat pre-ranker saja.
+    """
+    part = ""
+    if window:
+        part = (f"- Bagian yang dianalisis: {_fmt_time(window[0])} – {_fmt_time(window[1])} "
+                f"(potongan dari video yang lebih panjang)\n")
+    if shortlist:
+        part += ("- Transkrip hanya berisi potongan kandidat hasil seleksi awal; "
+                 "(...) = bagian yang dilewati. Pilih klip hanya dari potongan ini.\n")
     return f"""{DAKWAH_ANALYSIS_PROMPT}
 
 ---
 
 ## DATA VIDEO:
 - Durasi total: {int(total_duration // 60)} menit {int(total_duration % 60)} detik
-- Jumlah klip diminta: {ccfg.num_clips}
+{part}- Jumlah klip diminta: {ccfg.num_clips}
 - Durasi klip: {ccfg.min_duration}–{ccfg.max_duration} detik
 
-## TRANSKRIP (dengan timestamp):
+## TRANSKRIP (angka dalam [ ] = detik mulai kalimat):
 {transcript_text}
 
 ---
@@ -162,97 +471,44 @@ Berikan HANYA JSON valid (tanpa penjelasan, tanpa markdown code block), format p
 
 Kategori yang valid: knowledge, viral_quote, emotional, quran_hadith, beginner
 Viral score: 1.0–10.0 (10 = paling viral)
-Pastikan start_time dan end_time tepat sesuai timestamp transkrip di atas.
+Pastikan start_time dan end_time (dalam detik) diambil dari penanda [detik] di transkrip atas.
 Jangan tambahkan teks apapun selain JSON."""
 
 
-def _call_groq(
-    prompt: str,
-    api_key: str,
-    progress_callback,
-    model: str = GROQ_MODEL,
-    retry: int = 0,
-) -> str:
-    """Panggil Groq API dengan retry otomatis kalau kena rate limit."""
-    import urllib.request
-    import urllib.error
-
-    _progress(progress_callback, 0.20 + retry * 0.1)
-
-    payload = json.dumps({
-        "model":       model,
-        "messages":    [{"role": "user", "content": prompt}],
-        "temperature": 0.3,
-        "max_tokens":  4096,
-        "response_format": {"type": "json_object"},   # paksa JSON output
-    }).encode("utf-8")
-
-    req = urllib.request.Request(
-        GROQ_API_URL,
-        data=payload,
-        headers={
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type":  "application/json",
-            "User-Agent":    "MahiraClipper/2.0 (Python)",  # FIX: Cloudflare blokir tanpa User-Agent
-        },
-        method="POST",
-    )
-
-    try:
-        with urllib.request.urlopen(req, timeout=60) as resp:
-            body = json.loads(resp.read().decode("utf-8"))
-            content = body["choices"][0]["message"]["content"]
-            usage   = body.get("usage", {})
-            log.info("Groq response: %d tokens, model=%s", usage.get("total_tokens", 0), model)
-            return content
-
-    except urllib.error.HTTPError as e:
-        body_raw = e.read().decode("utf-8", errors="replace")
-        if e.code == 429:
-            # Rate limit — tunggu dan retry
-            wait = 15 * (retry + 1)
-            log.warning("Groq rate limit! Tunggu %d detik...", wait)
-            if progress_callback:
-                progress_callback("analyze", 0.3)
-            time.sleep(wait)
-            if retry < 3:
-                return _call_groq(prompt, api_key, progress_callback, model, retry + 1)
-            # Fallback ke model lebih kecil
-            if model != GROQ_MODEL_FAST:
-                log.warning("Fallback ke model lebih kecil: %s", GROQ_MODEL_FAST)
-                return _call_groq(prompt, api_key, progress_callback, GROQ_MODEL_FAST, 0)
-            raise RuntimeError("Groq rate limit habis. Coba lagi besok atau ganti API key.")
-        elif e.code == 401:
-            raise ValueError(
-                "Groq API key tidak valid!\n"
-                "Pastikan API key benar di Settings.\n"
-                "Daftar baru di: https://console.groq.com"
-            )
-        else:
-            raise RuntimeError(f"Groq API error {e.code}: {body_raw[:300]}")
-
-    except Exception as e:
-        raise RuntimeError(f"Koneksi ke Groq gagal: {e}")
-
-
-def _parse_response(raw: str, segments: list, ccfg: ClipConfig) -> dict:
-    """Parse JSON dari LLM, validasi, dan normalize."""
+def _load_json(raw: str) -> dict:
+    """JSON dari teks LLM (fence markdown / teks di sekitar objek dibuang)."""
     # Strip markdown fence kalau ada
     raw = re.sub(r"```(?:json)?", "", raw).strip()
 
     try:
-        data = json.loads(raw)
-    except json.JSONDecodeError as e:
-        log.error("Gagal parse JSON dari Groq: %s\nRaw: %s", e, raw[:500])
+        return json.loads(raw)
+    except json.JSONDecodeError:
         # Coba ekstrak JSON dengan regex
         m = re.search(r'\{[\s\S]*\}', raw)
         if m:
             try:
-                data = json.loads(m.group())
+                return json.loads(m.group())
             except Exception:
                 raise RuntimeError(f"Groq mengembalikan JSON tidak valid: {raw[:200]}")
-        else:
-            raise RuntimeError(f"Groq tidak mengembalikan JSON. Response: {raw[:200]}")
+        raise RuntimeError(f"Groq tidak mengembalikan JSON. Response: {raw[:200]}")
+
+
+def _is_analysis(raw: str) -> bool:
+    """Respons layak di-cache: objek JSON dengan list "segments" (bukan teks terpotong)."""
+    try:
+        data = _load_json(raw or "")
+    except RuntimeError:
+        return False
+    return isinstance(data, dict) and isinstance(data.get("segments"), list)
+
+
+def _parse_response(raw: str, segments: list, ccfg: ClipConfig) -> dict:
+    """Parse JSON dari LLM, validasi, dan normalize."""
+    try:
+        data = _load_json(raw)
+    except RuntimeError:
+        log.error("Gagal parse JSON dari Groq\nRaw: %s", raw[:500])
+        raise
 
     raw_segs = data.get("segments", [])
 
@@ -287,7 +543,7 @@ def _parse_response(raw: str, segments: list, ccfg: ClipConfig) -> dict:
             "viral_score":      round(score, 1),
             "hook":             str(seg.get("hook", ""))[:200],
             "caption_suggestion": str(seg.get("caption_suggestion", ""))[:200],
-            "hashtags":         seg.get("hashtags", DEFAULT_HASHTAGS)[:10],
+            "hashtags":         (seg.get("hashtags") or DEFAULT_HASHTAGS.get(cat, DEFAULT_HASHTAGS["knowledge"]))[:10],
             "reason":           str(seg.get("reason", ""))[:200],
             "start_time_ref":   str(seg.get("start_time_ref", ""))[:100],
             "end_time_ref":     str(seg.get("end_time_ref", ""))[:100],
@@ -327,17 +583,12 @@ def _progress(cb, val: float):
 
 def check_groq_key(api_key: str) -> tuple[bool, str]:
     """Cek apakah Groq API key valid."""
-    import urllib.request, urllib.error
-    req = urllib.request.Request(
-        "https://api.groq.com/openai/v1/models",
-        headers={"Authorization": f"Bearer {api_key}"},
-    )
     try:
-        with urllib.request.urlopen(req, timeout=10) as r:
-            return True, "OK"
-    except urllib.error.HTTPError as e:
-        if e.code == 401:
-            return False, "API key tidak valid"
-        return False, f"Error {e.code}"
+        status, _ = get_client().check_key(api_key)
     except Exception as e:
         return False, f"Koneksi gagal: {e}"
+    if status == 200:
+        return True, "OK"
+    if status == 401:
+        return False, "API key tidak valid"
+    return False, f"Error {status}"
@@ -0,0 +1,432 @@
+"""
+MahiraClipper — Groq Client
+Client HTTP asyncio untuk Groq dengan koneksi keep-alive, rate limit
+berbasis header, dan rotasi beberapa API key.
+
+  - Koneksi HTTPS dipakai ulang (pool per host) → tidak ada TLS handshake
+    per request.
+  - Tiap (API key, model) punya token bucket (request & token) yang
+    diisi dari header x-ratelimit-* Groq. Request menunggu sampai bucket
+    cukup, bukan sleep tetap 15/30/45 detik.
+  - 429 → key itu diblok sesuai Retry-After, request pindah ke key lain.
+    Kalau semua key masih diblok lebih lama dari MAX_WAIT_SEC, pindah ke
+    model fallback (GROQ_MODEL_FAST).
+  - Banyak request jalan bersamaan di satu event loop (thread daemon),
+    dibatasi semaphore max_concurrency.
+
+Respons sukses disimpan di cache LLM (core/cache.get_llm_cache) —
+prompt yang sama untuk model + temperature yang sama tidak dikirim ulang.
+Hanya respons yang lolos validate(content) (default: JSON valid di
+json_mode) yang di-cache; respons terpotong tidak diputar ulang.
+
+Pemanggil tetap sinkron: submit() → concurrent.futures.Future,
+chat() → string. Transport pakai http.client (stdlib) lewat
+asyncio.to_thread, jadi tidak butuh dependency tambahan.
+"""
+
+import asyncio
+import http.client
+import json
+import re
+import threading
+import time
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+
+from config.settings import log
+from core.cache import get_llm_cache
+
+GROQ_API_URL     = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_MODELS_URL  = "https://api.groq.com/openai/v1/models"
+USER_AGENT       = "MahiraClipper/2.0 (Python)"   # Cloudflare blokir tanpa User-Agent
+MAX_CONCURRENCY  = 8       # request bersamaan (semua job)
+MAX_WAIT_SEC     = 60.0    # lebih lama dari ini → coba model fallback
+MAX_ATTEMPTS     = 6       # percobaan per model (429 / 5xx / koneksi putus)
+REQUEST_TIMEOUT  = 60
+
+_client      = None
+_client_lock = threading.Lock()
+
+
+class GroqAuthError(ValueError):
+    """Semua API key ditolak (401)."""
+
+
+class GroqRateLimited(RuntimeError):
+    """Semua key kena rate limit terlalu lama."""
+
+
+# ─── Rate Limit ───────────────────────────────────────────────────────────────
+
+class TokenBucket:
+    """
+    Bucket dengan kapasitas `limit` yang terisi linear. Level dan laju
+    isi ulang dikoreksi setiap kali Groq mengirim header remaining/reset.
+    """
+
+    def __init__(self, limit: float = 0, per_sec: float = 0):
+        self.limit   = limit       # 0 = belum tahu → tidak membatasi
+        self.level   = limit
+        self.per_sec = per_sec
+        self.stamp   = time.monotonic()
+
+    def _refill(self, now: float):
+        if self.limit and self.per_sec:
+            self.level = min(self.limit, self.level + (now - self.stamp) * self.per_sec)
+        self.stamp = now
+
+    def wait_time(self, cost: float, now: float) -> float:
+        """Detik sampai `cost` bisa diambil (0 = sekarang)."""
+        if not self.limit:
+            return 0.0
+        self._refill(now)
+        need = min(cost, self.limit) - self.level
+        if need <= 0:
+            return 0.0
+        return need / self.per_sec if self.per_sec else MAX_WAIT_SEC
+
+    def take(self, cost: float):
+        if self.limit:
+            self.level -= min(cost, self.limit)
+
+    def observe(self, limit: Optional[float], remaining: Optional[float], reset: Optional[float]):
+        """Sinkronkan dengan header Groq (limit, remaining, detik sampai penuh)."""
+        if limit:
+            self.limit = limit
+        if remaining is None or not self.limit:
+            return
+        self.stamp = time.monotonic()
+        self.level = min(self.level, remaining) if self.level > 0 else remaining
+        if reset and reset > 0:
+            self.per_sec = max(self.limit - remaining, 1) / reset
+
+
+class _KeyState:
+    """Status rate limit satu (API key, model)."""
+
+    def __init__(self):
+        self.requests      = TokenBucket()
+        self.tokens        = TokenBucket()
+        self.blocked_until = 0.0
+
+    def wait_time(self, cost: int, now: float) -> float:
+        return max(
+            self.blocked_until - now,
+            self.requests.wait_time(1, now),
+            self.tokens.wait_time(cost, now),
+        )
+
+    def take(self, cost: int):
+        self.requests.take(1)
+        self.tokens.take(cost)
+
+    def observe(self, headers: dict):
+        self.requests.observe(
+            _num(headers.get("x-ratelimit-limit-requests")),
+            _num(headers.get("x-ratelimit-remaining-requests")),
+            _duration(headers.get("x-ratelimit-reset-requests")),
+        )
+        self.tokens.observe(
+            _num(headers.get("x-ratelimit-limit-tokens")),
+            _num(headers.get("x-ratelimit-remaining-tokens")),
+            _duration(headers.get("x-ratelimit-reset-tokens")),
+        )
+
+
+# ─── Transport ────────────────────────────────────────────────────────────────
+
+# Koneksi keep-alive basi: ditutup server sebelum request diterima → aman dikirim ulang
+_STALE_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+class _ConnectionPool:
+    """Pool HTTPSConnection keep-alive untuk satu host."""
+
+    def __init__(self, host: str, timeout: int = REQUEST_TIMEOUT):
+        self.host    = host
+        self.timeout = timeout
+        self._idle   = []
+        self._lock   = threading.Lock()
+
+    def request(self, method: str, path: str, body: Optional[bytes], headers: dict):
+        """Blocking — dipanggil lewat asyncio.to_thread. Return (status, headers, body)."""
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        reused = conn is not None
+        conn   = conn or http.client.HTTPSConnection(self.host, timeout=self.timeout)
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+        except _STALE_ERRORS:
+            conn.close()
+            if not reused:
+                raise
+            # Koneksi idle sudah ditutup server sebelum ada respons → ulang dengan koneksi baru
+            return self.request(method, path, body, headers)
+        except (http.client.HTTPException, OSError):
+            # Timeout dll.: server mungkin sudah memproses body → jangan kirim ulang
+            conn.close()
+            raise
+        try:
+            data = resp.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            raise
+
+        resp_headers = {k.lower(): v for k, v in resp.getheaders()}
+        if resp_headers.get("connection", "").lower() == "close":
+            conn.close()
+        else:
+            with self._lock:
+                self._idle.append(conn)
+        return resp.status, resp_headers, data
+
+    def close(self):
+        with self._lock:
+            for conn in self._idle:
+                conn.close()
+            self._idle.clear()
+
+
+# ─── Client ───────────────────────────────────────────────────────────────────
+
+class GroqClient:
+    """
+    Satu event loop di thread daemon untuk semua request Groq di proses ini,
+    supaya status rate limit per key dipakai bersama semua job.
+    """
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY):
+        self.max_concurrency = max(1, max_concurrency)
+        self._states  = {}          # (key, model) → _KeyState
+        self._invalid = set()       # key yang ditolak 401
+        self._pools   = {}
+        self._loop    = asyncio.new_event_loop()
+        self._ready   = threading.Event()
+        self._thread  = threading.Thread(target=self._run_loop, name="groq-client", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._sem   = asyncio.Semaphore(self.max_concurrency)
+        self._state_lock = asyncio.Lock()
+        self._ready.set()
+        self._loop.run_forever()
+
+    # ── API sinkron ─────────────────────────────────────────────────────────
+
+    def submit(self, prompt: str, api_keys, model: str, fallback_model: str = "", **params):
+        """
+        Jadwalkan satu chat completion. Return concurrent.futures.Future[str].
+        params: temperature, max_tokens, json_mode, validate (lihat chat_async).
+        """
+        coro = self.chat_async(prompt, _split_keys(api_keys), model, fallback_model, **params)
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def chat(self, prompt: str, api_keys, model: str, fallback_model: str = "", **params) -> str:
+        return self.submit(prompt, api_keys, model, fallback_model, **params).result()
+
+    def check_key(self, api_key: str) -> tuple:
+        """GET /models dengan satu key → (status, body)."""
+        coro = self._request("GET", GROQ_MODELS_URL, api_key, None)
+        status, _, data = asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+        return status, data
+
+    def set_concurrency(self, n: int):
+        n = max(1, n)
+        if n != self.max_concurrency:
+            self.max_concurrency = n
+            self._loop.call_soon_threadsafe(self._resize, n)
+
+    def _resize(self, n: int):
+        # Request yang sedang jalan tetap memegang semaphore lama sampai selesai
+        self._sem = asyncio.Semaphore(n)
+
+    # ── Async ───────────────────────────────────────────────────────────────
+
+    async def chat_async(
+        self,
+        prompt: str,
+        api_keys: list,
+        model: str,
+        fallback_model: str = "",
+        temperature: float = 0.3,
+        max_tokens: int = 4096,
+        json_mode: bool = True,
+        validate: Optional[Callable[[str], bool]] = None,
+    ) -> str:
+        """validate(content) → False: respons tetap dikembalikan, tapi tidak di-cache."""
+        if validate is None and json_mode:
+            validate = _is_json
+        payload = {
+            "model":       model,
+            "messages":    [{"role": "user", "content": prompt}],
+            "temperature": temperature,
+            "max_tokens":  max_tokens,
+        }
+        if json_mode:
+            payload["response_format"] = {"type": "json_object"}   # paksa JSON output
+        cost = len(prompt) // 4 + max_tokens
+
+        try:
+            return await self._chat_model(payload, api_keys, cost, validate)
+        except GroqRateLimited:
+            if not fallback_model or fallback_model == model:
+                raise
+            log.warning("Semua key Groq kena limit untuk %s, fallback ke %s", model, fallback_model)
+            return await self._chat_model({**payload, "model": fallback_model}, api_keys, cost, validate)
+
+    async def _chat_model(self, payload: dict, api_keys: list, cost: int,
+                          validate: Optional[Callable[[str], bool]] = None) -> str:
+        model = payload["model"]
+        body  = json.dumps(payload).encode("utf-8")
+
+        cache     = get_llm_cache()
+        cache_key = None
+        if cache:
+            cache_key = cache.key(
+                model, payload["messages"][0]["content"], payload["temperature"],
+                max_tokens=payload["max_tokens"], json_mode="response_format" in payload,
+            )
+            cached = await asyncio.to_thread(cache.get_text, cache_key)
+            if cached is not None:
+                return cached
+
+        for attempt in range(MAX_ATTEMPTS):
+            key, state = await self._acquire(api_keys, model, cost)
+            async with self._sem:
+                try:
+                    status, headers, data = await self._request("POST", GROQ_API_URL, key, body)
+                except TimeoutError:
+                    # Request sudah terkirim (dan mungkin ditagih) → tidak dikirim ulang
+                    raise RuntimeError(f"Groq tidak merespons dalam {REQUEST_TIMEOUT} detik ({model})")
+                except (http.client.HTTPException, OSError) as e:
+                    log.warning("Koneksi ke Groq gagal (%s), coba lagi...", e)
+                    await asyncio.sleep(min(2 ** attempt, 10))
+                    continue
+            state.observe(headers)
+
+            if status == 200:
+                resp    = json.loads(data.decode("utf-8"))
+                content = resp["choices"][0]["message"]["content"]
+                usage   = resp.get("usage", {})
+                log.info("Groq response: %d tokens, model=%s, key=…%s",
+                         usage.get("total_tokens", 0), model, key[-4:])
+                if cache_key and (validate is None or validate(content)):
+                    await asyncio.to_thread(cache.put_text, cache_key, content, model)
+                elif cache_key:
+                    log.warning("Respons Groq tidak valid (%d char), tidak di-cache", len(content or ""))
+                return content
+
+            if status == 429:
+                wait = _num(headers.get("retry-after")) or _duration(headers.get("x-ratelimit-reset-tokens")) or 15
+                state.blocked_until = time.monotonic() + wait
+                log.warning("Groq rate limit (key …%s, %s) — key diblok %.0f detik", key[-4:], model, wait)
+                continue
+
+            if status == 401:
+                log.warning("Groq API key …%s ditolak (401), dikeluarkan dari rotasi", key[-4:])
+                self._invalid.add(key)
+                continue
+
+            if status >= 500:
+                log.warning("Groq server error %d, coba lagi...", status)
+                await asyncio.sleep(min(2 ** attempt, 10))
+                continue
+
+            raise RuntimeError(f"Groq API error {status}: {data.decode('utf-8', errors='replace')[:300]}")
+
+        raise GroqRateLimited("Groq rate limit habis. Coba lagi besok atau ganti API key.")
+
+    async def _acquire(self, api_keys: list, model: str, cost: int):
+        """Pilih key yang paling cepat siap, tunggu bucket-nya, lalu ambil jatah."""
+        while True:
+            keys = [k for k in api_keys if k not in self._invalid]
+            if not keys:
+                raise GroqAuthError(
+                    "Groq API key tidak valid!\n"
+                    "Pastikan API key benar di Settings.\n"
+                    "Daftar baru di: https://console.groq.com"
+                )
+            async with self._state_lock:
+                now = time.monotonic()
+                waits = [(self._state(k, model).wait_time(cost, now), i, k) for i, k in enumerate(keys)]
+                wait, _, key = min(waits)
+                if wait <= 0:
+                    state = self._state(key, model)
+                    state.take(cost)
+                    return key, state
+            if wait > MAX_WAIT_SEC:
+                raise GroqRateLimited(f"Semua key Groq kena limit untuk {model} ({wait:.0f} detik)")
+            log.info("Menunggu rate limit Groq %.1f detik (%s)...", wait, model)
+            await asyncio.sleep(min(wait, 5.0))
+
+    def _state(self, key: str, model: str) -> _KeyState:
+        state = self._states.get((key, model))
+        if state is None:
+            state = self._states[(key, model)] = _KeyState()
+        return state
+
+    async def _request(self, method: str, url: str, api_key: str, body: Optional[bytes]):
+        parts = urlsplit(url)
+        pool  = self._pools.get(parts.netloc)
+        if pool is None:
+            pool = self._pools[parts.netloc] = _ConnectionPool(parts.netloc)
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "User-Agent":    USER_AGENT,
+            "Connection":    "keep-alive",
+        }
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+        return await asyncio.to_thread(pool.request, method, parts.path, body, headers)
+
+
+def get_client(max_concurrency: int = 0) -> GroqClient:
+    """Client bersama satu proses (dibuat saat pertama dipakai)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GroqClient(max_concurrency or MAX_CONCURRENCY)
+        elif max_concurrency:
+            _client.set_concurrency(max_concurrency)
+        return _client
+
+
+# ─── Helpers ──────────────────────────────────────────────────────────────────
+
+def _split_keys(api_keys) -> list:
+    """'k1, k2' / ['k1', 'k2'] → list key unik (urutan dipertahankan)."""
+    if isinstance(api_keys, str):
+        api_keys = api_keys.split(",")
+    return list(dict.fromkeys(k.strip() for k in api_keys or [] if k and k.strip()))
+
+
+def _is_json(content) -> bool:
+    try:
+        json.loads(content)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def _num(value) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "") else None
+    except ValueError:
+        return None
+
+
+_DURATION_RE = re.compile(r"([\d.]+)(ms|h|m|s)")
+_DURATION_MUL = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def _duration(value) -> Optional[float]:
+    """Format reset Groq ('7.66s', '2m59.56s', '120ms') → detik."""
+    if not value:
+        return None
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return _num(value)
+    return sum(float(n) * _DURATION_MUL[unit] for n, unit in parts)
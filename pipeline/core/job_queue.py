@@ -0,0 +1,219 @@
+"""
+MahiraClipper — Batch Job Queue
+Antrian banyak video (URL / file) yang disimpan di disk, plus batas
+concurrency per resource.
+
+Tiap job tetap satu run() biasa, tapi beberapa job jalan bersamaan dan
+tiap step mengambil slot resource-nya dulu:
+  download : network-bound      → boleh beberapa sekaligus
+  whisper  : CPU berat          → 1
+  groq     : rate limit API     → 1
+  ffmpeg   : CPU (render)       → 1
+Jadi ceramah B bisa download selagi ceramah A ditranskripsi.
+
+File antrian ditulis atomik setiap status berubah. Kalau proses mati,
+job yang masih "running" dikembalikan ke "pending" dan dilanjutkan lewat
+resume project (step yang sudah selesai tidak diulang).
+"""
+
+import json
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+from config.settings import QueueConfig, log
+
+MAX_HISTORY = 200   # entry selesai yang tetap disimpan di file queue
+
+_semaphores = {}
+_sem_lock   = threading.Lock()
+
+
+# ─── Resource Slots ───────────────────────────────────────────────────────────
+
+def configure_resources(config: Optional[QueueConfig] = None):
+    """Set batas slot per resource. Dipanggil sekali sebelum job jalan."""
+    cfg = config or QueueConfig()
+    with _sem_lock:
+        for name in ("download", "whisper", "groq", "ffmpeg"):
+            limit = max(1, int(getattr(cfg, name)))
+            if name not in _semaphores or _semaphores[name][0] != limit:
+                _semaphores[name] = (limit, threading.BoundedSemaphore(limit))
+
+
+@contextmanager
+def resource(name: str, check: Optional[Callable[[], None]] = None):
+    """
+    Tahan satu slot resource selama blok jalan.
+
+    check() dipanggil tiap detik selama menunggu slot, supaya job yang
+    di-cancel tidak terjebak di antrian resource.
+    """
+    with _sem_lock:
+        entry = _semaphores.get(name)
+    if entry is None:
+        yield
+        return
+
+    sem = entry[1]
+    if not sem.acquire(blocking=False):
+        log.info("Menunggu slot %s...", name)
+        while not sem.acquire(timeout=1.0):
+            if check:
+                check()
+    try:
+        yield
+    finally:
+        sem.release()
+
+
+# ─── Queue ────────────────────────────────────────────────────────────────────
+
+class JobQueue:
+    """Antrian job persistent (satu file JSON)."""
+
+    def __init__(self, path: Path, max_active: int = 4):
+        self.path       = Path(path)
+        self.max_active = max(1, max_active)
+        self._lock      = threading.RLock()
+        self._entries   = self._read()
+        self._secrets   = {}     # API key per job, hanya di memori (tidak ditulis ke disk)
+
+    # ── Persistensi ─────────────────────────────────────────────────────────
+
+    def _read(self) -> list:
+        if not self.path.exists():
+            return []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f).get("jobs", [])
+        except (json.JSONDecodeError, IOError) as e:
+            log.warning("Gagal baca queue %s: %s — mulai kosong.", self.path.name, e)
+            return []
+
+    def _save(self):
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"jobs": self._entries}, f, indent=2, ensure_ascii=True)
+        tmp.replace(self.path)
+
+    # ── Operasi ─────────────────────────────────────────────────────────────
+
+    def enqueue(self, cfg: dict) -> dict:
+        now     = datetime.now().isoformat()
+        job_id  = uuid.uuid4().hex[:8]
+        secrets = {k: v for k, v in cfg.items() if k.endswith("api_key")}
+        entry   = {
+            "id":         job_id,
+            "status":     "pending",
+            "cfg":        {k: v for k, v in cfg.items() if k not in secrets},
+            "project_id": None,
+            "error":      None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        with self._lock:
+            self._secrets[job_id] = secrets
+            self._entries.append(entry)
+            finished = [e for e in self._entries if e["status"] in ("done", "failed", "cancelled")]
+            for old in finished[:max(0, len(finished) - MAX_HISTORY)]:
+                self._entries.remove(old)
+            self._save()
+        return dict(entry)
+
+    def update(self, job_id: str, **fields):
+        with self._lock:
+            for e in self._entries:
+                if e["id"] == job_id:
+                    e.update(fields, updated_at=datetime.now().isoformat())
+                    self._save()
+                    return
+
+    def recover(self) -> int:
+        """Job 'running' dari proses sebelumnya → pending lagi, dilanjutkan via resume."""
+        n = 0
+        with self._lock:
+            for e in self._entries:
+                if e["status"] == "running":
+                    e["status"] = "pending"
+                    if e.get("project_id"):
+                        e["cfg"] = {**e["cfg"], "resume_project_id": e["project_id"]}
+                    n += 1
+            if n:
+                self._save()
+                log.info("Queue: %d job dilanjutkan dari run sebelumnya", n)
+        return n
+
+    def cancel_pending(self, job_id: Optional[str] = None) -> list:
+        """Batalkan job yang belum mulai (semua kalau job_id kosong)."""
+        cancelled = []
+        with self._lock:
+            for e in self._entries:
+                if e["status"] == "pending" and (not job_id or e["id"] == job_id):
+                    e["status"] = "cancelled"
+                    cancelled.append(e["id"])
+            if cancelled:
+                self._save()
+        return cancelled
+
+    def entries(self) -> list:
+        with self._lock:
+            return [dict(e) for e in self._entries]
+
+    def _take_pending(self) -> Optional[dict]:
+        with self._lock:
+            for e in self._entries:
+                if e["status"] == "pending":
+                    e["status"]     = "running"
+                    e["updated_at"] = datetime.now().isoformat()
+                    self._save()
+                    # Setelah restart secret hilang → run() pakai key dari api_config.json
+                    return {**e, "cfg": {**e["cfg"], **self._secrets.pop(e["id"], {})}}
+        return None
+
+    # ── Eksekusi ────────────────────────────────────────────────────────────
+
+    def drain(self, runner: Callable[[dict], str], stop: Optional[Callable[[], bool]] = None):
+        """
+        Jalankan semua job pending sampai antrian kosong, maksimal
+        `max_active` job sekaligus. runner(entry) memblok sampai job selesai
+        dan return status akhir (done / failed / cancelled).
+        Job yang di-enqueue selama drain ikut dijalankan; kalau stop()
+        True, tidak ada job baru yang diambil.
+        """
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_active, thread_name_prefix="queue") as pool:
+            while True:
+                while len(running) < self.max_active and not (stop and stop()):
+                    entry = self._take_pending()
+                    if entry is None:
+                        break
+                    running[pool.submit(runner, entry)] = entry["id"]
+
+                if not running:
+                    break
+
+                done, _ = wait(running, timeout=1.0, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    job_id = running.pop(fut)
+                    try:
+                        status = fut.result() or "done"
+                        self.update(job_id, status=status)
+                    except Exception as e:
+                        log.error("Job queue %s crash: %s", job_id, e)
+                        self.update(job_id, status="failed", error=str(e))
+
+    def has_pending(self) -> bool:
+        with self._lock:
+            return any(e["status"] == "pending" for e in self._entries)
+
+    def summary(self) -> dict:
+        counts = {}
+        for e in self.entries():
+            counts[e["status"]] = counts.get(e["status"], 0) + 1
+        return counts
+
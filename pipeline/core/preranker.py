@@ -0,0 +1,279 @@
+"""
+MahiraClipper — Pre-Ranker Lokal
+Skoring kandidat klip tanpa LLM, sebelum transkrip dikirim ke Groq.
+
+Kandidat = semua rentang unit kalimat (hasil core/compactor) yang
+durasinya masuk ClipConfig.min_duration–max_duration. Fitur per unit
+(kata kunci kategori dari config/prompts.py, frasa pertanyaan, frasa
+pembuka/penutup, jumlah kata, durasi bicara) dijumlahkan per kandidat
+lewat prefix sum, jadi ribuan kandidat dinilai dalam beberapa operasi
+array.
+
+Kalau audio_features.npy ada, excitement audio (loudness, variasi nada,
+jeda sebelum penekanan) ikut dinilai — momen emosional tidak hanya
+ditebak dari teks.
+
+Hasilnya dipakai dua cara:
+  - shortlist_units(): hanya top-K kandidat (+ konteks) yang dikirim ke
+    Groq untuk judul & ranking akhir → token dan latensi jauh berkurang.
+  - to_analysis(): hasil analisis lengkap tanpa Groq (offline fallback
+    kalau Groq kena limit / tidak bisa dihubungi).
+
+numpy di-import saat dipakai; kalau tidak terpasang, available() False
+dan analyzer mengirim transkrip penuh seperti biasa.
+"""
+
+import re
+from typing import Optional
+
+from config.settings import ClipConfig, log
+from config.prompts import CATEGORY_KEYWORDS, QUESTION_CUES, AVOID_CUES
+
+CATEGORIES = ("knowledge", "viral_quote", "emotional", "quran_hadith", "beginner")
+CATEGORY_WEIGHT = {"quran_hadith": 1.5, "emotional": 1.2}   # sisanya 1.0
+
+# Bobot skor kandidat
+W_CUES      = 1.0     # kata kunci kategori per menit
+W_QUESTION  = 0.5     # frasa pertanyaan per menit
+W_AVOID     = 2.0     # salam / pengumuman / doa penutup per menit (penalti)
+W_SPEECH    = 2.0     # porsi durasi yang berisi ucapan
+W_RATE      = 0.5     # kecepatan bicara relatif terhadap median ceramah
+W_HOOK      = 1.0     # kalimat pertama berupa pertanyaan
+W_LENGTH    = 0.5     # preferensi durasi di tengah rentang min–max
+W_AUDIO     = 1.5     # rata-rata excitement audio (core/audio_features)
+EMOTIONAL_EXCITE = 1.0   # tanpa kata kunci tapi excitement setinggi ini → emotional
+
+
+def available() -> bool:
+    try:
+        import numpy  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+# ─── Fitur per Unit ───────────────────────────────────────────────────────────
+
+# Partikel yang boleh menempel di akhir kata kunci ("ingatlah", "apakah")
+_SUFFIX = r"(?:lah|kah|nya)?"
+_patterns = {}
+
+
+def _compile(phrases) -> list:
+    """
+    Satu regex per frasa, hanya cocok di batas kata: "apa" tidak cocok di
+    "siapa", "ayat" tidak di "riwayat". Frasa tanda baca ("?") apa adanya.
+    """
+    key = tuple(phrases)
+    pats = _patterns.get(key)
+    if pats is None:
+        pats = []
+        for p in (p.strip() for p in phrases):
+            if not p:
+                continue
+            head = r"(?<!\w)" if re.match(r"\w", p) else ""
+            tail = _SUFFIX + r"(?!\w)" if re.search(r"\w$", p) else ""
+            pats.append(re.compile(head + re.escape(p) + tail))
+        pats = _patterns[key] = pats
+    return pats
+
+
+def _count(text: str, phrases) -> int:
+    return sum(len(p.findall(text)) for p in _compile(phrases))
+
+
+def unit_features(units: list):
+    """
+    Matriks fitur per unit:
+      cats     (n, 5) jumlah kata kunci per kategori
+      question (n,)   frasa pertanyaan
+      avoid    (n,)   frasa pembuka/penutup/pengumuman
+      words    (n,)   jumlah kata
+      speech   (n,)   durasi unit (detik)
+    """
+    import numpy as np
+
+    n        = len(units)
+    cats     = np.zeros((n, len(CATEGORIES)), dtype=np.float64)
+    question = np.zeros(n)
+    avoid    = np.zeros(n)
+    words    = np.zeros(n)
+    for i, u in enumerate(units):
+        text = " " + re.sub(r"\s+", " ", u.get("text", "").lower()) + " "
+        for c, cat in enumerate(CATEGORIES):
+            cats[i, c] = _count(text, CATEGORY_KEYWORDS.get(cat, ()))
+        question[i] = _count(text, QUESTION_CUES)
+        avoid[i]    = _count(text, AVOID_CUES)
+        words[i]    = len(text.split())
+    speech = np.array([max(0.0, u["end"] - u["start"]) for u in units])
+    return {"cats": cats, "question": question, "avoid": avoid, "words": words, "speech": speech}
+
+
+# ─── Kandidat ─────────────────────────────────────────────────────────────────
+
+def candidate_pairs(starts, ends, min_dur: float, max_dur: float):
+    """
+    Semua pasangan (i, j), i <= j, dengan ends[j] - starts[i] di
+    [min_dur, max_dur]. ends diasumsikan naik (unit kronologis).
+    """
+    import numpy as np
+
+    n  = len(starts)
+    lo = np.searchsorted(ends, starts + min_dur, side="left")
+    hi = np.searchsorted(ends, starts + max_dur, side="right")
+    lo = np.maximum(lo, np.arange(n))
+    counts = np.maximum(hi - lo, 0)
+    total  = int(counts.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    i_idx   = np.repeat(np.arange(n), counts)
+    offsets = np.repeat(np.cumsum(counts) - counts, counts)
+    j_idx   = lo[i_idx] + (np.arange(total) - offsets)
+    return i_idx, j_idx
+
+
+def _prefix(x):
+    import numpy as np
+    pad = np.zeros((1,) + x.shape[1:], dtype=np.float64)
+    return np.concatenate([pad, np.cumsum(x, axis=0)])
+
+
+def score_candidates(units: list, ccfg: ClipConfig, audio=None) -> Optional[dict]:
+    """
+    Skor semua kandidat. audio (opsional) = fitur per detik dari
+    core/audio_features.extract().
+    Return dict array: i, j, start, end, score, category; None kalau kosong.
+    """
+    import numpy as np
+    from core import audio_features
+
+    if not units:
+        return None
+    feats  = unit_features(units)
+    starts = np.array([u["start"] for u in units], dtype=np.float64)
+    ends   = np.array([u["end"] for u in units], dtype=np.float64)
+    i, j   = candidate_pairs(starts, ends, ccfg.min_duration, ccfg.max_duration)
+    if not len(i):
+        return None
+
+    def window_sum(x):
+        p = _prefix(x)
+        return p[j + 1] - p[i]
+
+    dur     = ends[j] - starts[i]
+    per_min = 60.0 / np.maximum(dur, 1.0)
+
+    cats    = window_sum(feats["cats"])
+    weights = np.array([CATEGORY_WEIGHT.get(c, 1.0) for c in CATEGORIES])
+    cues    = (cats * weights).sum(axis=1) * per_min
+
+    speech_frac = np.clip(window_sum(feats["speech"]) / np.maximum(dur, 1.0), 0, 1)
+    rate        = window_sum(feats["words"]) / np.maximum(window_sum(feats["speech"]), 1.0)
+    median_rate = float(np.median(feats["words"] / np.maximum(feats["speech"], 0.5)))
+    rate_score  = np.clip(rate / max(median_rate, 0.1) - 1.0, -1.0, 1.0)
+
+    mid  = (ccfg.min_duration + ccfg.max_duration) / 2
+    half = max((ccfg.max_duration - ccfg.min_duration) / 2, 1.0)
+
+    score = (
+        W_CUES * cues
+        + W_QUESTION * window_sum(feats["question"]) * per_min
+        - W_AVOID * window_sum(feats["avoid"]) * per_min
+        + W_SPEECH * speech_frac
+        + W_RATE * rate_score
+        + W_HOOK * (feats["question"][i] > 0)
+        + W_LENGTH * (1.0 - np.abs(dur - mid) / half)
+    )
+    category = np.where(cats.max(axis=1) > 0, cats.argmax(axis=1), 0)
+
+    excite = np.zeros(len(i))
+    if audio is not None and len(audio):
+        per_unit = audio_features.per_unit(units, audio_features.excitement(audio))
+        excite   = window_sum(per_unit) / np.maximum(dur, 1.0)
+        score    = score + W_AUDIO * excite
+        category = np.where((cats.max(axis=1) == 0) & (excite > EMOTIONAL_EXCITE),
+                            CATEGORIES.index("emotional"), category)
+
+    return {"i": i, "j": j, "start": starts[i], "end": ends[j], "score": score,
+            "category": category, "cats": cats, "rate": rate, "excite": excite}
+
+
+def rank(units: list, ccfg: ClipConfig, top_k: int, audio=None) -> list:
+    """
+    Top-K kandidat yang tidak saling overlap (> overlap_tolerance), urut
+    skor tertinggi. Tiap kandidat: start_time, end_time, duration,
+    category, score, i, j (indeks unit).
+    """
+    scored = score_candidates(units, ccfg, audio)
+    if scored is None:
+        return []
+
+    picked = []
+    for k in scored["score"].argsort()[::-1]:
+        s, e = float(scored["start"][k]), float(scored["end"][k])
+        if any(min(e, p["end_time"]) - max(s, p["start_time"]) > ccfg.overlap_tolerance for p in picked):
+            continue
+        picked.append({
+            "start_time": round(s, 2),
+            "end_time":   round(e, 2),
+            "duration":   round(e - s, 2),
+            "category":   CATEGORIES[int(scored["category"][k])],
+            "score":      float(scored["score"][k]),
+            "cues":       int(scored["cats"][k].sum()),
+            "rate":       float(scored["rate"][k]),
+            "excite":     float(scored["excite"][k]),
+            "i":          int(scored["i"][k]),
+            "j":          int(scored["j"][k]),
+        })
+        if len(picked) >= top_k:
+            break
+
+    log.info("Pre-ranker: %d kandidat dinilai, %d dipilih", len(scored["score"]), len(picked))
+    return picked
+
+
+# ─── Output ───────────────────────────────────────────────────────────────────
+
+def shortlist_units(units: list, candidates: list, context_sec: float = 15.0) -> list:
+    """Unit yang masuk rentang kandidat ± context_sec, urut waktu."""
+    spans = [(c["start_time"] - context_sec, c["end_time"] + context_sec) for c in candidates]
+    return [u for u in units if any(u["end"] > a and u["start"] < b for a, b in spans)]
+
+
+def to_analysis(units: list, candidates: list, ccfg: ClipConfig) -> dict:
+    """
+    Hasil analisis tanpa LLM (format sama dengan respons Groq sebelum
+    _parse_response): judul/hook dari kalimat pertama kandidat.
+    """
+    if not candidates:
+        return {"segments": []}
+    top, low = candidates[0]["score"], candidates[-1]["score"]
+    span     = max(top - low, 1e-6)
+
+    segments = []
+    for n, c in enumerate(candidates[:ccfg.num_clips]):
+        texts = [u["text"] for u in units[c["i"]:c["j"] + 1]]
+        first = texts[0] if texts else ""
+        last  = texts[-1] if texts else ""
+        title = " ".join(first.split()[:8]).rstrip(",.;:")
+        segments.append({
+            "id":                 f"clip_{n+1:03d}",
+            "title":              title[:60] or f"Klip {n+1}",
+            "start_time":         c["start_time"],
+            "end_time":           c["end_time"],
+            "duration":           c["duration"],
+            "category":           c["category"],
+            "viral_score":        round(6.0 + 3.0 * (c["score"] - low) / span, 1),
+            "hook":               first[:200],
+            "caption_suggestion": first[:150],
+            "reason":             (f"Seleksi lokal: {c['cues']} kata kunci, {c['rate']:.1f} kata/detik, "
+                                   f"excitement audio {c.get('excite', 0):.1f}"),
+            "start_time_ref":     first[:100],
+            "end_time_ref":       last[-100:],
+        })
+    return {
+        "segments":       segments,
+        "video_summary":  "",
+        "dominant_theme": "",
+        "speaker_style":  "",
+    }
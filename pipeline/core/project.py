@@ -268,11 +268,13 @@ class ProjectManager:
     # ── Step Tracking ────────────────────────────────────────────────────────
 
     def start_step(self, project: Project, step: str):
-        if step in project.steps:
-            project.steps[step]["status"] = StepStatus.DONE  # mark running
-            project.steps[step]["started_at"] = datetime.now().isoformat()
-            project.status = ProjectStatus(step + "ing") if (step + "ing") in ProjectStatus._value2member_map_ else project.status
-            self.save(project)
+        # Step di luar 6 step default (misal "render") dibuat saat pertama dipakai
+        project.steps.setdefault(step, asdict(PipelineStep(step)))
+        project.steps[step]["status"] = StepStatus.RUNNING
+        project.steps[step]["error"] = None
+        project.steps[step]["started_at"] = datetime.now().isoformat()
+        project.status = ProjectStatus(step + "ing") if (step + "ing") in ProjectStatus._value2member_map_ else project.status
+        self.save(project)
 
     def complete_step(self, project: Project, step: str):
         if step in project.steps:
@@ -290,6 +292,15 @@ class ProjectManager:
         self.save(project)
         log.error("[%s] Step '%s' GAGAL: %s", project.id, step, error)
 
+    def warn_step(self, project: Project, step: str, error: str):
+        """Step opsional gagal tapi pipeline lanjut (fallback) → SKIPPED + error; status project tetap."""
+        if step in project.steps:
+            project.steps[step]["status"] = StepStatus.SKIPPED
+            project.steps[step]["error"] = error
+            project.steps[step]["finished_at"] = datetime.now().isoformat()
+            self.save(project)
+        log.warning("[%s] Step '%s' gagal, dilewati: %s", project.id, step, error)
+
     def skip_step(self, project: Project, step: str):
         if step in project.steps:
             project.steps[step]["status"] = StepStatus.SKIPPED
@@ -0,0 +1,290 @@
+"""
+MahiraClipper — Fused Render
+Satu kali encode per klip: seek + crop/scale + burn ASS + loudness langsung ke final/.
+
+Mode "staged" (cutter → face_crop → subtitle) meng-encode tiap klip 3x dengan
+libx264. Di sini keputusan crop dan file ASS dihitung DULU dari video sumber,
+lalu semuanya digabung ke satu filter graph FFmpeg → 1x decode, 1x encode,
+tanpa generation loss dari encode bertingkat.
+"""
+
+import subprocess
+from dataclasses import asdict
+from pathlib import Path
+from typing import Optional, Callable
+
+from config.settings import FaceConfig, log
+from core.cutter import _build_subtitle_json, _generate_thumbnail, _safe_name
+from core.face_crop import compute_crop_filter, _get_video_info
+from core.subtitle import prepare_ass, ass_filter, _auto_select_style, _filter_segments
+from core.cache import get_cache, make_key, fingerprint_file
+from core.workers import plan_workers, run_parallel, ProgressAggregator
+
+LOUDNORM_FILTER = "loudnorm=I=-14:TP=-1.5:LRA=11"   # target loudness short-form
+
+
+# ─── Single Clip ──────────────────────────────────────────────────────────────
+
+def render_clip_fused(
+    video_path: Path,
+    clip: dict,
+    index: int,
+    final_folder: Path,
+    transcript_segments: list,
+    face_config: Optional[FaceConfig] = None,
+    do_crop: bool = True,
+    target_w: int = 1080,
+    target_h: int = 1920,
+    style_key: Optional[str] = None,
+    font_size_override: Optional[int] = None,
+    v_position: Optional[str] = None,
+    loudnorm: bool = True,
+    skip_existing: bool = True,
+    progress_callback: Optional[Callable[[str, float], None]] = None,
+    threads: int = 0,
+) -> dict:
+    """
+    Render satu klip dari video sumber langsung ke final/ dalam satu encode.
+
+    Returns:
+        dict update untuk clip (final_path, is_subtitled, is_cropped, dst.)
+    """
+    final_folder.mkdir(parents=True, exist_ok=True)
+    subs_folder   = final_folder.parent / "subs"
+    thumbs_folder = final_folder.parent / "thumbnails"
+    subs_folder.mkdir(exist_ok=True)
+    thumbs_folder.mkdir(exist_ok=True)
+
+    safe       = _safe_name(clip.get("title", f"clip_{index}"))
+    filename   = f"{index:03d}_{safe}"
+    output_mp4 = final_folder / f"{filename}_final.mp4"
+    sub_json   = subs_folder / f"{filename}.json"
+    thumb      = thumbs_folder / f"{filename}.jpg"
+
+    start    = float(clip.get("start_time", 0))
+    end      = float(clip.get("end_time", start + 60))
+    duration = end - start
+
+    if duration <= 1:
+        log.warning("Skip segmen durasi terlalu pendek (%.1fs): %s", duration, clip.get("title"))
+        return {}
+
+    if skip_existing and output_mp4.exists() and output_mp4.stat().st_size > 10000:
+        log.info("Skip render (sudah ada): %s", output_mp4.name)
+        return {
+            "is_cut":             True,
+            "final_path":         str(output_mp4),
+            "is_subtitled":       True,
+            "subtitle_json_path": str(sub_json),
+            "thumbnail_path":     str(thumb) if thumb.exists() else None,
+        }
+
+    # Cache: sumber + rentang + semua parameter filter → skip seluruh render
+    cache     = get_cache()
+    cache_key = make_key(
+        "fused", fingerprint_file(video_path), start, end,
+        asdict(face_config or FaceConfig()) if do_crop else None, target_w, target_h,
+        style_key, font_size_override, v_position, loudnorm,
+        _filter_segments(transcript_segments, start, end),
+    )
+    if cache and cache.get_file(cache_key, output_mp4):
+        _build_subtitle_json(clip, sub_json, transcript_segments)
+        _generate_thumbnail(video_path, thumb, offset=start + 2.0)
+        return {
+            "is_cut":             True,
+            "final_path":         str(output_mp4),
+            "is_subtitled":       True,
+            "subtitle_json_path": str(sub_json),
+            "thumbnail_path":     str(thumb) if thumb.exists() else None,
+            "cache_key":          cache_key,
+        }
+
+    _progress(progress_callback, 0.05)
+
+    # ── 1. Keputusan crop (tanpa encode) ──────────────────────────────────
+    crop_vf = ""
+    if do_crop:
+        crop_vf = compute_crop_filter(
+            video_path, config=face_config, target_w=target_w, target_h=target_h,
+            start=start, duration=duration,
+        )
+        if crop_vf is None:
+            log.warning("Crop gagal untuk: %s, render tanpa crop.", clip.get("title", ""))
+            crop_vf = ""
+
+    if crop_vf:
+        out_w, out_h = target_w, target_h
+    else:
+        info  = _get_video_info(video_path) or {}
+        out_w = info.get("width")  or target_w
+        out_h = info.get("height") or target_h
+
+    _progress(progress_callback, 0.3)
+
+    # ── 2. File ASS (waktu relatif terhadap awal klip) ────────────────────
+    clip_style = style_key or _auto_select_style(clip.get("category", "knowledge"))
+    ass_path   = final_folder / f"{output_mp4.stem}.ass"
+    style_used = prepare_ass(
+        clip=clip,
+        transcript_segments=transcript_segments,
+        ass_path=ass_path,
+        vid_w=out_w,
+        vid_h=out_h,
+        style_key=clip_style,
+        font_size_override=font_size_override,
+        v_position=v_position,
+    )
+    _build_subtitle_json(clip, sub_json, transcript_segments)
+
+    _progress(progress_callback, 0.4)
+
+    # ── 3. Satu encode ────────────────────────────────────────────────────
+    filters = [f for f in (crop_vf, ass_filter(ass_path) if style_used else "") if f]
+    success = _ffmpeg_render(
+        video_path, output_mp4, start, duration,
+        vf=",".join(filters),
+        af=LOUDNORM_FILTER if loudnorm else "",
+        threads=threads,
+    )
+
+    _progress(progress_callback, 0.95)
+
+    if not success:
+        log.error("Gagal render klip: %s", filename)
+        return {"is_cut": False}
+
+    if cache:
+        cache.put_file(cache_key, output_mp4)
+    _generate_thumbnail(video_path, thumb, offset=start + 2.0)
+    _progress(progress_callback, 1.0)
+
+    log.info("Render fused selesai: %s (%.1fs, crop=%s, style=%s)",
+             output_mp4.name, duration, bool(crop_vf), style_used)
+
+    return {
+        "is_cut":             True,
+        "is_cropped":         bool(crop_vf),
+        "is_subtitled":       bool(style_used),
+        "style_used":         style_used,
+        "final_path":         str(output_mp4),
+        "subtitle_json_path": str(sub_json),
+        "thumbnail_path":     str(thumb) if thumb.exists() else None,
+        "cache_key":          cache_key,
+    }
+
+
+# ─── Batch ────────────────────────────────────────────────────────────────────
+
+def render_all_clips(
+    clips: list,
+    video_path: Path,
+    final_folder: Path,
+    transcript_data: Optional[dict] = None,
+    face_config: Optional[FaceConfig] = None,
+    do_crop: bool = True,
+    target_w: int = 1080,
+    target_h: int = 1920,
+    style_key: Optional[str] = None,
+    font_size_override: Optional[int] = None,
+    v_position: Optional[str] = None,
+    loudnorm: bool = True,
+    progress_callback: Optional[Callable[[str, float], None]] = None,
+    workers: int = 1,
+    threads: int = 0,
+    on_clip_done: Optional[Callable[[int, dict], None]] = None,
+) -> list:
+    """Render semua klip yang approved dengan mode fused (1x encode per klip)."""
+    transcript_segs = transcript_data.get("segments", []) if transcript_data else []
+    approved = [c for c in clips if c.get("is_approved", True)]
+    total    = len(approved)
+
+    if total == 0:
+        log.warning("Tidak ada segmen yang approved.")
+        return clips
+
+    workers, threads = plan_workers(workers, total, threads)
+    log.info("Render fused %d klip (%d paralel, %d thread/job)...", total, workers, threads)
+    results  = list(clips)
+    progress = ProgressAggregator(total, "rendering", progress_callback)
+    jobs     = [i for i, c in enumerate(results) if c.get("is_approved", True)]
+
+    def job(i):
+        update = render_clip_fused(
+            video_path=video_path,
+            clip=results[i],
+            index=i,
+            final_folder=final_folder,
+            transcript_segments=transcript_segs,
+            face_config=face_config,
+            do_crop=do_crop,
+            target_w=target_w,
+            target_h=target_h,
+            style_key=style_key,
+            font_size_override=font_size_override,
+            v_position=v_position,
+            loudnorm=loudnorm,
+            progress_callback=progress.reporter(i),
+            threads=threads,
+        )
+        progress.update(i, 1.0)
+        return update
+
+    def apply(i, update):
+        results[i].update(update)
+        if on_clip_done and update.get("final_path"):
+            on_clip_done(i, results[i])
+
+    run_parallel(jobs, job, workers, on_result=apply)
+    return results
+
+
+# ─── FFmpeg ───────────────────────────────────────────────────────────────────
+
+def _ffmpeg_render(
+    video_path: Path,
+    output_path: Path,
+    start: float,
+    duration: float,
+    vf: str = "",
+    af: str = "",
+    threads: int = 0,
+) -> bool:
+    """Seek + filter graph + encode dalam satu proses FFmpeg."""
+    cmd = [
+        "ffmpeg", "-y",
+        "-ss", str(start),
+        "-i", str(video_path),
+        "-t", str(duration),
+    ]
+    if vf:
+        cmd += ["-vf", vf]
+    if af:
+        cmd += ["-af", af]
+    cmd += [
+        "-c:v", "libx264", "-crf", "18", "-preset", "fast",
+        "-c:a", "aac", "-b:a", "192k",
+        "-movflags", "+faststart",
+        "-avoid_negative_ts", "make_zero",
+    ]
+    if threads > 0:
+        cmd += ["-threads", str(threads)]
+    tmp_path = output_path.with_name(output_path.stem + ".part" + output_path.suffix)
+    cmd.append(str(tmp_path))
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8", errors="replace")
+        if result.returncode != 0:
+            log.error("FFmpeg render error:\n%s", result.stderr[-400:])
+            tmp_path.unlink(missing_ok=True)
+            return False
+        tmp_path.replace(output_path)
+        return True
+    except FileNotFoundError:
+        raise RuntimeError("FFmpeg tidak ditemukan. Install FFmpeg dan tambahkan ke PATH.")
+    except Exception as e:
+        log.error("FFmpeg exception: %s", e)
+        return False
+
+
+def _progress(cb, val: float):
+    if cb:
+        cb("rendering", val)
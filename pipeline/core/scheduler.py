@@ -0,0 +1,116 @@
+"""
+MahiraClipper — Clip-Major Scheduler
+Tiap klip jalan sendiri cut → crop → subtitle, bukan semua klip per tahap.
+
+Dengan urutan stage-major, file final pertama baru muncul setelah hampir
+semua pekerjaan selesai. Di sini klip 1 sudah final (dan dilaporkan lewat
+on_clip_done) selagi klip 2..N masih dirender, jadi editor bisa mulai review.
+"""
+
+from pathlib import Path
+from typing import Optional, Callable
+
+from config.settings import FaceConfig, log
+from core.cutter import clip_filename, cut_one
+from core.face_crop import crop_to_vertical, crop_cache_key
+from core.subtitle import process_subtitles, _auto_select_style
+from core.workers import plan_workers, run_parallel, ProgressAggregator
+
+
+def process_clips_clip_major(
+    clips: list,
+    video_path: Path,
+    cuts_folder: Path,
+    cropped_folder: Path,
+    final_folder: Path,
+    transcript_data: Optional[dict] = None,
+    face_config: Optional[FaceConfig] = None,
+    do_crop: bool = True,
+    target_w: int = 1080,
+    target_h: int = 1920,
+    style_key: Optional[str] = None,
+    font_size_override: Optional[int] = None,
+    v_position: Optional[str] = None,
+    progress_callback: Optional[Callable[[str, float], None]] = None,
+    on_clip_done: Optional[Callable[[int, dict], None]] = None,
+    workers: int = 1,
+    threads: int = 0,
+) -> list:
+    """
+    Proses semua klip approved secara clip-major.
+
+    on_clip_done(index, clip) dipanggil begitu MP4 final satu klip ada.
+    """
+    transcript_segs = transcript_data.get("segments", []) if transcript_data else []
+    for folder in (cuts_folder, cropped_folder, final_folder):
+        folder.mkdir(parents=True, exist_ok=True)
+
+    jobs  = [i for i, c in enumerate(clips) if c.get("is_approved", True)]
+    total = len(jobs)
+    if total == 0:
+        log.warning("Tidak ada segmen yang approved.")
+        return clips
+
+    workers, threads = plan_workers(workers, total, threads)
+    log.info("Clip-major: %d klip (%d paralel, %d thread/job)", total, workers, threads)
+    results  = list(clips)
+    progress = ProgressAggregator(total, "rendering", progress_callback)
+
+    def job(i):
+        clip = dict(results[i])
+        name = clip_filename(clip, i)
+
+        # ── Cut ───────────────────────────────────────────────────────────
+        clip.update(cut_one(
+            video_path, clip, i, cuts_folder, transcript_segs, threads=threads,
+        ))
+        progress.update(i, 0.3)
+        if not clip.get("is_cut") or not clip.get("raw_cut_path"):
+            return clip
+
+        # ── Crop (gagal → pakai raw cut) ──────────────────────────────────
+        src = clip["raw_cut_path"]
+        if do_crop:
+            out_path = cropped_folder / f"{name}_cropped.mp4"
+            key      = crop_cache_key(clip["cache_key"], face_config or FaceConfig(), target_w, target_h)
+            try:
+                ok = crop_to_vertical(
+                    video_path=Path(src), output_path=out_path, config=face_config,
+                    target_w=target_w, target_h=target_h, threads=threads, cache_key=key,
+                )
+            except Exception as e:
+                log.warning("Crop gagal (%s): %s", e, clip.get("title", ""))
+                ok = False
+            if ok:
+                src = str(out_path)
+                clip["cache_key"] = key
+            clip["is_cropped"] = ok
+        clip["cropped_path"] = src
+        progress.update(i, 0.6)
+
+        # ── Subtitle ──────────────────────────────────────────────────────
+        output_mp4 = final_folder / f"{name}_final.mp4"
+        if output_mp4.exists() and output_mp4.stat().st_size > 10000:
+            log.info("Skip subtitle (sudah ada): %s", output_mp4.name)
+            clip.update({"final_path": str(output_mp4), "is_subtitled": True})
+        else:
+            clip.update(process_subtitles(
+                clip=clip,
+                transcript_segments=transcript_segs,
+                video_path=Path(src),
+                output_path=output_mp4,
+                style_key=style_key or _auto_select_style(clip.get("category", "knowledge")),
+                font_size_override=font_size_override,
+                v_position=v_position,
+                threads=threads,
+            ))
+        progress.update(i, 1.0)
+        return clip
+
+    def apply(i, clip):
+        results[i] = clip
+        if on_clip_done and clip.get("final_path"):
+            on_clip_done(i, clip)
+
+    run_parallel(jobs, job, workers, on_result=apply)
+    return results
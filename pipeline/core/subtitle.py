@@ -10,12 +10,16 @@ Alur:
 """
 
 import re
+import json
 import subprocess
 from pathlib import Path
 from typing import Optional, Callable
 
 from config.settings import log
 from core.subtitle_styles import get_style, recommend_styles, STYLES
+from core.workers import plan_workers, run_parallel, ProgressAggregator
+from core.cache import get_cache, make_key, fingerprint_file
+from core.transcript_index import index_for, strip_punctuation
 
 
 # ─── Main: Generate + Burn ────────────────────────────────────────────────────
@@ -29,6 +33,7 @@ def process_subtitles(
     font_size_override: Optional[int] = None,
     v_position: Optional[str] = None,  # "bottom" | "middle" | "top"
     progress_callback: Optional[Callable[[str, float], None]] = None,
+    threads: int = 0,
 ) -> dict:
     """
     Pipeline lengkap: transkrip → ASS → burn ke video.
@@ -43,6 +48,88 @@ def process_subtitles(
     Returns:
         dict update untuk clip: {final_path, is_subtitled, style_used}
     """
+    # Cache: lineage klip + style + teks yang akan di-burn
+    clip_start = clip.get("start_time", 0)
+    clip_end   = clip.get("end_time", clip_start + clip.get("duration", 60))
+    cache      = get_cache()
+    cache_key  = make_key(
+        "final", clip.get("cache_key") or fingerprint_file(video_path),
+        style_key, font_size_override, v_position,
+        _filter_segments(transcript_segments, clip_start, clip_end),
+    )
+    if cache and cache.get_file(cache_key, output_path):
+        return {
+            "final_path": str(output_path),
+            "is_subtitled": True,
+            "style_used": style_key,
+            "cache_key": cache_key,
+        }
+
+    # Deteksi resolusi video aktual untuk sizing yang tepat
+    video_info = _get_video_dimensions(video_path)
+    ass_path   = output_path.parent / f"{output_path.stem}.ass"
+
+    style_key = prepare_ass(
+        clip=clip,
+        transcript_segments=transcript_segments,
+        ass_path=ass_path,
+        vid_w=video_info.get("width",  1080),
+        vid_h=video_info.get("height", 1920),
+        style_key=style_key,
+        font_size_override=font_size_override,
+        v_position=v_position,
+        progress_callback=progress_callback,
+    )
+
+    if not style_key:
+        return {"final_path": str(video_path), "is_subtitled": False, "style_used": None}
+
+    _progress(progress_callback, 0.5)
+
+    # Burn ke video
+    success = _burn_subtitles(video_path, ass_path, output_path, threads)
+
+    _progress(progress_callback, 1.0)
+
+    if success:
+        log.info("Subtitle di-burn ke: %s", output_path.name)
+        if cache:
+            cache.put_file(cache_key, output_path)
+        return {
+            "final_path": str(output_path),
+            "is_subtitled": True,
+            "style_used": style_key,
+            "cache_key": cache_key,
+        }
+    else:
+        # Fallback: copy video tanpa subtitle
+        import shutil
+        shutil.copy2(video_path, output_path)
+        return {
+            "final_path": str(output_path),
+            "is_subtitled": False,
+            "style_used": None,
+        }
+
+
+def prepare_ass(
+    clip: dict,
+    transcript_segments: list,
+    ass_path: Path,
+    vid_w: int = 1080,
+    vid_h: int = 1920,
+    style_key: Optional[str] = None,
+    font_size_override: Optional[int] = None,
+    v_position: Optional[str] = None,
+    progress_callback: Optional[Callable[[str, float], None]] = None,
+) -> Optional[str]:
+    """
+    Pilih style, sesuaikan ke resolusi output, lalu tulis file .ass untuk klip.
+    Tidak menyentuh video — dipakai juga oleh render fused sebelum encode.
+
+    Returns:
+        style_key yang dipakai, atau None kalau tidak ada transkrip untuk klip ini
+    """
     # Pilih style
     if not style_key:
         style_key = _auto_select_style(clip.get("category", "knowledge"))
@@ -56,11 +143,6 @@ def process_subtitles(
 
     style = dict(style)  # copy agar tidak mutate original
 
-    # Deteksi resolusi video aktual untuk sizing yang tepat
-    video_info = _get_video_dimensions(video_path)
-    vid_w = video_info.get("width",  1080)
-    vid_h = video_info.get("height", 1920)
-
     # Base font size ideal = 6.5% dari tinggi video
     # 9:16 (1920px) → 70px  |  1:1 (1080px) → 55px  |  16:9 (1080px tall) → 55px
     ideal_base = max(40, round(vid_h * 0.065 / 2) * 2)
@@ -99,41 +181,18 @@ def process_subtitles(
     # Filter transkrip hanya untuk durasi klip ini
     clip_start = clip.get("start_time", 0)
     clip_end   = clip.get("end_time", clip_start + clip.get("duration", 60))
-    clip_segs  = _filter_segments(transcript_segments, clip_start, clip_end)
+    index      = index_for(transcript_segments)
+    clip_segs  = index.segments_in(clip_start, clip_end)
 
     if not clip_segs:
         log.warning("Tidak ada transkrip untuk klip '%s', skip subtitle.", clip.get("title",""))
-        return {"final_path": str(video_path), "is_subtitled": False, "style_used": None}
+        return None
 
     _progress(progress_callback, 0.2)
 
     # Build ASS file
-    ass_path = output_path.parent / f"{output_path.stem}.ass"
-    _build_ass_file(clip_segs, style, ass_path, time_offset=clip_start)
-
-    _progress(progress_callback, 0.5)
-
-    # Burn ke video
-    success = _burn_subtitles(video_path, ass_path, output_path)
-
-    _progress(progress_callback, 1.0)
-
-    if success:
-        log.info("Subtitle di-burn ke: %s", output_path.name)
-        return {
-            "final_path": str(output_path),
-            "is_subtitled": True,
-            "style_used": style_key,
-        }
-    else:
-        # Fallback: copy video tanpa subtitle
-        import shutil
-        shutil.copy2(video_path, output_path)
-        return {
-            "final_path": str(output_path),
-            "is_subtitled": False,
-            "style_used": None,
-        }
+    _build_ass_file(clip_segs, style, ass_path, time_offset=clip_start, index=index)
+    return style_key
 
 
 # ─── Batch Process Semua Klip ─────────────────────────────────────────────────
@@ -147,6 +206,9 @@ def process_all_clips(
     font_size_override: Optional[int] = None,
     v_position: Optional[str] = None,
     progress_callback: Optional[Callable[[str, float], None]] = None,
+    workers: int = 1,
+    threads: int = 0,
+    on_clip_done: Optional[Callable[[int, dict], None]] = None,
 ) -> list:
     """
     Proses subtitle untuk semua klip yang sudah di-cut.
@@ -157,6 +219,7 @@ def process_all_clips(
         cuts_folder: folder berisi raw cuts
         final_folder: folder output video final dengan subtitle
         style_key: style untuk semua klip, None = auto per klip
+        workers: jumlah klip yang di-burn bersamaan (0 = otomatis)
     """
     final_folder.mkdir(parents=True, exist_ok=True)
     transcript_segments = transcript_data.get("segments", [])
@@ -168,53 +231,57 @@ def process_all_clips(
         log.warning("Tidak ada klip yang siap untuk diproses subtitle-nya.")
         return clips
 
-    log.info("Memproses subtitle untuk %d klip...", total)
-    results = list(clips)
-    done = 0
+    workers, threads = plan_workers(workers, total, threads)
+    log.info("Memproses subtitle untuk %d klip (%d paralel)...", total, workers)
+    results  = list(clips)
+    progress = ProgressAggregator(total, "subtitling", progress_callback)
+    jobs     = []
 
     for i, clip in enumerate(results):
         if not clip.get("is_approved", True) or not clip.get("is_cut", False):
             continue
-
         raw_cut = clip.get("raw_cut_path")
         if not raw_cut or not Path(raw_cut).exists():
             log.warning("File cut tidak ditemukan untuk: %s", clip.get("title",""))
             continue
+        jobs.append(i)
 
-        safe = _safe_name(clip.get("title", f"clip_{i}"))
+    def job(i):
+        clip       = results[i]
+        safe       = _safe_name(clip.get("title", f"clip_{i}"))
         filename   = f"{i:03d}_{safe}"
         output_mp4 = final_folder / f"{filename}_final.mp4"
 
         # Skip kalau sudah ada
         if output_mp4.exists() and output_mp4.stat().st_size > 10000:
             log.info("Skip subtitle (sudah ada): %s", output_mp4.name)
-            results[i]["final_path"]    = str(output_mp4)
-            results[i]["is_subtitled"]  = True
-            done += 1
-            continue
+            progress.update(i, 1.0)
+            return {"final_path": str(output_mp4), "is_subtitled": True}
 
         # Pilih style — per klip atau global
         clip_style = style_key or _auto_select_style(clip.get("category", "knowledge"))
 
-        def cb(step, pct):
-            overall = (done + pct) / total
-            if progress_callback:
-                progress_callback("subtitling", overall)
-
         update = process_subtitles(
             clip=clip,
             transcript_segments=transcript_segments,
-            video_path=Path(raw_cut),
+            video_path=Path(clip["raw_cut_path"]),
             output_path=output_mp4,
             style_key=clip_style,
-            progress_callback=cb,
+            font_size_override=font_size_override,
+            v_position=v_position,
+            progress_callback=progress.reporter(i),
+            threads=threads,
         )
+        progress.update(i, 1.0)
+        log.info("Subtitle selesai: %s (style: %s)", filename, clip_style)
+        return update
 
+    def apply(i, update):
         results[i].update(update)
-        done += 1
-        log.info("[%d/%d] Subtitle selesai: %s (style: %s)",
-                 done, total, filename, clip_style)
+        if on_clip_done and update.get("final_path"):
+            on_clip_done(i, results[i])
 
+    run_parallel(jobs, job, workers, on_result=apply)
     return results
 
 
@@ -225,18 +292,20 @@ def _build_ass_file(
     style: dict,
     output_path: Path,
     time_offset: float = 0.0,
+    index=None,
 ) -> Path:
     """
     Build file ASS subtitle dari segments dengan style yang diberikan.
+    index (TranscriptIndex, opsional) = sumber tabel kata yang sudah jadi.
     """
     mode = style.get("mode", "highlight")
 
     if mode == "word_by_word":
-        events = _build_word_by_word_events(segments, style, time_offset)
+        events = _build_word_by_word_events(segments, style, time_offset, index)
     elif mode == "no_highlight":
-        events = _build_no_highlight_events(segments, style, time_offset)
+        events = _build_no_highlight_events(segments, style, time_offset, index)
     else:
-        events = _build_highlight_events(segments, style, time_offset)
+        events = _build_highlight_events(segments, style, time_offset, index)
 
     ass_content = _build_ass_header(style) + "\n".join(events)
 
@@ -281,7 +350,7 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
 """
 
 
-def _build_highlight_events(segments: list, style: dict, time_offset: float) -> list:
+def _build_highlight_events(segments: list, style: dict, time_offset: float, index=None) -> list:
     """
     Mode highlight: tampilkan N kata per block, highlight kata aktif.
     """
@@ -293,7 +362,7 @@ def _build_highlight_events(segments: list, style: dict, time_offset: float) ->
     rm_punct        = style.get("remove_punctuation", True)
 
     # Flatten semua kata dengan timestamps
-    all_words = _segments_to_words(segments, time_offset, rm_punct)
+    all_words = _segments_to_words(segments, time_offset, rm_punct, index)
     if not all_words:
         return []
 
@@ -333,7 +402,7 @@ def _build_highlight_events(segments: list, style: dict, time_offset: float) ->
     return events
 
 
-def _build_word_by_word_events(segments: list, style: dict, time_offset: float) -> list:
+def _build_word_by_word_events(segments: list, style: dict, time_offset: float, index=None) -> list:
     """
     Mode word_by_word: satu kata muncul satu-satu, ukuran besar.
     """
@@ -341,7 +410,7 @@ def _build_word_by_word_events(segments: list, style: dict, time_offset: float)
     hl_size   = style.get("highlight_size", 84)
     rm_punct  = style.get("remove_punctuation", True)
 
-    all_words = _segments_to_words(segments, time_offset, rm_punct)
+    all_words = _segments_to_words(segments, time_offset, rm_punct, index)
     events    = []
 
     for wd in all_words:
@@ -353,14 +422,14 @@ def _build_word_by_word_events(segments: list, style: dict, time_offset: float)
     return events
 
 
-def _build_no_highlight_events(segments: list, style: dict, time_offset: float) -> list:
+def _build_no_highlight_events(segments: list, style: dict, time_offset: float, index=None) -> list:
     """
     Mode no_highlight: tampilkan teks per block, semua warna sama.
     """
     words_per_block = style.get("words_per_block", 5)
     rm_punct        = style.get("remove_punctuation", False)
 
-    all_words = _segments_to_words(segments, time_offset, rm_punct)
+    all_words = _segments_to_words(segments, time_offset, rm_punct, index)
     events    = []
     blocks    = [all_words[i:i+words_per_block]
                  for i in range(0, len(all_words), words_per_block)]
@@ -380,26 +449,22 @@ def _build_no_highlight_events(segments: list, style: dict, time_offset: float)
 
 # ─── FFmpeg Burn ──────────────────────────────────────────────────────────────
 
-def _burn_subtitles(video_path: Path, ass_path: Path, output_path: Path) -> bool:
+def _burn_subtitles(video_path: Path, ass_path: Path, output_path: Path, threads: int = 0) -> bool:
     """Burn ASS subtitle ke video menggunakan FFmpeg."""
-    # BUG FIX: Windows path escaping untuk FFmpeg ASS filter
-    # Benar: C:/path → C\:/path  (hanya colon drive letter yang di-escape)
-    # Salah: replace semua : termasuk drive letter → double escape
-    import re as _re
-    p = str(ass_path).replace("\\", "/")
-    ass_str = _re.sub(r'^([A-Za-z]):', lambda m: m.group(1) + '\\:', p)
-
     cmd = [
         "ffmpeg", "-y",
         "-i", str(video_path),
-        "-vf", f"ass='{ass_str}'",
+        "-vf", ass_filter(ass_path),
         "-c:v", "libx264",
         "-crf", "18",
         "-preset", "fast",
         "-c:a", "copy",
         "-movflags", "+faststart",
-        str(output_path),
     ]
+    if threads > 0:
+        cmd += ["-threads", str(threads)]
+    tmp_path = output_path.with_name(output_path.stem + ".part" + output_path.suffix)
+    cmd.append(str(tmp_path))
 
     try:
         result = subprocess.run(
@@ -408,7 +473,9 @@ def _burn_subtitles(video_path: Path, ass_path: Path, output_path: Path) -> bool
         )
         if result.returncode != 0:
             log.error("FFmpeg burn subtitle error:\n%s", result.stderr[-400:])
+            tmp_path.unlink(missing_ok=True)
             return False
+        tmp_path.replace(output_path)
         return True
     except FileNotFoundError:
         raise RuntimeError("FFmpeg tidak ditemukan.")
@@ -417,6 +484,32 @@ def _burn_subtitles(video_path: Path, ass_path: Path, output_path: Path) -> bool
         return False
 
 
+def ass_filter(ass_path: Path) -> str:
+    """Filter FFmpeg `ass=` untuk path file ASS (aman untuk path Windows)."""
+    # BUG FIX: Windows path escaping untuk FFmpeg ASS filter
+    # Benar: C:/path → C\:/path  (hanya colon drive letter yang di-escape)
+    # Salah: replace semua : termasuk drive letter → double escape
+    p = str(ass_path).replace("\\", "/")
+    ass_str = re.sub(r'^([A-Za-z]):', lambda m: m.group(1) + '\\:', p)
+    return f"ass='{ass_str}'"
+
+
+def _get_video_dimensions(video_path: Path) -> dict:
+    """Ambil lebar & tinggi video dengan ffprobe. {} kalau gagal."""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "quiet", "-print_format", "json",
+             "-show_streams", "-select_streams", "v:0", str(video_path)],
+            capture_output=True, text=True,
+        )
+        streams = json.loads(result.stdout).get("streams", [])
+        if streams:
+            return {"width": int(streams[0]["width"]), "height": int(streams[0]["height"])}
+    except Exception as e:
+        log.debug("ffprobe error: %s", e)
+    return {}
+
+
 # ─── Segment Helpers ──────────────────────────────────────────────────────────
 
 def _filter_segments(
@@ -425,26 +518,26 @@ def _filter_segments(
     clip_end: float,
     tolerance: float = 1.0,
 ) -> list:
-    """Filter segments yang masuk ke dalam range waktu klip."""
-    result = []
-    for seg in all_segments:
-        s = seg.get("start", 0)
-        e = seg.get("end", 0)
-        # Segment overlap dengan window klip
-        if s < clip_end + tolerance and e > clip_start - tolerance:
-            result.append(seg)
-    return result
+    """Filter segments yang overlap range waktu klip (bisect di index transkrip)."""
+    return index_for(all_segments).segments_in(clip_start, clip_end, tolerance)
 
 
 def _segments_to_words(
     segments: list,
     time_offset: float,
     remove_punctuation: bool,
+    index=None,
 ) -> list:
     """
     Ubah list segments ke list kata dengan timestamps individual.
     Kalau Gemini tidak kasih word-level timestamps, distribusi merata per segment.
+    Dengan index, kata diambil dari tabel kata index (regex tidak diulang per klip).
     """
+    if index is not None:
+        words = index.words_of(segments, time_offset, remove_punctuation)
+        if words is not None:
+            return words
+
     all_words = []
 
     for seg in segments:
@@ -456,7 +549,7 @@ def _segments_to_words(
             continue
 
         if remove_punctuation:
-            text = re.sub(r'[،,\.؟?!،؛;:\'"()\[\]]', '', text)
+            text = strip_punctuation(text)
 
         words = text.split()
         if not words:
@@ -471,7 +564,7 @@ def _segments_to_words(
                 if not w:
                     continue
                 if remove_punctuation:
-                    w = re.sub(r'[،,\.؟?!،؛;:\'"()\[\]]', '', w)
+                    w = strip_punctuation(w)
                 if not w:
                     continue
                 all_words.append({
@@ -0,0 +1,415 @@
+"""
+MahiraClipper — Transcript Index
+Index transcript.json yang dibangun sekali per project dan dipakai
+bersama analyzer, cutter, dan subtitle.
+
+Potong per klip:
+  Segmen diurutkan per start, plus array "reach" (max end kumulatif), jadi
+  segmen yang overlap rentang klip dicari dengan bisect (O(log n + k)),
+  bukan scan seluruh transkrip per klip. Kata disimpan sekali dalam satu
+  tabel datar (teks sudah di-strip / tanpa tanda baca) dengan rentang per
+  segmen, jadi kata satu klip tinggal slice tabel itu.
+
+Batas klip dari LLM:
+  LLM mengembalikan start_time/end_time + kutipan start_time_ref/end_time_ref.
+Waktu dari LLM sering jatuh di tengah kata (dan kadang meleset beberapa
+detik), jadi tiap batas:
+  1. dicari ulang lewat kutipannya (index trigram kata) di sekitar waktu
+     dari LLM,
+  2. di-snap ke awal/akhir kata terdekat — atau ke jeda kalau ada jeda
+     di dekatnya — dengan bisect di array waktu yang terurut (O(log n)).
+"""
+
+import re
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, defaultdict
+from typing import Optional
+
+from config.settings import ClipConfig, log
+
+PUNCTUATION   = re.compile(r'[،,\.؟?!،؛;:\'"()\[\]]')   # dibuang kalau style remove_punctuation
+INDEX_MEMO    = 4        # index transkrip yang disimpan (per list segmen)
+
+NGRAM         = 3        # panjang n-gram untuk cari kutipan
+PAUSE_SEC     = 0.35     # jeda antar kata minimal yang dianggap "jeda"
+PAUSE_SNAP_SEC = 1.5     # jeda sejauh ini dari batas → snap ke jeda
+QUOTE_SEARCH_SEC = 45.0  # kutipan dicari maksimal sejauh ini dari waktu LLM
+EDGE_PAD_SEC  = 0.15     # sisakan sedikit hening sebelum kata pertama / sesudah kata terakhir
+
+
+def _norm_tokens(text: str) -> list:
+    return re.sub(r"[^\w\s]", " ", text.lower()).split()
+
+
+_memo      = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def strip_punctuation(text: str) -> str:
+    return PUNCTUATION.sub("", text)
+
+
+class TranscriptIndex:
+    """
+    Satu transkrip: segmen terurut untuk potong per klip, tabel kata datar
+    untuk subtitle, array waktu kata + index trigram untuk kutipan LLM.
+    """
+
+    def __init__(self, segments: list):
+        # Segmen terurut per start. SegmentList dari core/transcript_store sudah
+        # terurut dan punya kolom waktu → dipakai langsung; tabel kata & trigram
+        # dibangun dari kolomnya (_rows), dict segmen baru dibuat untuk segmen
+        # yang diminta caller. List biasa (Gemini per chunk belum tentu
+        # kronologis) diurutkan dulu.
+        if getattr(segments, "starts", None) is not None:
+            self.segments   = segments
+            self.seg_starts = array("d", segments.starts.tolist())
+            self.seg_ends   = array("d", segments.ends.tolist())
+            self._pos       = {}
+        else:
+            self.segments   = sorted(segments, key=lambda sg: float(sg.get("start", 0)))
+            self.seg_starts = array("d", (float(sg.get("start", 0)) for sg in self.segments))
+            self.seg_ends   = array("d", (float(sg.get("end", 0)) for sg in self.segments))
+            self._pos       = {id(sg): k for k, sg in enumerate(self.segments)}
+        self.seg_reach  = array("d")      # max end segmen 0..k (naik monoton → bisa di-bisect)
+        reach = float("-inf")
+        for e in self.seg_ends:
+            reach = max(reach, e)
+            self.seg_reach.append(reach)
+        self._held  = {}                  # segmen yang sudah diberikan ke caller (id stabil)
+        self._words = {}                  # remove_punctuation → tabel kata
+
+        self.starts = array("d")
+        self.ends   = array("d")
+        self.tokens = []
+        for row in _rows(self.segments):
+            for start, end, word in _segment_words(*row):
+                for tok in _norm_tokens(word) or [""]:
+                    self.starts.append(start)
+                    self.ends.append(end)
+                    self.tokens.append(tok)
+
+        # Jeda: indeks kata i yang didahului jeda >= PAUSE_SEC (kata pertama selalu)
+        self.pauses = array("d", [self.starts[0]] if self.tokens else [])
+        self.pause_before = array("d", [0.0] if self.tokens else [])
+        self.pause_ends = array("d", [self.starts[0]] if self.tokens else [])   # akhir kata sebelum jeda
+        for i in range(1, len(self.tokens)):
+            gap = self.starts[i] - self.ends[i - 1]
+            if gap >= PAUSE_SEC:
+                self.pauses.append(self.starts[i])
+                self.pause_before.append(gap)
+                self.pause_ends.append(self.ends[i - 1])
+
+        self._grams = defaultdict(list)
+        for i in range(len(self.tokens) - NGRAM + 1):
+            self._grams[tuple(self.tokens[i:i + NGRAM])].append(i)
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    # ── Potong per Klip ─────────────────────────────────────────────────────
+
+    def segment_range(self, start: float, end: float, tolerance: float = 1.0) -> list:
+        """Indeks segmen yang overlap [start - tolerance, end + tolerance]."""
+        lo_t, hi_t = start - tolerance, end + tolerance
+        hi = bisect_left(self.seg_starts, hi_t)
+        lo = bisect_right(self.seg_reach, lo_t, 0, hi)
+        return [k for k in range(lo, hi) if self.seg_ends[k] > lo_t]
+
+    def segments_in(self, start: float, end: float, tolerance: float = 1.0) -> list:
+        """Segmen (dict asli) yang masuk rentang waktu klip, urut waktu."""
+        return [self._segment(k) for k in self.segment_range(start, end, tolerance)]
+
+    def _segment(self, k: int) -> dict:
+        seg = self._held.get(k)
+        if seg is None:
+            seg = self._held[k] = self.segments[k]
+            self._pos.setdefault(id(seg), k)
+        return seg
+
+    def words_in(
+        self,
+        start: float,
+        end: float,
+        time_offset: Optional[float] = None,
+        remove_punctuation: bool = True,
+        tolerance: float = 1.0,
+    ) -> list:
+        """Kata semua segmen di rentang klip, waktu relatif terhadap time_offset (default start)."""
+        offset = start if time_offset is None else time_offset
+        return self._collect(self.segment_range(start, end, tolerance), offset, remove_punctuation)
+
+    def words_of(self, segments: list, time_offset: float, remove_punctuation: bool = True) -> Optional[list]:
+        """
+        Kata untuk list segmen hasil segments_in(); None kalau ada segmen
+        yang bukan bagian index ini (caller pakai jalur lama).
+        """
+        ks = [self._pos.get(id(sg)) for sg in segments]
+        if None in ks:
+            return None
+        return self._collect(ks, time_offset, remove_punctuation)
+
+    def _collect(self, ks: list, offset: float, remove_punctuation: bool) -> list:
+        """
+        Format sama dengan subtitle._segments_to_words: {"word", "start",
+        "end"} relatif terhadap offset (min 0). Segmen tanpa word timestamps
+        dibagi rata di rentang segmen yang sudah di-clamp ke offset.
+        """
+        texts, w_starts, w_ends, bounds, timed = self._word_table(remove_punctuation)
+        out = []
+        for k in ks:
+            a, b = bounds[k], bounds[k + 1]
+            if a == b:
+                continue
+            if timed[k]:
+                for w in range(a, b):
+                    out.append({
+                        "word":  texts[w],
+                        "start": max(0, w_starts[w] - offset),
+                        "end":   max(0, w_ends[w] - offset),
+                    })
+            else:
+                seg_start = max(0, self.seg_starts[k] - offset)
+                seg_end   = max(0, self.seg_ends[k] - offset)
+                w_dur     = max(0.01, seg_end - seg_start) / (b - a)
+                for n, w in enumerate(range(a, b)):
+                    out.append({
+                        "word":  texts[w],
+                        "start": seg_start + n * w_dur,
+                        "end":   seg_start + (n + 1) * w_dur,
+                    })
+        return out
+
+    def _word_table(self, remove_punctuation: bool) -> tuple:
+        """
+        Tabel kata datar (dibangun sekali per mode tanda baca): teks, start,
+        end (absolut), batas kata per segmen (bounds[k]:bounds[k+1]), dan
+        apakah segmen punya word timestamps.
+        """
+        table = self._words.get(remove_punctuation)
+        if table is not None:
+            return table
+        texts, w_starts, w_ends = [], array("d"), array("d")
+        bounds, timed = array("l", [0]), []
+
+        def clean(t: str) -> str:
+            return strip_punctuation(t) if remove_punctuation else t
+
+        for _, _, text, words in _rows(self.segments):
+            timed.append(bool(words))
+            text = clean(text.strip())
+            if text.split():
+                if words:
+                    for w_start, w_end, word in words:
+                        w = clean(word.strip())
+                        if not w:
+                            continue
+                        texts.append(w)
+                        w_starts.append(w_start)
+                        w_ends.append(w_end)
+                else:
+                    for w in text.split():
+                        texts.append(w)
+                        w_starts.append(0.0)       # dihitung saat dipotong (lihat _collect)
+                        w_ends.append(0.0)
+            bounds.append(len(texts))
+
+        table = (texts, w_starts, w_ends, bounds, timed)
+        self._words[remove_punctuation] = table
+        return table
+
+    # ── Kutipan ─────────────────────────────────────────────────────────────
+
+    def find_quote(self, quote: str, near: float, max_dist: float = QUOTE_SEARCH_SEC) -> Optional[tuple]:
+        """
+        Cari kutipan di dekat waktu `near`. Return (indeks kata pertama,
+        indeks kata terakhir) atau None. Tiap trigram kutipan memberi
+        suara ke posisi awal kutipan, jadi salah transkripsi satu-dua kata
+        masih ketemu.
+        """
+        toks = _norm_tokens(quote)
+        if len(toks) < NGRAM:
+            return None
+        votes = defaultdict(int)
+        for k in range(len(toks) - NGRAM + 1):
+            for pos in self._grams.get(tuple(toks[k:k + NGRAM]), ()):
+                if pos - k >= 0:
+                    votes[pos - k] += 1
+        need = max(1, (len(toks) - NGRAM + 1) // 3)
+        best = None
+        for pos, v in votes.items():
+            dist = abs(self.starts[pos] - near)
+            if v < need or dist > max_dist:
+                continue
+            if best is None or (v, -dist) > (best[1], -best[2]):
+                best = (pos, v, dist)
+        if best is None:
+            return None
+        first = best[0]
+        return first, min(first + len(toks) - 1, len(self.tokens) - 1)
+
+    # ── Snap ────────────────────────────────────────────────────────────────
+
+    def snap_start(self, t: float, direction: int = 0) -> float:
+        """
+        Awal kata terdekat; kalau ada jeda dalam PAUSE_SNAP_SEC, awal kata setelah jeda.
+        direction -1 = hanya mundur (jeda/kata di atau sebelum t), +1 = hanya maju.
+        """
+        if not self.tokens:
+            return t
+        p = _pick(self.pauses, t, direction)
+        if p is not None and abs(self.pauses[p] - t) <= PAUSE_SNAP_SEC:
+            return max(0.0, self.pauses[p] - min(EDGE_PAD_SEC, self.pause_before[p] / 2 or EDGE_PAD_SEC))
+        i = _pick(self.starts, t, direction)
+        if i is None:
+            i = _nearest(self.starts, t)
+        return max(0.0, self.starts[i] - EDGE_PAD_SEC / 2)
+
+    def snap_end(self, t: float, direction: int = 0) -> float:
+        """
+        Akhir kata terdekat; kalau ada jeda dalam PAUSE_SNAP_SEC, akhir kata sebelum jeda.
+        direction +1 = hanya maju (jeda/kata di atau sesudah t), -1 = hanya mundur.
+        """
+        if not self.tokens:
+            return t
+        if direction:
+            p = _pick(self.pause_ends, t, direction)
+            if p is not None and p > 0 and abs(self.pause_ends[p] - t) <= PAUSE_SNAP_SEC:
+                return self.pause_ends[p] + min(EDGE_PAD_SEC, self.pause_before[p] / 2)
+        else:
+            p = _nearest(self.pauses, t)
+            if p is not None and p > 0 and abs(self.pauses[p] - t) <= PAUSE_SNAP_SEC:
+                i = bisect_left(self.starts, self.pauses[p]) - 1     # kata terakhir sebelum jeda
+                if i >= 0:
+                    return self.ends[i] + min(EDGE_PAD_SEC, self.pause_before[p] / 2)
+        i = _pick(self.ends, t, direction)
+        if i is None:
+            i = _nearest(self.ends, t)
+        return self.ends[i] + EDGE_PAD_SEC / 2
+
+    # ── Klip ────────────────────────────────────────────────────────────────
+
+    def refine(self, clip: dict, ccfg: Optional[ClipConfig] = None) -> tuple:
+        """
+        (start, end) yang sudah dirapikan untuk satu klip. Kalau hasilnya
+        keluar dari rentang durasi yang masih diterima _parse_response,
+        waktu asli dari LLM dipakai (hanya di-snap).
+        """
+        ccfg  = ccfg or ClipConfig()
+        start = float(clip.get("start_time", 0))
+        end   = float(clip.get("end_time", start))
+
+        # Kutipan ketemu → batas hanya boleh melebar (jeda di dalam kutipan
+        # tidak boleh memotong kata yang diminta LLM)
+        s, e, s_dir, e_dir = start, end, 0, 0
+        hit = self.find_quote(clip.get("start_time_ref", ""), start)
+        if hit:
+            s, s_dir = self.starts[hit[0]], -1
+        hit = self.find_quote(clip.get("end_time_ref", ""), end)
+        if hit:
+            e, e_dir = self.ends[hit[1]], 1
+
+        s, e = self.snap_start(s, s_dir), self.snap_end(e, e_dir)
+        if not (ccfg.min_duration * 0.7 <= e - s <= ccfg.max_duration * 1.3):
+            s, e = self.snap_start(start), self.snap_end(end)
+        if e <= s:
+            return start, end
+        return round(s, 2), round(e, 2)
+
+
+def index_for(segments) -> TranscriptIndex:
+    """
+    Index untuk list segmen transkrip — dibangun sekali dan dipakai ulang
+    selama list yang sama diteruskan (cutter, subtitle, render, analyzer).
+    Boleh juga langsung diberi TranscriptIndex.
+    """
+    if isinstance(segments, TranscriptIndex):
+        return segments
+    key = id(segments)
+    with _memo_lock:
+        hit = _memo.get(key)
+        if hit is not None and hit[0] is segments:
+            _memo.move_to_end(key)
+            return hit[1]
+    index = TranscriptIndex(segments)
+    with _memo_lock:
+        # list ikut disimpan supaya id() tidak dipakai ulang objek lain
+        _memo[key] = (segments, index)
+        while len(_memo) > INDEX_MEMO:
+            _memo.popitem(last=False)
+    return index
+
+
+def refine_boundaries(clips: list, segments: list, ccfg: Optional[ClipConfig] = None) -> list:
+    """Rapikan start/end semua klip (in place) terhadap kata di transkrip."""
+    index = index_for(segments)
+    if not len(index):
+        return clips
+    moved = 0
+    for clip in clips:
+        start, end = index.refine(clip, ccfg)
+        if (start, end) != (clip.get("start_time"), clip.get("end_time")):
+            moved += 1
+        clip["start_time"] = start
+        clip["end_time"]   = end
+        clip["duration"]   = round(end - start, 2)
+    log.info("Batas klip dirapikan: %d/%d klip disesuaikan ke batas kata", moved, len(clips))
+    return clips
+
+
+# ─── Helpers ──────────────────────────────────────────────────────────────────
+
+def _rows(segments):
+    """
+    (start, end, teks, [(start, end, kata), ...]) per segmen. SegmentList
+    dibaca langsung dari kolom (SegmentList.rows), tanpa membuat dict.
+    """
+    rows = getattr(segments, "rows", None)
+    if rows is not None:
+        yield from rows()
+        return
+    for seg in segments:
+        start, end = float(seg.get("start", 0)), float(seg.get("end", 0))
+        words = [(float(w.get("start", start)), float(w.get("end", end)), w.get("word", ""))
+                 for w in seg.get("words") or []]
+        yield start, end, seg.get("text", ""), words
+
+
+def _segment_words(start: float, end: float, text: str, words: list):
+    """(start, end, kata) per kata; tanpa word timestamps → dibagi rata per segmen."""
+    if words:
+        yield from words
+        return
+    toks = text.split()
+    if not toks:
+        return
+    step = (end - start) / len(toks)
+    for k, tok in enumerate(toks):
+        yield start + k * step, start + (k + 1) * step, tok
+
+
+def _pick(values, t: float, direction: int) -> Optional[int]:
+    """Indeks di array terurut: 0 = terdekat, -1 = terakhir <= t, +1 = pertama >= t."""
+    if not direction:
+        return _nearest(values, t)
+    eps = 1e-6
+    if direction < 0:
+        i = bisect_right(values, t + eps) - 1
+        return i if i >= 0 else None
+    i = bisect_left(values, t - eps)
+    return i if i < len(values) else None
+
+
+def _nearest(values, t: float) -> Optional[int]:
+    """Indeks nilai terdekat dengan t di array terurut (bisect)."""
+    n = len(values)
+    if not n:
+        return None
+    i = bisect_right(values, t)
+    if i == 0:
+        return 0
+    if i == n:
+        return n - 1
+    return i if values[i] - t < t - values[i - 1] else i - 1
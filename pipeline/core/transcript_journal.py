@@ -0,0 +1,139 @@
+"""
+MahiraClipper — Transcript Journal
+Segmen Whisper ditulis ke transcript.journal.jsonl begitu selesai, jadi
+crash / kill di menit ke-95 tidak menghapus 95 menit transkripsi.
+
+Baris pertama header {"journal": VERSION, "key": ...}; key = sumber +
+model + opsi decode, journal dengan key lain diabaikan (ditimpa). Baris
+berikutnya satu segmen per baris (format "segments" transkrip), plus
+{"language": ...} begitu bahasa terdeteksi. Tiap baris di-flush + fsync;
+baris terakhir yang terpotong (crash di tengah write) dibuang saat dibaca.
+
+Akhir segmen terakhir biasanya masih di tengah ucapan, jadi transcriber
+mundur ke jeda terdekat sebelumnya (rewind): segmen sesudah jeda itu
+dibuang dan ditranskripsi ulang dengan parameter yang sama. Transkrip
+final disusun dari isi journal, lalu journal dihapus.
+"""
+
+import json
+import os
+from pathlib import Path
+
+from config.settings import log
+
+JOURNAL_FILE = "transcript.journal.jsonl"
+VERSION      = 1
+
+
+class TranscriptJournal:
+
+    def __init__(self, folder: Path, key: str):
+        self.path     = Path(folder) / JOURNAL_FILE
+        self.key      = key
+        self.segments = []
+        self.language = None
+        self._from    = 0.0          # titik lanjut hasil rewind()
+        self._f       = None
+
+    def open(self) -> "TranscriptJournal":
+        """Baca journal lama (kalau key sama), lalu buka untuk append."""
+        good = self._load()
+        if good:
+            self._f = open(self.path, "r+b")
+            self._f.truncate(good)          # buang baris terpotong di ekor
+            self._f.seek(good)
+        else:
+            self.segments, self.language = [], None
+            self._f = open(self.path, "wb")
+            self._write({"journal": VERSION, "key": self.key})
+        return self
+
+    def _load(self) -> int:
+        """Isi segments/language dari file; return byte valid (0 = mulai baru)."""
+        if not self.path.exists():
+            return 0
+        try:
+            raw = self.path.read_bytes()
+        except OSError as e:
+            log.warning("Gagal baca journal transkrip: %s", e)
+            return 0
+        lines = raw.split(b"\n")[:-1]        # elemen terakhir = ekor tanpa newline
+        if not lines:
+            return 0
+        try:
+            header = json.loads(lines[0])
+        except ValueError:
+            return 0
+        if header.get("journal") != VERSION or header.get("key") != self.key:
+            log.info("Journal transkrip dari parameter lain, mulai dari awal")
+            return 0
+
+        good = len(lines[0]) + 1
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            if "language" in entry and "start" not in entry:
+                self.language = entry["language"]
+            else:
+                self.segments.append(entry)
+            good += len(line) + 1
+        return good
+
+    # ── Tulis ───────────────────────────────────────────────────────────────
+
+    @property
+    def resume_at(self) -> float:
+        """Detik audio yang sudah aman di journal."""
+        return max(self._from, self.segments[-1]["end"] if self.segments else 0.0)
+
+    def rewind(self, t: float) -> float:
+        """
+        Buang segmen yang berakhir sesudah detik t (file ditulis ulang atomic).
+        Titik lanjut = t, atau awal segmen pertama yang dibuang kalau lebih
+        awal — ucapannya tidak boleh terlewat. Return resume_at baru.
+        """
+        keep = [s for s in self.segments if s["end"] <= t]
+        if len(keep) == len(self.segments):
+            return self.resume_at
+        self._from    = min(t, self.segments[len(keep)]["start"])
+        self.segments = keep
+        entries = [{"journal": VERSION, "key": self.key}]
+        if self.language:
+            entries.append({"language": self.language})
+        entries.extend(keep)
+
+        self.close()
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(b"".join(json.dumps(e, ensure_ascii=False).encode("utf-8") + b"\n" for e in entries))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._f = open(self.path, "ab")
+        return self.resume_at
+
+    def append(self, seg: dict):
+        self.segments.append(seg)
+        self._write(seg)
+
+    def set_language(self, language: str):
+        if language and language != self.language:
+            self.language = language
+            self._write({"language": language})
+
+    def _write(self, entry: dict):
+        self._f.write(json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def close(self):
+        if self._f:
+            self._f.close()
+            self._f = None
+
+    def discard(self):
+        """Transkrip sudah tersimpan → journal tidak diperlukan lagi."""
+        self.close()
+        self.path.unlink(missing_ok=True)
@@ -0,0 +1,307 @@
+"""
+MahiraClipper — Transcript Store
+Transkrip dalam format kolom biner (transcript.cols), bukan JSON ber-indent
+dengan satu dict per kata.
+
+Layout satu file (bisa di-mmap; kolom little-endian, rata 64 byte):
+  "MCTR", u32 versi, u32 panjang header, header JSON (meta + daftar kolom:
+  nama → [dtype, offset, jumlah]), lalu kolom:
+    seg_start, seg_end          f8   waktu segmen
+    seg_logprob, seg_no_speech  f4
+    seg_text                    i4   id string
+    seg_words                   i8   offset kata per segmen (n_seg + 1)
+    word_start, word_end        f8
+    word_prob                   f4
+    word_text                   i4   id string (kata yang sama disimpan sekali)
+    str_off                     i8   offset string (n_str + 1)
+    str_data                    u1   blob UTF-8
+
+load_transcript() membaca file itu sekali ke satu buffer (np.fromfile,
+bukan mmap: mapping yang masih dipegang memo index mengunci file di
+Windows, jadi hapus project / tulis ulang transkrip gagal); segmen baru
+jadi dict saat diakses.
+Hasilnya view kompatibel dict dengan isi yang sama dengan transcript.json
+lama (language, duration, model, segments, full_text) — to_dict() untuk
+JSON lengkap. transcript.json lama (project sebelum format ini, Gemini)
+tetap dibaca apa adanya.
+"""
+
+import json
+import os
+import struct
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+
+from config.settings import log
+
+TRANSCRIPT_FILE = "transcript.cols"
+LEGACY_FILE     = "transcript.json"
+MAGIC   = b"MCTR"
+VERSION = 1
+ALIGN   = 64
+
+# Key segmen yang disimpan sebagai kolom; key lain di segmen tidak ikut disimpan
+_SEG_KEYS = ("start", "end", "text", "words", "avg_logprob", "no_speech_prob")
+
+
+def available() -> bool:
+    try:
+        import numpy  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+# ─── Tulis ────────────────────────────────────────────────────────────────────
+
+def write(data: dict, folder: Path) -> Path:
+    """
+    Simpan transkrip ke folder project. Format kolom kalau numpy ada,
+    kalau tidak transcript.json (tanpa indent). Return path file.
+    """
+    folder = Path(folder)
+    if available():
+        return save(data, folder / TRANSCRIPT_FILE)
+    path = folder / LEGACY_FILE
+    _atomic_write(path, json.dumps(_json_safe(data), ensure_ascii=False).encode("utf-8"))
+    return path
+
+
+def save(data: dict, path: Path) -> Path:
+    """Tulis transkrip ke satu file kolom (atomic: tmp lalu rename)."""
+    import numpy as np
+
+    segs = sorted(data.get("segments") or [], key=lambda s: float(s.get("start", 0)))
+    dropped = {k for s in segs for k in s if k not in _SEG_KEYS}
+    if dropped:
+        log.debug("Transcript store: key segmen tidak disimpan: %s", ", ".join(sorted(dropped)))
+
+    strings, ids = [], {}
+
+    def sid(text: str) -> int:
+        i = ids.get(text)
+        if i is None:
+            i = ids[text] = len(strings)
+            strings.append(text)
+        return i
+
+    words = [w for s in segs for w in (s.get("words") or [])]
+    counts = [len(s.get("words") or []) for s in segs]
+    seg_words = np.zeros(len(segs) + 1, dtype="<i8")
+    seg_words[1:] = np.cumsum(counts, dtype=np.int64)
+
+    cols = {
+        "seg_start":     np.array([s.get("start", 0) for s in segs], dtype="<f8"),
+        "seg_end":       np.array([s.get("end", 0) for s in segs], dtype="<f8"),
+        "seg_logprob":   np.array([s.get("avg_logprob", 0) or 0 for s in segs], dtype="<f4"),
+        "seg_no_speech": np.array([s.get("no_speech_prob", 0) or 0 for s in segs], dtype="<f4"),
+        "seg_text":      np.array([sid(s.get("text", "")) for s in segs], dtype="<i4"),
+        "seg_words":     seg_words,
+        "word_start":    np.array([w.get("start", 0) for w in words], dtype="<f8"),
+        "word_end":      np.array([w.get("end", 0) for w in words], dtype="<f8"),
+        "word_prob":     np.array([w.get("probability", 1.0) for w in words], dtype="<f4"),
+        "word_text":     np.array([sid(w.get("word", "")) for w in words], dtype="<i4"),
+    }
+    blobs = [s.encode("utf-8") for s in strings]
+    str_off = np.zeros(len(blobs) + 1, dtype="<i8")
+    str_off[1:] = np.cumsum([len(b) for b in blobs], dtype=np.int64)
+    cols["str_off"]  = str_off
+    cols["str_data"] = np.frombuffer(b"".join(blobs), dtype=np.uint8)
+
+    layout, offset = {}, 0
+    for name, arr in cols.items():
+        layout[name] = [arr.dtype.str, offset, int(arr.shape[0])]
+        offset = _align(offset + arr.nbytes)
+
+    meta = {k: v for k, v in data.items()
+            if k not in ("segments", "full_text", "transcript_path", "audio_features_path")}
+    header = json.dumps({"meta": meta, "columns": layout}, ensure_ascii=False).encode("utf-8")
+    head   = MAGIC + struct.pack("<II", VERSION, len(header)) + header
+    head  += b"\0" * (_align(len(head)) - len(head))
+
+    parts = [head]
+    for arr in cols.values():
+        raw = arr.tobytes()
+        parts.append(raw + b"\0" * (_align(len(raw)) - len(raw)))
+    _atomic_write(Path(path), b"".join(parts))
+    log.info("Transkrip disimpan: %d segmen, %d kata, %d string unik → %s (%.1f KB)",
+             len(segs), len(words), len(strings), Path(path).name, Path(path).stat().st_size / 1024)
+    return Path(path)
+
+
+# ─── Baca ─────────────────────────────────────────────────────────────────────
+
+def load_transcript(path) -> Mapping:
+    """
+    Baca transkrip (format kolom atau transcript.json lama). Return {} kalau
+    file tidak ada / rusak, sama seperti _load_json.
+    """
+    if not path:
+        return {}
+    path = Path(path)
+    if not path.exists() or path.stat().st_size == 0:
+        return {}
+    try:
+        with open(path, "rb") as f:
+            magic = f.read(len(MAGIC))
+        if magic == MAGIC:
+            return Transcript(path)
+        with open(path, encoding="utf-8-sig") as f:
+            return json.load(f)
+    except ImportError:
+        log.warning("numpy tidak tersedia, transkrip %s tidak bisa dibaca", path.name)
+    except (OSError, ValueError) as e:
+        log.warning("Gagal baca transkrip %s: %s", path.name, e)
+    return {}
+
+
+class Transcript(Mapping):
+    """View read-only (kompatibel dict) di atas isi file kolom (file tidak dibiarkan terbuka)."""
+
+    def __init__(self, path: Path):
+        import numpy as np
+
+        self.path = Path(path)
+        raw = np.fromfile(self.path, dtype=np.uint8)
+        if bytes(raw[:4]) != MAGIC:
+            raise ValueError(f"Bukan file transkrip kolom: {self.path.name}")
+        version, h_len = struct.unpack("<II", bytes(raw[4:12]))
+        if version != VERSION:
+            raise ValueError(f"Versi transkrip tidak dikenal: {version}")
+        header = json.loads(bytes(raw[12:12 + h_len]).decode("utf-8"))
+        base   = _align(12 + h_len)
+
+        self.meta = header.get("meta", {})
+        self._cols = {}
+        for name, (dtype, offset, count) in header["columns"].items():
+            dt = np.dtype(dtype)
+            a  = base + offset
+            self._cols[name] = raw[a:a + count * dt.itemsize].view(dt)
+        self._segments = SegmentList(self)
+
+    def column(self, name: str):
+        return self._cols[name]
+
+    def string(self, i: int) -> str:
+        off = self._cols["str_off"]
+        return self._cols["str_data"][off[i]:off[i + 1]].tobytes().decode("utf-8")
+
+    def segment(self, k: int) -> dict:
+        """Segmen ke-k dalam format transcript.json."""
+        c = self._cols
+        a, b  = int(c["seg_words"][k]), int(c["seg_words"][k + 1])
+        texts = c["word_text"][a:b].tolist()
+        words = [
+            {"start": s, "end": e, "word": self.string(t), "probability": round(p, 3)}
+            for s, e, p, t in zip(c["word_start"][a:b].tolist(), c["word_end"][a:b].tolist(),
+                                  c["word_prob"][a:b].tolist(), texts)
+        ]
+        return {
+            "start":          float(c["seg_start"][k]),
+            "end":            float(c["seg_end"][k]),
+            "text":           self.string(int(c["seg_text"][k])),
+            "words":          words,
+            "avg_logprob":    round(float(c["seg_logprob"][k]), 4),
+            "no_speech_prob": round(float(c["seg_no_speech"][k]), 4),
+        }
+
+    @property
+    def full_text(self) -> str:
+        return " ".join(self.string(int(t)) for t in self._cols["seg_text"])
+
+    def to_dict(self) -> dict:
+        """JSON view lengkap (sama dengan transcript.json lama)."""
+        return {**self.meta, "segments": list(self._segments), "full_text": self.full_text}
+
+    # ── Mapping ─────────────────────────────────────────────────────────────
+
+    def __getitem__(self, key):
+        if key == "segments":
+            return self._segments
+        if key == "full_text":
+            return self.full_text
+        return self.meta[key]
+
+    def __iter__(self):
+        yield from self.meta
+        yield "segments"
+        yield "full_text"
+
+    def __len__(self) -> int:
+        return len(self.meta) + 2
+
+
+class SegmentList(Sequence):
+    """Segmen transkrip sebagai sequence; dict dibuat saat item diakses."""
+
+    def __init__(self, transcript: Transcript):
+        self._t = transcript
+
+    @property
+    def starts(self):
+        return self._t.column("seg_start")
+
+    @property
+    def ends(self):
+        return self._t.column("seg_end")
+
+    def __len__(self) -> int:
+        return len(self._t.column("seg_start"))
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return [self._t.segment(i) for i in range(*k.indices(len(self)))]
+        n = len(self)
+        if k < 0:
+            k += n
+        if not 0 <= k < n:
+            raise IndexError("segment index out of range")
+        return self._t.segment(k)
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self._t.segment(k)
+
+    def rows(self):
+        """
+        (start, end, teks, [(start, end, kata), ...]) per segmen langsung dari
+        kolom, tanpa dict segmen/kata — untuk index seluruh transkrip.
+        """
+        col, cache = self._t.column, {}
+
+        def string(i: int) -> str:
+            s = cache.get(i)
+            if s is None:
+                s = cache[i] = self._t.string(i)
+            return s
+
+        bounds = col("seg_words").tolist()
+        ws, we, wt = col("word_start").tolist(), col("word_end").tolist(), col("word_text").tolist()
+        for k, (start, end, t) in enumerate(zip(col("seg_start").tolist(), col("seg_end").tolist(),
+                                                col("seg_text").tolist())):
+            a, b = bounds[k], bounds[k + 1]
+            yield start, end, string(t), [(ws[i], we[i], string(wt[i])) for i in range(a, b)]
+
+
+# ─── Helpers ──────────────────────────────────────────────────────────────────
+
+def _align(n: int) -> int:
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _atomic_write(path: Path, payload: bytes):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(payload)
+    os.replace(tmp, path)
+
+
+def _json_safe(data):
+    """Mapping/SegmentList → dict/list biasa untuk json.dump."""
+    if isinstance(data, Transcript):
+        return data.to_dict()
+    if isinstance(data, Mapping):
+        return {k: _json_safe(v) for k, v in data.items()}
+    if isinstance(data, (list, tuple, SegmentList)):
+        return [_json_safe(v) for v in data]
+    return data
@@ -0,0 +1,197 @@
+"""
+MahiraClipper — Kalibrasi Whisper
+Cari setting Whisper tercepat untuk host ini (compute_type × jumlah proses
+× cpu_threads × batch_size), diukur dengan sampel ceramah asli.
+
+Pencarian bertahap, bukan semua kombinasi:
+  1. compute_type — 1 proses, semua core
+  2. workers × cpu_threads — dengan compute_type terbaik
+  3. batch_size (BatchedInferencePipeline) — dengan layout terbaik
+Tiap percobaan: W proses di pool core/whisper_parallel masing-masing
+mentranskripsi sampel yang sama, setelah model di-load (warm-up);
+kecepatan = W × durasi sampel / waktu (realtime factor).
+
+Tiap proses worker me-load model sendiri, jadi jumlah worker yang dicoba
+dibatasi RAM yang tersedia ÷ perkiraan RAM satu model (MODEL_MB) dan
+MAX_WORKERS — medium/large-v3 × banyak core tidak sampai kehabisan RAM.
+
+Hasil tercepat disimpan di api_config.json → whisper.tuned[model_size]
+beserta jumlah core host. run.py memakainya selama jumlah core sama
+(config yang disalin ke mesin lain tidak ikut terpakai).
+"""
+
+import os
+import time
+from concurrent.futures import wait
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+from config.settings import log, update_config_file
+
+COMPUTE_TYPES = ("int8", "int8_float32", "float32")
+BATCH_SIZES   = (8, 16)
+SAMPLE_SEC    = 120.0     # durasi sampel yang ditranskripsi per percobaan
+WARMUP_SEC    = 5.0
+TUNED_KEYS    = ("workers", "cpu_threads", "compute_type", "batch_size")
+MAX_WORKERS   = 8         # batas proses yang dicoba walau RAM / core masih cukup
+
+# Perkiraan RAM satu proses worker (MB, bobot int8 + buffer decode); float
+# memakai bobot lebih besar → dikali COMPUTE_MEM
+MODEL_MB    = {"tiny": 300, "base": 400, "small": 800, "medium": 1800,
+               "large-v1": 3500, "large-v2": 3500, "large-v3": 3500, "distil-large-v3": 2200}
+COMPUTE_MEM = {"int8": 1.0, "int8_float32": 1.0, "float32": 2.5}
+
+
+def host_cores() -> int:
+    return os.cpu_count() or 1
+
+
+def tuned_for(wcfg, model_size: str) -> dict:
+    """Setting hasil kalibrasi untuk model ini di host ini; {} kalau belum ada / beda host."""
+    tuning = wcfg.tuned.get(model_size) if wcfg.use_tuned else None
+    if not tuning or tuning.get("cores") != host_cores():
+        return {}
+    return {k: tuning[k] for k in TUNED_KEYS if k in tuning}
+
+
+def available_mb() -> Optional[int]:
+    """RAM yang masih tersedia (MB); None kalau tidak bisa dibaca di OS ini."""
+    try:
+        if os.name == "nt":
+            import ctypes
+
+            class MemoryStatus(ctypes.Structure):
+                _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                            ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                            ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                            ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                            ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+
+            stat = MemoryStatus()
+            stat.dwLength = ctypes.sizeof(stat)
+            if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(stat)):
+                return stat.ullAvailPhys // 2 ** 20
+            return None
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def max_workers(model_size: str, compute_type: str) -> int:
+    """Proses worker maksimal yang muat di RAM (masing-masing me-load model)."""
+    limit = MAX_WORKERS
+    free  = available_mb()
+    if free is not None:
+        per_worker = MODEL_MB.get(model_size, MODEL_MB["large-v3"]) * COMPUTE_MEM.get(compute_type, 1.0)
+        limit = min(limit, int(free // per_worker))
+    return max(1, limit)
+
+
+def layouts(cores: int, max_workers: int = MAX_WORKERS) -> list:
+    """(workers, cpu_threads): worker 1, 2, 4, ... ≤ max_workers; thread = core/worker atau setengahnya."""
+    out, w = set(), 1
+    while w <= min(cores, max(1, max_workers)):
+        out.add((w, max(1, cores // w)))
+        out.add((w, max(1, cores // (2 * w))))
+        w *= 2
+    return sorted(out)
+
+
+# ─── Pengukuran ───────────────────────────────────────────────────────────────
+
+def measure(pcm, model_size: str, options: dict, workers: int, cpu_threads: int, compute_type: str) -> float:
+    """Realtime factor satu kombinasi (detik audio per detik waktu, semua proses)."""
+    from core import audio_features, whisper_parallel
+
+    sr   = audio_features.SAMPLE_RATE
+    warm = pcm[:int(WARMUP_SEC * sr)]
+    with whisper_parallel.lease(model_size, compute_type, workers, cpu_threads) as pool:
+        wait([pool.submit(whisper_parallel._run_chunk, warm, 0.0, options) for _ in range(workers)])
+
+        t0 = time.perf_counter()
+        for fut in [pool.submit(whisper_parallel._run_chunk, pcm, 0.0, options) for _ in range(workers)]:
+            fut.result()
+        elapsed = time.perf_counter() - t0
+    return workers * len(pcm) / sr / max(elapsed, 1e-6)
+
+
+def calibrate(
+    sample_path: Path,
+    model_size: str,
+    language: str = "id",
+    sample_sec: float = SAMPLE_SEC,
+    save: bool = True,
+    trial_callback: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """
+    Jalankan pencarian bertahap di atas sampel audio/video.
+    Return {"best": {...}, "trials": [...]}; best disimpan ke config kalau save.
+    """
+    import numpy as np
+    from core import audio_stream, whisper_parallel
+    from core.whisper_transcriber import _decode_options
+
+    audio = audio_stream.decode_range(Path(sample_path), 0.0, sample_sec)
+    if len(audio) < WARMUP_SEC * 2 * audio_stream.SAMPLE_RATE:
+        raise RuntimeError(f"Sampel terlalu pendek untuk kalibrasi: {Path(sample_path).name}")
+    pcm    = np.clip(audio * 32768, -32768, 32767).astype(np.int16)
+    cores  = host_cores()
+    trials = []
+
+    def trial(compute_type: str, workers: int, cpu_threads: int, batch_size: int = 0) -> Optional[dict]:
+        done = next((t for t in trials if (t["compute_type"], t["workers"], t["cpu_threads"],
+                                           t["batch_size"]) == (compute_type, workers, cpu_threads, batch_size)), None)
+        if done:
+            return done
+        options = _decode_options(language, batch_size=batch_size)
+        try:
+            rtf = measure(pcm, model_size, options, workers, cpu_threads, compute_type)
+        except Exception as e:
+            log.warning("Kalibrasi %s/%dx%d/batch %d gagal: %s",
+                        compute_type, workers, cpu_threads, batch_size, e)
+            whisper_parallel.shutdown()
+            return None
+        result = {"compute_type": compute_type, "workers": workers, "cpu_threads": cpu_threads,
+                  "batch_size": batch_size, "rtf": round(rtf, 2)}
+        log.info("Kalibrasi %s: %.2fx realtime", result, rtf)
+        trials.append(result)
+        if trial_callback:
+            trial_callback(result)
+        return result
+
+    def best() -> dict:
+        return max(trials, key=lambda t: t["rtf"])
+
+    try:
+        for compute_type in COMPUTE_TYPES:
+            trial(compute_type, 1, cores)
+        if not trials:
+            raise RuntimeError("Semua compute_type gagal di host ini")
+        compute_type = best()["compute_type"]
+        whisper_parallel.shutdown()     # RAM diukur tanpa model dari tahap 1
+        limit        = max_workers(model_size, compute_type)
+        log.info("Kalibrasi: maksimal %d proses worker (RAM tersedia %s MB)", limit, available_mb() or "?")
+        for workers, cpu_threads in layouts(cores, limit):
+            trial(compute_type, workers, cpu_threads)
+        layout = best()
+        for batch_size in BATCH_SIZES:
+            trial(compute_type, layout["workers"], layout["cpu_threads"], batch_size)
+    finally:
+        whisper_parallel.shutdown()
+
+    top    = best()
+    tuning = {**{k: top[k] for k in TUNED_KEYS}, "rtf": top["rtf"], "cores": cores,
+              "sample_sec": round(len(pcm) / audio_stream.SAMPLE_RATE, 1),
+              "calibrated_at": datetime.now().isoformat(timespec="seconds")}
+    if save:
+        update_config_file({"whisper": {"tuned": {model_size: tuning}}})
+        log.info("Kalibrasi Whisper %s disimpan: %s", model_size, tuning)
+    return {"best": tuning, "trials": trials}
@@ -0,0 +1,289 @@
+"""
+MahiraClipper — Whisper Paralel
+Transkripsi satu audio panjang di beberapa proses sekaligus.
+
+Satu stream WhisperModel tidak scale di atas beberapa core. Mode ini
+(WhisperConfig.workers != 1):
+  1. PCM di memori (core/audio_stream) dibagi rata jadi N potongan, lalu
+     tiap batas digeser ke jeda terpanjang di sekitarnya (VAD Silero bawaan
+     faster-whisper, hanya dijalankan di jendela ±SEARCH_SEC sekitar batas).
+  2. Tiap potongan ditranskripsi di ProcessPool — tiap proses punya
+     WhisperModel sendiri dengan budget cpu_threads = core / worker.
+  3. Segmen + word timestamps digeser sesuai offset potongan, lalu
+     digabung urut waktu.
+
+Potongan dibuat CHUNKS_PER_WORKER kali jumlah worker supaya worker yang
+kebagian potongan padat ucapan tidak jadi ekor. Pool proses disimpan
+antar job (mode daemon) selama model & budget sama, dipakai lewat
+lease(): job dengan key lain menunggu pemakai pool lama selesai dulu,
+dan pool baru dimatikan paksa (cancel / error) kalau tidak ada job lain
+yang masih memakainya.
+"""
+
+import multiprocessing
+import os
+import signal
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from config.settings import log
+from core import audio_features
+from core.workers import plan_workers
+
+SEARCH_SEC        = 30.0    # titik potong dicari ± ini dari batas rata
+MIN_CHUNK_SEC     = 120.0   # potongan lebih pendek dari ini tidak dibuat
+CHUNKS_PER_WORKER = 2
+
+_pool      = None           # _WorkerPool aktif
+_pool_cond = threading.Condition()
+
+_worker_model = None          # di proses worker
+
+
+# ─── Titik Potong ─────────────────────────────────────────────────────────────
+
+def best_cut(read: Callable, target: float, lo: float, hi: float, vad_parameters: Optional[dict] = None) -> float:
+    """
+    Titik potong di tengah jeda terpanjang dalam [lo, hi] (VAD Silero);
+    target kalau tidak ada jeda. read(start, end) → PCM float32.
+    """
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    window = read(lo, hi)
+    speech = get_speech_timestamps(window, VadOptions(**(vad_parameters or {})))
+    # Jeda = sebelum ucapan pertama, antar ucapan, sesudah ucapan terakhir
+    edges = [0] + [x for ts in speech for x in (ts["start"], ts["end"])] + [len(window)]
+    gaps  = [(edges[k + 1] - edges[k], edges[k], edges[k + 1]) for k in range(0, len(edges) - 1, 2)]
+    size, a, b = max(gaps)
+    if size <= 0:
+        return target
+    return round(lo + (a + b) / 2 / audio_features.SAMPLE_RATE, 3)
+
+
+def split_points(read: Callable, duration: float, n_chunks: int,
+                 vad_parameters: Optional[dict] = None, start: float = 0.0) -> list:
+    """[(start, end), ...] detik dari start; batas di tengah jeda terpanjang dekat batas rata."""
+    cuts = [start]
+    for i in range(1, n_chunks):
+        target = start + (duration - start) * i / n_chunks
+        cut = best_cut(read, target, max(cuts[-1], target - SEARCH_SEC),
+                       min(duration, target + SEARCH_SEC), vad_parameters)
+        if cut - cuts[-1] >= MIN_CHUNK_SEC / 2:
+            cuts.append(cut)
+    cuts.append(duration)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+# ─── Transkripsi ──────────────────────────────────────────────────────────────
+
+def transcribe(
+    stream,
+    model_size: str,
+    options: dict,
+    workers: int = 0,
+    cpu_threads: int = 0,
+    compute_type: str = "int8",
+    progress_callback: Optional[Callable[[float], None]] = None,
+    segment_callback: Optional[Callable[[dict], None]] = None,
+    language_callback: Optional[Callable[[str], None]] = None,
+    start: float = 0.0,
+) -> Optional[tuple]:
+    """
+    Transkripsi paralel dari PcmStream yang sudah selesai di-decode, mulai
+    dari detik `start` (resume dari journal). Return (segmen, bahasa, durasi)
+    atau None kalau sisa audio terlalu pendek untuk dipotong (caller pakai
+    satu stream).
+
+    progress_callback(frac) = porsi durasi yang sudah selesai (0..1).
+    segment_callback dipanggil urut waktu, per potongan yang sudah lengkap.
+    language_callback(bahasa) dipanggil sekali, dengan bahasa potongan
+    pertama begitu segmennya diteruskan (journal resume).
+    """
+    duration   = stream.duration
+    span       = duration - start
+    max_chunks = int(span // MIN_CHUNK_SEC)
+    workers, threads = plan_workers(workers, max_chunks, cpu_threads)
+    if workers <= 1:
+        return None
+    n_chunks = min(max_chunks, workers * CHUNKS_PER_WORKER)
+    chunks   = split_points(stream.read, duration, n_chunks, options.get("vad_parameters"), start)
+    if len(chunks) <= 1:
+        return None
+    log.info("Whisper paralel: %d potongan, %d worker × %d thread", len(chunks), workers, threads)
+
+    pcm      = stream.pcm()
+    sr       = audio_features.SAMPLE_RATE
+    results  = [None] * len(chunks)
+    fed      = 0
+    done_sec = 0.0
+
+    def tick():
+        if progress_callback:
+            progress_callback((start + done_sec) / max(duration, 1.0))
+
+    with lease(model_size, compute_type, workers, threads, check=tick) as pool:
+        # Potongan dikirim sebagai int16 (setengah ukuran float32), dikonversi di worker
+        futures = {pool.submit(_run_chunk, pcm[int(a * sr):int(b * sr)], a, options): n
+                   for n, (a, b) in enumerate(chunks)}
+        try:
+            pending = set(futures)
+            while pending:
+                # Timeout: progress_callback (titik cancel) tetap dipanggil tiap
+                # detik walau potongan panjang belum ada yang selesai
+                finished, pending = wait(pending, timeout=1.0, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    n = futures[fut]
+                    results[n] = fut.result()
+                    a, b = chunks[n]
+                    done_sec += b - a
+                # Segmen diteruskan urut waktu: hanya prefix potongan yang sudah lengkap
+                while fed < len(chunks) and results[fed] is not None:
+                    if language_callback and fed == 0 and results[0][1]:
+                        language_callback(results[0][1])
+                    if segment_callback:
+                        for seg in results[fed][0]:
+                            segment_callback(seg)
+                    fed += 1
+                tick()
+        except BaseException:
+            # Cancel / error: potongan job ini yang masih antre dibatalkan;
+            # proses worker dimatikan lease() kalau tidak ada job lain di pool
+            for fut in futures:
+                fut.cancel()
+            raise
+
+    segments = [seg for segs, _ in results for seg in segs]
+    langs    = Counter()
+    for (segs, lang), (a, b) in zip(results, chunks):
+        if lang:
+            langs[lang] += b - a
+    language = langs.most_common(1)[0][0] if langs else options.get("language")
+    return segments, language, duration
+
+
+# ─── Pool Proses ──────────────────────────────────────────────────────────────
+
+class _WorkerPool:
+    """ProcessPoolExecutor + PID proses worker (dilapor initializer) untuk kill paksa."""
+
+    def __init__(self, key: tuple):
+        model_size, compute_type, workers, threads = key
+        # spawn: proses daemon punya banyak thread (fork tidak aman), dan sama di Windows
+        ctx = multiprocessing.get_context("spawn")
+        self.key    = key
+        self.users  = 0
+        self.broken = False
+        self._pids  = ctx.SimpleQueue()
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(model_size, compute_type, threads, self._pids),
+        )
+
+    def submit(self, fn, *args):
+        return self.executor.submit(fn, *args)
+
+    def close(self, kill: bool = False):
+        if kill:
+            # ProcessPoolExecutor tidak punya API untuk menghentikan task yang jalan
+            while not self._pids.empty():
+                try:
+                    os.kill(self._pids.get(), signal.SIGTERM)
+                except OSError:
+                    pass                    # proses sudah keluar
+        self.executor.shutdown(wait=not kill, cancel_futures=True)
+
+
+@contextmanager
+def lease(model_size: str, compute_type: str, workers: int, threads: int,
+          check: Optional[Callable[[], None]] = None):
+    """
+    Pakai pool proses bersama selama blok jalan. Pool dengan key lain
+    ditunggu sampai semua pemakainya selesai (check() tiap detik → titik
+    cancel), baru diganti. Blok keluar dengan error/cancel: pool tidak
+    dipakai job baru lagi, dan dimatikan paksa begitu pemakai terakhirnya
+    keluar — proses yang masih dipakai job lain tidak ikut di-kill.
+    """
+    pool = _acquire((model_size, compute_type, workers, threads), check)
+    try:
+        yield pool
+    except BaseException:
+        _release(pool, broken=True)
+        raise
+    _release(pool, broken=False)
+
+
+def _acquire(key: tuple, check: Optional[Callable[[], None]]) -> _WorkerPool:
+    global _pool
+    while True:
+        with _pool_cond:
+            while _pool is not None and _pool.key != key and _pool.users:
+                _pool_cond.wait(timeout=1.0)
+                if check:
+                    check()
+            if _pool is None or _pool.key == key:
+                if _pool is None:
+                    _pool = _WorkerPool(key)    # proses di-spawn saat submit pertama
+                _pool.users += 1
+                return _pool
+            stale, _pool = _pool, None
+        stale.close()       # proses lama keluar dulu sebelum model baru di-load
+
+
+def _release(pool: _WorkerPool, broken: bool):
+    global _pool
+    with _pool_cond:
+        pool.users  -= 1
+        pool.broken  = pool.broken or broken
+        if pool.broken and _pool is pool:
+            _pool = None                        # job berikutnya dapat pool baru
+        idle = not pool.users and _pool is not pool
+        _pool_cond.notify_all()
+    if idle:
+        pool.close(kill=pool.broken)
+
+
+def shutdown():
+    """Matikan pool worker (daemon berhenti / kalibrasi selesai); pool yang masih dipakai menyusul."""
+    global _pool
+    with _pool_cond:
+        pool, _pool = _pool, None
+        idle = pool is not None and not pool.users
+        _pool_cond.notify_all()
+    if idle:
+        pool.close()
+
+
+# ─── Worker ───────────────────────────────────────────────────────────────────
+
+def _init_worker(model_size: str, compute_type: str, cpu_threads: int, pids=None):
+    global _worker_model
+    if pids is not None:
+        pids.put(os.getpid())
+    from core.whisper_transcriber import get_model
+    _worker_model = get_model(model_size, compute_type, cpu_threads)
+
+
+def _run_chunk(pcm, start: float, options: dict) -> tuple:
+    """Transkripsi satu potongan; waktu segmen & kata sudah ditambah offset start."""
+    import numpy as np
+    from core.whisper_transcriber import _format_segment, run_model
+
+    audio = pcm.astype(np.float32) * (1.0 / 32768)
+    segments_gen, info = run_model(_worker_model, audio, options)
+    segs = [shift_segment(_format_segment(seg), start) for seg in segments_gen]
+    return segs, getattr(info, "language", None)
+
+
+def shift_segment(seg: dict, offset: float) -> dict:
+    """Geser waktu segmen + kata (in place) sebesar offset detik."""
+    seg["start"] = round(seg["start"] + offset, 3)
+    seg["end"]   = round(seg["end"] + offset, 3)
+    for w in seg.get("words", []):
+        w["start"] = round(w["start"] + offset, 3)
+        w["end"]   = round(w["end"] + offset, 3)
+    return seg
@@ -0,0 +1,164 @@
+"""
+MahiraClipper — Whisper Dua Tingkat
+Draft cepat dengan model kecil untuk seluruh ceramah, model besar hanya
+untuk bagian yang perlu.
+
+Pass pertama pakai WhisperConfig.draft_model (tiny/base) di seluruh audio,
+lalu region tertentu ditranskripsi ulang dengan model_size (medium/large-v3):
+  - refine_scope "confidence": segmen dengan avg_logprob rendah atau banyak
+    kata ber-probability rendah (istilah Arab, nama, suara jauh dari mic) —
+    dikerjakan transcriber sebelum transkrip disimpan.
+  - refine_scope "clips": hanya rentang klip yang terpilih setelah analisis
+    (stage "refine" di run.py), audio di-decode per rentang.
+
+Scope "clips" juga dipakai WhisperConfig.clip_words: pass pertama tanpa
+word timestamps (alignment kata mahal untuk berjam-jam audio yang tidak
+jadi klip), lalu rentang klip di-decode ulang dengan word timestamps
+sebelum stage subtitle — timing karaoke tetap per kata.
+
+Region diperlebar ke batas segmen draft, jadi hasil model besar mengganti
+segmen draft utuh; segmen di luar region tidak berubah. Kalau model besar
+tidak menghasilkan segmen untuk satu region, segmen draft-nya dipertahankan.
+"""
+
+from bisect import bisect_left
+from pathlib import Path
+from typing import Callable, Optional
+
+from config.settings import log
+
+REFINED_FILE   = "transcript.refined.cols"   # hasil scope "clips" (draft tetap utuh)
+LOW_WORD_SHARE = 0.25     # porsi kata ber-probability rendah yang membuat segmen "ragu"
+PAD_SEC        = 0.3      # audio ekstra kiri-kanan region, tidak melewati segmen tetangga
+MERGE_GAP_SEC  = 2.0      # region berjarak kurang dari ini digabung (satu panggilan model)
+
+
+# ─── Region ───────────────────────────────────────────────────────────────────
+
+def is_low_confidence(seg: dict, max_logprob: float, min_word_prob: float) -> bool:
+    if (seg.get("avg_logprob") or 0) < max_logprob:
+        return True
+    words = seg.get("words") or []
+    low   = sum(1 for w in words if w.get("probability", 1.0) < min_word_prob)
+    return bool(words) and low >= LOW_WORD_SHARE * len(words)
+
+
+def low_confidence_regions(segments, max_logprob: float, min_word_prob: float) -> list:
+    """[(start, end), ...] dari segmen yang perlu model besar."""
+    return merge_spans([(s["start"], s["end"]) for s in segments
+                        if is_low_confidence(s, max_logprob, min_word_prob)])
+
+
+def clip_regions(clips: list) -> list:
+    """[(start, end), ...] rentang klip (klip yang ditolak user tidak ikut)."""
+    return merge_spans([(float(c["start_time"]), float(c["end_time"])) for c in clips
+                        if c.get("is_approved", True) and c.get("end_time") is not None])
+
+
+def merge_spans(spans, gap: float = MERGE_GAP_SEC) -> list:
+    out = []
+    for a, b in sorted(spans):
+        if out and a - out[-1][1] < gap:
+            out[-1][1] = max(out[-1][1], b)
+        else:
+            out.append([a, b])
+    return [(a, b) for a, b in out]
+
+
+def _snap(segs: list, regions: list) -> list:
+    """Region → rentang indeks segmen [(i, j), ...] yang disentuh region (urut, tidak overlap)."""
+    starts = [s["start"] for s in segs]
+    spans  = []
+    for a, b in regions:
+        i = bisect_left(starts, a)
+        if i > 0 and segs[i - 1]["end"] > a:
+            i -= 1
+        j = bisect_left(starts, b)
+        if i >= j:
+            continue
+        if spans and i <= spans[-1][1]:
+            spans[-1] = (spans[-1][0], max(spans[-1][1], j))
+        else:
+            spans.append((i, j))
+    return spans
+
+
+# ─── Transkripsi Ulang ────────────────────────────────────────────────────────
+
+def refine(
+    segments,
+    regions: list,
+    read: Callable,
+    model,
+    options: dict,
+    progress_callback: Optional[Callable[[float], None]] = None,
+) -> tuple:
+    """
+    Transkripsi ulang region dengan `model` lalu sambung ke segmen draft.
+    read(start, end) → PCM float32. Return (segmen, jumlah region diganti).
+    """
+    from core.whisper_parallel import shift_segment
+    from core.whisper_transcriber import _format_segment, run_model
+
+    segs  = sorted(segments, key=lambda s: s["start"])
+    spans = _snap(segs, regions)
+    out, last, replaced = [], 0, 0
+    for n, (i, j) in enumerate(spans):
+        lo = max(segs[i - 1]["end"] if i else 0.0, segs[i]["start"] - PAD_SEC)
+        hi = segs[j - 1]["end"] + PAD_SEC
+        if j < len(segs):
+            hi = min(hi, segs[j]["start"])
+        opts = dict(options)
+        if i and opts.get("condition_on_previous_text"):
+            opts["initial_prompt"] = segs[i - 1]["text"]
+
+        segments_gen, _ = run_model(model, read(lo, hi), opts)
+        new = [shift_segment(_format_segment(seg), lo) for seg in segments_gen]
+        out.extend(segs[last:i])
+        out.extend(new or segs[i:j])
+        replaced += bool(new)
+        last = j
+        if progress_callback:
+            progress_callback((n + 1) / len(spans))
+    out.extend(segs[last:])
+
+    covered = sum(segs[j - 1]["end"] - segs[i]["start"] for i, j in spans)
+    log.info("Refine: %d/%d region ditranskripsi ulang (%.0f detik audio)",
+             replaced, len(spans), covered)
+    return out, replaced
+
+
+def refine_clips(
+    transcript,
+    clips: list,
+    video_path: Path,
+    out_folder: Path,
+    model_size: str,
+    cpu_threads: int = 0,
+    progress_callback: Optional[Callable[[float], None]] = None,
+    compute_type: str = "int8",
+    batch_size: int = 0,
+) -> Path:
+    """
+    Scope "clips": rentang klip terpilih ditranskripsi ulang dengan model besar
+    (selalu dengan word timestamps), audio di-decode per rentang.
+    Return path transkrip hasil (REFINED_FILE).
+    """
+    from core import audio_stream, transcript_store
+    from core.whisper_transcriber import _decode_options, get_model
+
+    language = transcript.get("language") or "auto"
+    segs, _  = refine(
+        list(transcript["segments"]),
+        clip_regions(clips),
+        read=lambda a, b: audio_stream.decode_range(video_path, a, b),
+        model=get_model(model_size, compute_type, cpu_threads),
+        options=_decode_options(language, batch_size=batch_size),
+        progress_callback=progress_callback,
+    )
+    meta  = {k: v for k, v in transcript.items() if k not in ("segments", "full_text")}
+    draft = transcript.get("draft_model") or transcript.get("model", "")
+    if draft and draft != model_size:
+        meta["draft_model"] = draft
+    return transcript_store.save({**meta, "model": model_size, "segments": segs},
+                                 Path(out_folder) / REFINED_FILE)
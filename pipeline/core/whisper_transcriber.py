@@ -10,15 +10,34 @@ Model yang dipakai:
 Untuk ceramah Indonesia dengan istilah Arab → medium direkomendasikan.
 """
 
-import json
-import subprocess
+import os
+import threading
+from collections import OrderedDict
 from pathlib import Path
 from typing import Callable, Optional
 
 from config.settings import log
+from core import audio_features, audio_stream, transcript_journal, transcript_store
+from core.cache import fingerprint_file, get_transcript_cache, make_key
 
 SUPPORTED_EXTS = {".mp4", ".mkv", ".webm", ".avi", ".mov", ".mp3", ".wav", ".m4a"}
 
+# Model yang sudah di-load disimpan di pool (LRU). Di mode daemon, job kedua
+# dst. tidak perlu load model dari disk lagi. Default 1 model supaya RAM
+# tetap sama dengan mode satu-proses; naikkan kalau sering ganti model.
+MODEL_POOL_SIZE = int(os.environ.get("MAHIRA_MODEL_POOL", "1"))
+
+BLOCK_SEC    = 600      # satu stream: transkripsi per blok ±10 menit begitu ter-decode
+PROMPT_CHARS = 200      # konteks antar blok (initial_prompt)
+BATCH_UNSUPPORTED = ("condition_on_previous_text",)   # tidak diterima BatchedInferencePipeline
+MIN_BLOCK_SEC = 0.5     # sisa audio sependek ini tidak ditranskripsi (resume di ujung audio)
+# Cara decode ikut jadi key store/journal/cache stage: hasil per blok + prompt
+# antar blok ≠ hasil satu pass seluruh file (key lama tidak dipakai ulang)
+DECODE_MODE  = f"blocks{BLOCK_SEC}-prompt{PROMPT_CHARS}"
+
+_model_pool = OrderedDict()
+_pool_lock  = threading.Lock()
+
 
 # ─── Main Entry ──────────────────────────────────────────────────────────────
 
@@ -28,138 +47,177 @@ def transcribe(
     model_size: str = "small",
     language: str = "id",
     progress_callback: Optional[Callable[[str, float], None]] = None,
+    segment_callback: Optional[Callable[[dict], None]] = None,
+    workers: int = 1,
+    cpu_threads: int = 0,
+    draft_model: str = "",
+    refine_logprob: float = -1.0,
+    refine_word_prob: float = 0.5,
+    word_timestamps: bool = True,
+    compute_type: str = "int8",
+    batch_size: int = 0,
 ) -> dict:
     """
     Transkripsi video/audio menggunakan faster-whisper lokal.
 
+    segment_callback(seg) dipanggil begitu satu segmen selesai (format sama
+    dengan "segments" di hasil) — dipakai untuk analisis streaming.
+
+    workers != 1 → audio dipotong di jeda dan ditranskripsi paralel di
+    beberapa proses (core/whisper_parallel, 0 = otomatis per jumlah core).
+    cpu_threads = thread CTranslate2 per model (0 = default / core per worker).
+
+    draft_model (tiny/base) → seluruh audio ditranskripsi dengan model itu,
+    lalu hanya segmen ragu (avg_logprob < refine_logprob atau banyak kata
+    dengan probability < refine_word_prob) yang diulang dengan model_size
+    (core/whisper_refine). segment_callback menerima segmen draft.
+
+    word_timestamps=False → segmen tanpa "words" (alignment kata mahal);
+    kata untuk rentang klip dihitung belakangan (whisper_refine.refine_clips).
+
+    Tiap segmen langsung masuk journal (core/transcript_journal); kalau
+    proses mati di tengah jalan, panggilan berikutnya dengan parameter sama
+    melanjutkan dari jeda terakhir sebelum akhir journal (segmen sesudah
+    jeda itu ditranskripsi ulang).
+
+    batch_size > 0 → BatchedInferencePipeline: potongan VAD ditranskripsi
+    per batch (throughput lebih tinggi, tanpa condition_on_previous_text).
+
     Returns:
         {
           "segments": [...],       # [{start, end, text, words:[{start,end,word}]}]
           "full_text": "...",
           "language": "id",
-          "transcript_path": "/path/to/transcript.json"
+          "transcript_path": "/path/to/transcript.cols"
         }
     """
     _progress(progress_callback, 0.05)
 
     # ── Cek faster-whisper tersedia ───────────────────────────────────────
     try:
-        from faster_whisper import WhisperModel
+        import faster_whisper  # noqa: F401
     except ImportError:
         raise RuntimeError(
             "faster-whisper belum terinstall!\n"
             "Jalankan: pip install faster-whisper"
         )
 
-    # ── Ekstrak audio dulu (lebih ringan dari video untuk Whisper) ────────
-    audio_path = project_folder / "audio.wav"
-    _extract_audio(video_path, audio_path, progress_callback)
-    _progress(progress_callback, 0.15)
-
-    # ── Load model (download otomatis pertama kali ~500MB untuk small) ────
-    log.info("Loading Whisper model: %s", model_size)
-    _progress(progress_callback, 0.20)
-
-    # Cache model di folder permanen agar tidak download ulang setiap kali
-    import os
-    cache_dir = Path(os.environ.get(
-        "MAHIRA_WHISPER_CACHE",
-        Path.home() / ".cache" / "mahiraclipper" / "whisper"
-    ))
-    cache_dir.mkdir(parents=True, exist_ok=True)
-    log.info("Whisper cache dir: %s", cache_dir)
-
-    try:
-        model = WhisperModel(
-            model_size,
-            device="cpu",
-            compute_type="int8",      # int8 = 2x lebih cepat di CPU
-            download_root=str(cache_dir),  # simpan model di sini, tidak download ulang!
-        )
-    except Exception as e:
-        raise RuntimeError(f"Gagal load Whisper model '{model_size}': {e}")
-
-    log.info("Mulai transkripsi dengan Whisper %s...", model_size)
-    _progress(progress_callback, 0.25)
+    # ── Decode audio ke memori (tanpa WAV di disk), jalan di background ───
+    stream     = audio_stream.PcmStream(video_path).start()
+    options    = _decode_options(language, word_timestamps, batch_size)
+    pass_model = draft_model or model_size
+    # Hasil dua tingkat ≠ hasil satu model → parameter refine ikut jadi key store
+    store_model = [draft_model, model_size, refine_logprob, refine_word_prob] if draft_model else model_size
+    if compute_type != "int8":
+        store_model = [store_model, compute_type]
+    state      = {}
+    journal    = transcript_journal.TranscriptJournal(
+        project_folder, make_key("journal", fingerprint_file(video_path), store_model, options, DECODE_MODE),
+    ).open()
+
+    def on_decoded() -> Optional[dict]:
+        """Sekali begitu decode selesai: fitur audio + cek store transkrip global."""
+        if "key" not in state:
+            pcm = stream.pcm()
+            state["features"] = _extract_features(pcm, project_folder / audio_features.FEATURES_FILE)
+            state["key"]      = _store_key(pcm, store_model, options)
+            state["cached"]   = _from_store(state["key"], project_folder)
+        return state["cached"]
+
+    fed = [-1.0]     # akhir segmen terakhir yang sudah diteruskan ke segment_callback
+
+    def feed(seg: dict):
+        journal.append(seg)
+        fed[0] = seg["end"]
+        if segment_callback:
+            segment_callback(seg)
 
     # ── Transkripsi ───────────────────────────────────────────────────────
     try:
-        segments_gen, info = model.transcribe(
-            str(audio_path),
-            language=language if language != "auto" else None,
-            beam_size=5,
-            word_timestamps=True,      # word-level timestamps untuk subtitle
-            vad_filter=True,           # skip silence → lebih bersih
-            vad_parameters={
-                "min_silence_duration_ms": 500,
-                "speech_pad_ms": 200,
-            },
-            condition_on_previous_text=True,
-        )
-
-        # Consume generator (sambil update progress)
-        segments_list = []
-        total_duration = info.duration or 1
-        last_pct = 0.25
-
-        for seg in segments_gen:
-            segments_list.append(seg)
-            pct = 0.25 + (seg.end / total_duration) * 0.65
-            if pct - last_pct > 0.02:
-                _progress(progress_callback, min(pct, 0.90))
-                last_pct = pct
+        if journal.segments:
+            _resume(stream, journal, options, progress_callback)
+            log.info("Melanjutkan transkripsi dari journal: %d segmen (dari %.1f detik)",
+                     len(journal.segments), journal.resume_at)
+            fed[0] = journal.resume_at
+            if segment_callback:
+                for seg in journal.segments:
+                    segment_callback(seg)
+
+        result = None
+        if workers != 1:
+            # Potongan paralel butuh durasi final → tunggu decode selesai (cepat)
+            _wait(stream, None, progress_callback, 0.15)
+            result = on_decoded()
+            if result is None:
+                from core import whisper_parallel
+                _progress(progress_callback, 0.25)
+                # Resume: bahasa yang sudah tercatat di journal tidak dideteksi ulang per potongan
+                opts = options
+                if options.get("language") is None and journal.language:
+                    opts = {**options, "language": journal.language}
+                result = whisper_parallel.transcribe(
+                    stream, pass_model, opts,
+                    workers=workers, cpu_threads=cpu_threads, compute_type=compute_type,
+                    progress_callback=lambda frac: _progress(progress_callback, 0.25 + min(frac, 1.0) * 0.65),
+                    segment_callback=feed,
+                    language_callback=journal.set_language,
+                    start=journal.resume_at,
+                )
+                if result is not None:
+                    _, lang, duration = result
+                    journal.set_language(lang)      # bahasa mayoritas semua potongan
+                    result = (journal.segments, journal.language, duration)
+        if result is None:
+            # ── Load model (dari pool kalau sudah pernah di-load) ─────────
+            _progress(progress_callback, 0.20)
+            model = get_model(pass_model, compute_type, cpu_threads)
+
+            log.info("Mulai transkripsi dengan Whisper %s...", pass_model)
+            _progress(progress_callback, 0.25)
+            result = _transcribe_stream(model, stream, options, progress_callback, feed, on_decoded, journal)
+
+        if draft_model and not isinstance(result, dict):
+            result = _refine_low_confidence(
+                stream, result, model_size, options, compute_type, cpu_threads,
+                refine_logprob, refine_word_prob, progress_callback,
+            )
 
     except Exception as e:
         raise RuntimeError(f"Whisper transkripsi gagal: {e}")
-
-    _progress(progress_callback, 0.90)
-
-    # ── Format hasil ──────────────────────────────────────────────────────
-    formatted_segs = []
-    full_text_parts = []
-
-    for seg in segments_list:
-        words = []
-        if seg.words:
-            for w in seg.words:
-                words.append({
-                    "start": round(w.start, 3),
-                    "end":   round(w.end, 3),
-                    "word":  w.word.strip(),
-                    "probability": round(getattr(w, "probability", 1.0), 3),
-                })
-
-        formatted_segs.append({
-            "start":       round(seg.start, 3),
-            "end":         round(seg.end, 3),
-            "text":        seg.text.strip(),
-            "words":       words,
-            "avg_logprob": round(getattr(seg, "avg_logprob", 0), 4),
-            "no_speech_prob": round(getattr(seg, "no_speech_prob", 0), 4),
-        })
-        full_text_parts.append(seg.text.strip())
-
-    full_text      = " ".join(full_text_parts)
-    detected_lang  = getattr(info, "language", language) or language
+    finally:
+        stream.close()
+        journal.close()
+
+    features_path = state.get("features")
+    if isinstance(result, dict):
+        journal.discard()
+        # Store hit: segmen yang belum sempat diteruskan menyusul
+        if segment_callback:
+            for seg in result["segments"]:
+                if seg["start"] >= fed[0]:
+                    segment_callback(seg)
+        _progress(progress_callback, 1.0)
+        return {**result, "audio_features_path": str(features_path) if features_path else None}
+
+    formatted_segs, detected_lang, total_duration = result
+    detected_lang = detected_lang or language
+    _progress(progress_callback, 0.95)
+
+    full_text      = " ".join(seg["text"] for seg in formatted_segs)
 
     log.info("Transkripsi selesai: %d segmen, bahasa=%s, durasi=%.0fs",
              len(formatted_segs), detected_lang, total_duration)
 
-    # ── Simpan ke file ────────────────────────────────────────────────────
-    transcript_path = project_folder / "transcript.json"
-    transcript_data = {
+    # ── Simpan ke file (format kolom, lihat core/transcript_store) ───────
+    transcript_path = transcript_store.write({
         "language":  detected_lang,
         "duration":  round(total_duration, 2),
         "model":     model_size,
+        **({"draft_model": draft_model} if draft_model else {}),
         "segments":  formatted_segs,
-        "full_text": full_text,
-    }
-    with open(transcript_path, "w", encoding="utf-8") as f:
-        json.dump(transcript_data, f, ensure_ascii=True, indent=2)
-
-    # Cleanup audio temp
-    if audio_path.exists():
-        audio_path.unlink()
+    }, project_folder)
+    _to_store(state.get("key"), transcript_path)
+    journal.discard()
 
     _progress(progress_callback, 1.0)
 
@@ -169,34 +227,254 @@ def transcribe(
         "language":        detected_lang,
         "duration":        round(total_duration, 2),
         "transcript_path": str(transcript_path),
+        "audio_features_path": str(features_path) if features_path else None,
+    }
+
+
+def _transcribe_stream(model, stream, options: dict, progress_callback, feed, on_decoded, journal):
+    """
+    Satu stream WhisperModel, per blok ±BLOCK_SEC yang dipotong di jeda —
+    blok pertama mulai begitu ter-decode, tidak menunggu seluruh audio.
+    Konteks antar blok diteruskan lewat initial_prompt. Mulai dari akhir
+    journal (resume); feed() menambah segmen baru ke journal.
+
+    Return (segmen, bahasa, durasi), atau dict hasil store kalau begitu
+    decode selesai ternyata audio ini sudah pernah ditranskripsi.
+    """
+    from core.whisper_parallel import SEARCH_SEC, best_cut, shift_segment
+
+    opts     = dict(options)
+    segs     = journal.segments
+    pos      = journal.resume_at
+    language = journal.language
+    last_pct = 0.25
+    if opts.get("language") is None and language:
+        opts["language"] = language
+    if opts.get("condition_on_previous_text") and segs:
+        opts["initial_prompt"] = " ".join(sg["text"] for sg in segs[-3:])[-PROMPT_CHARS:]
+
+    while True:
+        target = pos + BLOCK_SEC
+        _wait(stream, target + SEARCH_SEC, progress_callback, last_pct)
+        if stream.done and on_decoded():
+            return on_decoded()
+        if stream.done and stream.duration <= target + SEARCH_SEC:
+            end = stream.duration
+        else:
+            end = best_cut(stream.read, target, target - SEARCH_SEC, target + SEARCH_SEC,
+                           opts.get("vad_parameters"))
+
+        info = None
+        if end - pos >= MIN_BLOCK_SEC:
+            segments_gen, info = run_model(model, stream.read(pos, end), opts)
+            for seg in segments_gen:
+                feed(shift_segment(_format_segment(seg), pos))
+                pct = 0.25 + (segs[-1]["end"] / max(stream.duration, 1.0)) * 0.65
+                if pct - last_pct > 0.02:
+                    _progress(progress_callback, min(pct, 0.90))
+                    last_pct = pct
+                if stream.done and on_decoded():
+                    return on_decoded()
+
+        language = language or getattr(info, "language", None)
+        if opts.get("language") is None and language:
+            opts["language"] = language          # blok berikutnya tidak deteksi ulang
+            journal.set_language(language)
+        if opts.get("condition_on_previous_text") and segs:
+            opts["initial_prompt"] = " ".join(sg["text"] for sg in segs[-3:])[-PROMPT_CHARS:]
+
+        pos = end
+        if stream.done and pos >= stream.duration:
+            return segs, language, stream.duration
+
+
+def _resume(stream, journal, options: dict, progress_callback):
+    """
+    Mundurkan journal ke jeda terpanjang dalam SEARCH_SEC sebelum akhir
+    segmen terakhir — segmen terakhir bisa berhenti di tengah ucapan.
+    """
+    from core.whisper_parallel import SEARCH_SEC, best_cut
+
+    end = journal.resume_at
+    _wait(stream, end, progress_callback, 0.05)
+    cut = best_cut(stream.read, end, max(0.0, end - SEARCH_SEC), end, options.get("vad_parameters"))
+    if cut < end:
+        journal.rewind(cut)
+
+
+def _refine_low_confidence(stream, result: tuple, model_size: str, options: dict, compute_type: str,
+                           cpu_threads: int, max_logprob: float, min_word_prob: float, progress_callback) -> tuple:
+    """Tingkat kedua: segmen draft yang ragu diulang dengan model_size."""
+    from core import whisper_refine
+
+    segs, language, duration = result
+    regions = whisper_refine.low_confidence_regions(segs, max_logprob, min_word_prob)
+    if not regions:
+        return result
+    log.info("Draft selesai, %d region ragu diulang dengan Whisper %s", len(regions), model_size)
+    opts = {**options, "language": options.get("language") or language}
+    segs, _ = whisper_refine.refine(
+        segs, regions, stream.read,
+        model=get_model(model_size, compute_type, cpu_threads),
+        options=opts,
+        progress_callback=lambda frac: _progress(progress_callback, 0.90 + frac * 0.05),
+    )
+    return segs, language, duration
+
+
+def _wait(stream, sec: Optional[float], progress_callback, pct: float):
+    """Tunggu decode sampai `sec` (None = selesai); progress tetap dipanggil → titik cancel."""
+    while not stream.wait(sec, timeout=1.0):
+        _progress(progress_callback, pct)
+
+
+def _decode_options(language: str, word_timestamps: bool = True, batch_size: int = 0) -> dict:
+    """Argumen model.transcribe (lewat run_model) — ikut jadi bagian key store transkrip."""
+    options = {
+        "language":   language if language != "auto" else None,
+        "beam_size":  5,
+        "word_timestamps": word_timestamps,   # word-level timestamps untuk subtitle
+        "vad_filter": True,            # skip silence → lebih bersih
+        "vad_parameters": {
+            "min_silence_duration_ms": 500,
+            "speech_pad_ms": 200,
+        },
+        "condition_on_previous_text": True,
     }
+    if batch_size > 0:
+        options["batch_size"] = batch_size     # hanya kalau aktif → key store lama tetap sama
+    return options
+
+
+def run_model(model, audio, options: dict):
+    """
+    model.transcribe(audio, **options); options["batch_size"] > 0 →
+    BatchedInferencePipeline (segmen VAD didecode per batch).
+    """
+    opts       = dict(options)
+    batch_size = opts.pop("batch_size", 0)
+    if batch_size > 0:
+        from faster_whisper import BatchedInferencePipeline
+        for key in BATCH_UNSUPPORTED:
+            opts.pop(key, None)
+        return BatchedInferencePipeline(model=model).transcribe(audio, batch_size=batch_size, **opts)
+    return model.transcribe(audio, **opts)
+
+
+def _format_segment(seg) -> dict:
+    words = []
+    if seg.words:
+        for w in seg.words:
+            words.append({
+                "start": round(w.start, 3),
+                "end":   round(w.end, 3),
+                "word":  w.word.strip(),
+                "probability": round(getattr(w, "probability", 1.0), 3),
+            })
+    return {
+        "start":       round(seg.start, 3),
+        "end":         round(seg.end, 3),
+        "text":        seg.text.strip(),
+        "words":       words,
+        "avg_logprob": round(getattr(seg, "avg_logprob", 0), 4),
+        "no_speech_prob": round(getattr(seg, "no_speech_prob", 0), 4),
+    }
+
+
+# ─── Model Pool ──────────────────────────────────────────────────────────────
+
+def get_model(model_size: str, compute_type: str = "int8", cpu_threads: int = 0):
+    """
+    Ambil WhisperModel dari pool, load kalau belum ada.
+    Model paling lama tidak dipakai dibuang kalau pool penuh.
+    cpu_threads = thread CTranslate2 (0 = default faster-whisper).
+    """
+    from faster_whisper import WhisperModel
+
+    key = (model_size, compute_type, cpu_threads)
+    with _pool_lock:
+        if key in _model_pool:
+            _model_pool.move_to_end(key)
+            log.info("Whisper model dari pool: %s", model_size)
+            return _model_pool[key]
+
+        # Cache model di folder permanen agar tidak download ulang setiap kali
+        cache_dir = Path(os.environ.get(
+            "MAHIRA_WHISPER_CACHE",
+            Path.home() / ".cache" / "mahiraclipper" / "whisper"
+        ))
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        log.info("Loading Whisper model: %s (cache: %s)", model_size, cache_dir)
+
+        while _model_pool and len(_model_pool) >= max(1, MODEL_POOL_SIZE):
+            old_key, _ = _model_pool.popitem(last=False)
+            log.info("Whisper model dilepas dari pool: %s", old_key[0])
+
+        try:
+            model = WhisperModel(
+                model_size,
+                device="cpu",
+                compute_type=compute_type,     # int8 = 2x lebih cepat di CPU
+                cpu_threads=cpu_threads,
+                download_root=str(cache_dir),  # simpan model di sini, tidak download ulang!
+            )
+        except Exception as e:
+            raise RuntimeError(f"Gagal load Whisper model '{model_size}': {e}")
+
+        _model_pool[key] = model
+        return model
 
 
 # ─── Helpers ─────────────────────────────────────────────────────────────────
 
-def _extract_audio(video_path: Path, audio_path: Path, progress_callback):
-    """Ekstrak audio dari video ke WAV 16kHz mono (format optimal untuk Whisper)."""
-    log.info("Ekstrak audio dari: %s", video_path.name)
-    cmd = [
-        "ffmpeg", "-y",
-        "-i", str(video_path),
-        "-ar", "16000",     # 16kHz — yang Whisper minta
-        "-ac", "1",         # mono
-        "-c:a", "pcm_s16le", # PCM uncompressed — paling cepat diproses
-        str(audio_path),
-    ]
+def _store_key(pcm, model_size, options: dict) -> Optional[str]:
+    """Key store transkrip: fingerprint PCM + durasi + model + opsi decode + format file + mode decode."""
+    if not len(pcm):
+        return None
+    fp, duration = audio_features.fingerprint(pcm)
+    return make_key("transcript", fp, duration, model_size, options, transcript_store.TRANSCRIPT_FILE,
+                    DECODE_MODE)
+
+
+def _from_store(key: Optional[str], project_folder: Path) -> Optional[dict]:
+    """Transkrip dari store global (hardlink/copy ke folder project); None kalau miss."""
+    store = get_transcript_cache()
+    if not key or store is None:
+        return None
+    dest = project_folder / transcript_store.TRANSCRIPT_FILE
+    if not store.get_file(key, dest):
+        return None
+    data = transcript_store.load_transcript(dest)
+    if not data.get("segments"):
+        dest.unlink(missing_ok=True)
+        return None
+    log.info("Transkrip diambil dari store (fingerprint audio %s): %d segmen",
+             key[:12], len(data["segments"]))
+    return {
+        "segments":        data["segments"],
+        "full_text":       data.get("full_text", ""),
+        "language":        data.get("language", ""),
+        "duration":        data.get("duration", 0),
+        "transcript_path": str(dest),
+    }
+
+
+def _to_store(key: Optional[str], transcript_path: Path):
+    store = get_transcript_cache()
+    if key and store is not None and transcript_path.suffix == Path(transcript_store.TRANSCRIPT_FILE).suffix:
+        store.put_file(key, transcript_path)
+
+
+def _extract_features(pcm, out_path: Path) -> Optional[Path]:
+    """Fitur audio untuk pre-ranker dari PCM yang sama; gagal → None (opsional)."""
     try:
-        result = subprocess.run(
-            cmd, capture_output=True, text=True,
-            encoding="utf-8", errors="replace"
-        )
-        if result.returncode != 0:
-            raise RuntimeError(f"FFmpeg extract audio gagal:\n{result.stderr[-300:]}")
-        log.info("Audio diekstrak: %s (%.1f MB)",
-                 audio_path.name,
-                 audio_path.stat().st_size / 1024 / 1024)
-    except FileNotFoundError:
-        raise RuntimeError("FFmpeg tidak ditemukan. Install FFmpeg terlebih dahulu.")
+        audio_features.extract(pcm, out_path)
+        return out_path
+    except ImportError:
+        log.debug("numpy tidak tersedia, fitur audio dilewati")
+    except Exception as e:
+        log.warning("Gagal hitung fitur audio: %s", e)
+    return None
 
 
 def _progress(cb, val: float):
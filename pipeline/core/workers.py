@@ -0,0 +1,99 @@
+"""
+MahiraClipper — Worker Pool
+Render beberapa klip sekaligus dengan thread pool terbatas.
+
+FFmpeg jalan sebagai subprocess, jadi thread cukup (GIL dilepas selama
+menunggu proses). Supaya total thread FFmpeg tidak melebihi jumlah core,
+tiap job dapat budget `-threads` = core / jumlah worker.
+"""
+
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Optional
+
+from config.settings import log
+
+
+def plan_workers(requested: int, jobs: int, threads: int = 0) -> tuple:
+    """
+    Hitung (jumlah worker, -threads per job FFmpeg).
+
+    requested = 0 → otomatis: 1 worker per 4 core (x264 tidak scale linear
+    di atas ~4-8 thread per encode), maksimal sebanyak jumlah job.
+    """
+    cores   = os.cpu_count() or 1
+    workers = requested if requested > 0 else max(1, cores // 4)
+    workers = max(1, min(workers, jobs or 1))
+    if threads <= 0:
+        threads = max(1, cores // workers)
+    return workers, threads
+
+
+class ProgressAggregator:
+    """Gabungkan progress banyak job paralel jadi satu angka 0..1."""
+
+    def __init__(self, total: int, step: str, callback: Optional[Callable[[str, float], None]]):
+        self.total    = max(1, total)
+        self.step     = step
+        self.callback = callback
+        self._parts   = {}
+        self._lock    = threading.Lock()
+
+    def update(self, key, pct: float):
+        if not self.callback:
+            return
+        with self._lock:
+            self._parts[key] = max(self._parts.get(key, 0.0), min(1.0, pct))
+            overall = sum(self._parts.values()) / self.total
+            self.callback(self.step, overall)
+
+    def reporter(self, key) -> Callable[[str, float], None]:
+        """Callback (step, pct) untuk satu job, format sama dengan modul lain."""
+        return lambda _step, pct: self.update(key, pct)
+
+
+def run_parallel(
+    jobs: list,
+    fn: Callable,
+    workers: int = 1,
+    on_result: Optional[Callable] = None,
+) -> list:
+    """
+    Jalankan fn(job) untuk semua job, paling banyak `workers` sekaligus.
+
+    on_result(job, result) dipanggil di thread pemanggil begitu satu job
+    selesai (urutan selesai, bukan urutan input). Hasil dikembalikan sesuai
+    urutan input. Exception pertama di-raise setelah semua job berhenti.
+    """
+    results = [None] * len(jobs)
+    first_error = None
+
+    if workers <= 1 or len(jobs) <= 1:
+        for n, job in enumerate(jobs):
+            results[n] = fn(job)
+            if on_result:
+                on_result(job, results[n])
+        return results
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mahira") as pool:
+        # Context (job_id, token cancel di mode daemon) ikut ke thread worker
+        futures = {
+            pool.submit(contextvars.copy_context().run, fn, job): n
+            for n, job in enumerate(jobs)
+        }
+        for fut in as_completed(futures):
+            n = futures[fut]
+            try:
+                results[n] = fut.result()
+            except Exception as e:
+                log.error("Job paralel gagal: %s", e)
+                first_error = first_error or e
+                continue
+            if on_result:
+                on_result(jobs[n], results[n])
+
+    if first_error:
+        raise first_error
+    return results
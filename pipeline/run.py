@@ -10,11 +10,30 @@ Alur:
   4. FFmpeg → potong klip
   5. MediaPipe → face tracking crop (opsional)
   6. FFmpeg → burn subtitle
+     (render_mode="fused": langkah 4-6 digabung jadi 1x encode per klip)
+     (schedule="clip": tiap klip langsung 4→5→6, event clip_done per klip)
+  Urutan tidak ditulis manual: tiap step = Stage di core/dag.py dengan
+  input/output artifact, stage yang independen (thumbnail, subtitle JSON,
+  crop) jalan bersamaan.
+
+Mode:
+  python run.py           → satu run, config JSON satu baris dari stdin
+  python run.py --daemon  → proses persistent, request JSON-RPC per baris
+                            (run / resume / batch / cancel / status / transcript),
+                            model tetap warm
+  python run.py --calibrate SAMPLE [--model small] [--seconds 120] [--lang id]
+                          → benchmark setting Whisper di host ini, yang tercepat
+                            disimpan ke whisper.tuned di api_config.json
+  {"sources": [...]}      → batch: banyak URL/file lewat queue persistent
+                            (core/job_queue.py), di kedua mode
 """
 
+import contextvars
 import json
 import sys
 import os
+import threading
+import uuid
 from pathlib import Path
 
 # ── WAJIB: Paksa UTF-8 di Windows ──────────────────────────────────────────
@@ -26,37 +45,88 @@ sys.stdin  = io.TextIOWrapper(sys.stdin.buffer,  encoding='utf-8')
 BASE = Path(__file__).parent
 sys.path.insert(0, str(BASE))
 
+# Key klip yang disimpan begitu satu klip final selesai (on_clip_done)
+CLIP_DONE_KEYS = ("final_path", "is_subtitled", "style_used", "cache_key")
+
+_emit_lock  = threading.Lock()
+_job_var    = contextvars.ContextVar("mahira_job", default=None)
+
+
+class JobCancelled(BaseException):
+    """
+    Job daemon di-cancel. Turunan BaseException (seperti KeyboardInterrupt)
+    supaya tidak tertelan `except Exception` di tiap step / library.
+    """
+
+
 def emit(event: str, data: dict):
-    payload = json.dumps({"event": event, **data}, ensure_ascii=True)
-    print(payload, flush=True)
+    msg = {"event": event, **data}
+    job = _job_var.get()
+    if job is not None:
+        msg["job_id"] = job.id
+        job.observe(event, data)
+    payload = json.dumps(msg, ensure_ascii=True)
+    with _emit_lock:
+        print(payload, flush=True)
 
 def emit_log(msg: str, level: str = "info"):
     emit("log", {"msg": msg, "level": level})
 
 def emit_progress(step: str, pct: float):
+    check_cancelled()   # progress dipanggil rutin di semua step → titik cancel
     emit("progress", {"step": step, "pct": round(pct * 100)})
 
 def emit_clips(clips: list):
     emit("clips", {"clips": clips})
 
+def emit_clip_done(index: int, clip: dict):
+    emit("clip_done", {"index": index, "clip": clip, "final_path": clip.get("final_path")})
+
 def emit_done(project_id: str, final_folder: str, clips: list):
     emit("done", {"project_id": project_id, "final_folder": final_folder, "clips": clips})
 
 def emit_error(msg: str):
     emit("error", {"msg": msg})
 
+def check_cancelled():
+    job = _job_var.get()
+    if job is not None and job.cancel.is_set():
+        raise JobCancelled()
+
 
 def run(cfg: dict):
     from config.settings import load_config, ClipConfig, FaceConfig
     from core.project import ProjectManager
     from core.downloader import download, use_local_file
-    from core.whisper_transcriber import transcribe as whisper_transcribe
-    from core.groq_analyzer import analyze as groq_analyze
-    from core.cutter import cut_clips
+    from core.whisper_transcriber import transcribe as whisper_transcribe, DECODE_MODE
+    from core.groq_analyzer import analyze as groq_analyze, StreamingAnalyzer
+    from core.groq_client import get_client as groq_client
+    from core.cutter import cut_clips, generate_thumbnails, build_subtitle_jsons
     from core.face_crop import crop_all_clips
     from core.subtitle import process_all_clips as subtitle_all_clips
+    from core.render import render_all_clips
+    from core.scheduler import process_clips_clip_major
+    from core.cache import configure as configure_cache, make_key, fingerprint_file
+    from core.job_queue import configure_resources, resource
+    from core.dag import Stage, StageGraph, StageHooks, StageFailed
+    from core.transcript_index import refine_boundaries
+    from core.transcript_store import load_transcript, TRANSCRIPT_FILE
+    from core.whisper_refine import refine_clips, clip_regions, REFINED_FILE
+    from core.whisper_calibrate import tuned_for
+    from dataclasses import asdict
 
     app_cfg = load_config((BASE / "../api_config.json").resolve())
+    pm      = ProjectManager(projects_dir=(BASE / "../projects").resolve())
+
+    # ── Resume: pakai project lama + config snapshot-nya ─────────────────
+    resume_id = (cfg.get("resume_project_id") or "").strip()
+    project   = None
+    if resume_id:
+        project = pm.load(resume_id)
+        if not project:
+            emit_error("Project tidak ditemukan: " + resume_id)
+            return
+        cfg = {**project.config_snapshot, **cfg}
 
     # ── API Keys ─────────────────────────────────────────────────────────
     groq_key = cfg.get("groq_api_key") or app_cfg.groq.api_key
@@ -68,10 +138,15 @@ def run(cfg: dict):
         )
         return
 
+    # Key tambahan (groq.api_keys) ikut dirotasi oleh core/groq_client
+    groq_key = ",".join([groq_key] + app_cfg.groq.api_keys)
     app_cfg.groq.api_key    = groq_key
     app_cfg.groq.model      = cfg.get("groq_model", app_cfg.groq.model)
     app_cfg.whisper.model_size = cfg.get("whisper_model", app_cfg.whisper.model_size)
     app_cfg.whisper.language   = cfg.get("whisper_lang", app_cfg.whisper.language)
+    app_cfg.whisper.workers    = int(cfg.get("whisper_workers", app_cfg.whisper.workers))
+    app_cfg.whisper.draft_model = cfg.get("whisper_draft", app_cfg.whisper.draft_model) or ""
+    app_cfg.whisper.clip_words  = bool(cfg.get("whisper_clip_words", app_cfg.whisper.clip_words))
 
     app_cfg.clip = ClipConfig(
         min_duration = int(cfg.get("min_dur", 30)),
@@ -90,35 +165,109 @@ def run(cfg: dict):
     output_h   = int(cfg.get("output_h", 1920))
     if output_w > output_h:
         do_crop = False   # 16:9 tidak perlu crop ke vertikal
+    render_mode = cfg.get("render_mode") or app_cfg.render.mode   # staged | fused
+    workers     = int(cfg.get("workers", app_cfg.render.workers))  # 0 = otomatis
+    threads     = int(cfg.get("ffmpeg_threads", app_cfg.render.threads))
+    schedule    = cfg.get("schedule") or app_cfg.render.schedule    # stage | clip
+
+    if "cache" in cfg:
+        app_cfg.cache.enabled = bool(cfg["cache"])
+    if "llm_cache" in cfg:
+        app_cfg.cache.llm = bool(cfg["llm_cache"])
+    if "prerank" in cfg:
+        app_cfg.prerank.enabled = bool(cfg["prerank"])
+    cache = configure_cache(app_cfg.cache)
+    configure_resources(app_cfg.queue)
+    groq_client(app_cfg.groq.max_concurrency)
+
+    if project is None:
+        # Nama project: dari user input > nama file > nama dari URL
+        custom_name = (cfg.get("project_name") or "").strip()
+        if custom_name:
+            name = custom_name[:60]
+        elif file_path:
+            name = Path(file_path).stem[:40]
+        else:
+            slug = url.split("?")[0].rstrip("/").split("/")[-1]
+            name = (slug or "ceramah")[:40]
 
-    pm = ProjectManager(projects_dir=(BASE / "../projects").resolve())
-
-    # Nama project: dari user input > nama file > nama dari URL
-    custom_name = (cfg.get("project_name") or "").strip()
-    if custom_name:
-        name = custom_name[:60]
-    elif file_path:
-        name = Path(file_path).stem[:40]
-    else:
-        slug = url.split("?")[0].rstrip("/").split("/")[-1]
-        name = (slug or "ceramah")[:40]
+        # Snapshot config run ini (tanpa API key) → dipakai lagi saat resume
+        snapshot = {k: v for k, v in cfg.items()
+                    if not k.endswith("api_key") and k != "resume_project_id"}
+        project = pm.create(name=name, source_url=url or None,
+                            source_file=file_path or None, config_snapshot=snapshot)
 
-    project = pm.create(name=name, source_url=url or None,
-                        source_file=file_path or None, config_snapshot={})
     pid    = project.id
     folder = project.get_folder()
+    features_path = folder / "audio_features.npy"   # ditulis transcriber, dibaca pre-ranker
+
+    emit("project_created", {"project_id": pid, "name": project.name, "resumed": bool(resume_id)})
+
+    # Stage jalan paralel → akses project.clips + pm.save lewat lock ini
+    lock = threading.RLock()
+
+    def snapshot() -> list:
+        with lock:
+            return [dict(c) for c in project.clips]
+
+    def merge_clips(updated: list, keys: tuple):
+        with lock:
+            for i, c in enumerate(updated):
+                if i < len(project.clips):
+                    project.clips[i].update({k: c[k] for k in keys if k in c})
+            pm.save(project)
+
+    # Transkrip dibaca sekali per job (lihat core/transcript_store): semua
+    # stage memakai list segmen yang sama → TranscriptIndex dibangun sekali
+    loaded = {}
+
+    def transcript_data() -> dict:
+        path  = project.transcript_path
+        stamp = (path, Path(path).stat().st_mtime_ns) if _file_ok(path) else None
+        with lock:
+            if loaded.get("stamp") != stamp or "data" not in loaded:
+                loaded.update(stamp=stamp, data=load_transcript(path))
+            return loaded["data"]
+
+    def on_clip_done(index: int, clip: dict):
+        # Hanya key hasil final: clip dari st_subtitle membawa cropped_path sebagai
+        # raw_cut_path (sumber burn) — jangan sampai tersimpan di project.json
+        with lock:
+            project.clips[index].update({k: clip[k] for k in CLIP_DONE_KEYS if k in clip})
+            pm.save(project)      # simpan per klip → resume per klip
+            clip = dict(project.clips[index])
+        emit_clip_done(index, clip)
 
-    emit("project_created", {"project_id": pid, "name": project.name})
     emit_log("Format output: " + str(output_w) + "x" + str(output_h))
-    emit_log("Transkripsi: Whisper " + app_cfg.whisper.model_size + " (lokal)")
+    # Dua tingkat (core/whisper_refine): draft_model untuk seluruh audio, model_size
+    # untuk segmen ragu ("confidence") atau rentang klip terpilih ("clips")
+    wcfg        = app_cfg.whisper
+    draft       = wcfg.draft_model if wcfg.draft_model and wcfg.draft_model != wcfg.model_size else ""
+    refine_clip = bool(draft) and wcfg.refine_scope == "clips"
+    # Stage "refine" = rentang klip di-decode ulang (model besar dan/atau word timestamps)
+    clip_stage  = refine_clip or wcfg.clip_words
+    if draft:
+        emit_log("Transkripsi: Whisper " + draft + " → " + wcfg.model_size
+                 + " (" + wcfg.refine_scope + ", lokal)")
+    else:
+        emit_log("Transkripsi: Whisper " + wcfg.model_size + " (lokal)")
+    if wcfg.clip_words:
+        emit_log("Word timestamps hanya untuk rentang klip")
+    # Hasil `run.py --calibrate` untuk model pass utama (tidak menimpa whisper_workers dari job)
+    tuning = tuned_for(wcfg, draft or wcfg.model_size)
+    for key, value in tuning.items():
+        if not (key == "workers" and "whisper_workers" in cfg):
+            setattr(wcfg, key, value)
+    if tuning:
+        emit_log("Whisper: setting kalibrasi host (" + wcfg.compute_type + ", "
+                 + str(wcfg.workers) + " proses × " + str(wcfg.cpu_threads) + " thread, batch "
+                 + str(wcfg.batch_size) + ")")
     emit_log("Analisis: Groq " + app_cfg.groq.model)
 
     # ── STEP 1: Download ──────────────────────────────────────────────────
-    emit_log("Mengambil video...")
-    emit_progress("download", 0.05)
-    pm.start_step(project, "download")
-
-    try:
+    def st_download():
+        emit_log("Mengambil video...")
+        emit_progress("download", 0.05)
         if file_path:
             info = use_local_file(Path(file_path), folder)
         else:
@@ -127,191 +276,693 @@ def run(cfg: dict):
                 download_subtitles=False,
                 progress_callback=lambda s, p: emit_progress("download", p * 0.9),
             )
-        project.input_video = info["video_path"]
-        project.name = project.name or info.get("title", project.name)
-        pm.complete_step(project, "download")
-        pm.save(project)
+        with lock:
+            project.input_video = info["video_path"]
+            project.name = project.name or info.get("title", project.name)
         emit_log("Video siap: " + Path(project.input_video).name)
         emit_progress("download", 1.0)
-    except Exception as e:
-        pm.fail_step(project, "download", str(e))
-        emit_error("Download gagal: " + str(e))
-        return
 
     # ── STEP 2: Transkripsi Whisper (lokal) ───────────────────────────────
-    emit_log("Transkripsi lokal dengan Whisper " + app_cfg.whisper.model_size + "...")
-    emit_log("(Pertama kali: download model ~500MB, tunggu sebentar)")
-    emit_progress("gemini", 0.05)
-    pm.start_step(project, "transcribe")
+    streamed = {}     # hasil StreamingAnalyzer, dipakai step analyze
+
+    def st_transcribe():
+        emit_log("Transkripsi lokal dengan Whisper " + (draft or wcfg.model_size) + "...")
+        emit_log("(Pertama kali: download model ~500MB, tunggu sebentar)")
+        emit_progress("gemini", 0.05)
 
-    try:
         def whisper_cb(step, pct):
             emit_progress("gemini", pct * 0.5)   # Whisper = 50% dari step gemini
 
-        transcript = whisper_transcribe(
-            video_path=Path(project.input_video),
-            project_folder=folder,
-            model_size=app_cfg.whisper.model_size,
-            language=app_cfg.whisper.language,
-            progress_callback=whisper_cb,
-        )
-        project.transcript_path = transcript["transcript_path"]
-        pm.complete_step(project, "transcribe")
-        pm.save(project)
+        t_key  = make_key("transcript", fingerprint_file(Path(project.input_video)),
+                          wcfg.model_size, wcfg.language, TRANSCRIPT_FILE, DECODE_MODE,
+                          *(["segment_only"] if wcfg.clip_words else []),
+                          *([wcfg.compute_type, wcfg.batch_size]
+                            if (wcfg.compute_type, wcfg.batch_size) != ("int8", 0) else []),
+                          *([draft, wcfg.refine_scope, wcfg.refine_logprob, wcfg.refine_word_prob]
+                            if draft else []))
+        t_path = folder / TRANSCRIPT_FILE
+        f_key  = make_key(t_key, "audio_features")
+        if cache and cache.get_file(t_key, t_path):
+            emit_log("Transkrip diambil dari cache")
+            cache.get_file(f_key, features_path)
+            transcript = {**load_transcript(t_path), "transcript_path": str(t_path)}
+        else:
+            # Analisis Groq per window jalan selagi Whisper masih transkripsi
+            streamer = None
+            if app_cfg.groq.stream_window > 0:
+                streamer = StreamingAnalyzer(
+                    clip_config=app_cfg.clip, groq_api_key=groq_key,
+                    window_sec=app_cfg.groq.stream_window, model=app_cfg.groq.model,
+                    prerank_config=app_cfg.prerank,
+                    audio_features_path=features_path,
+                    slot=lambda: resource("groq", check_cancelled),
+                )
+            # Slot diambil di sini, bukan di Stage: cache hit tidak perlu antre
+            try:
+                with resource("whisper", check_cancelled):
+                    transcript = whisper_transcribe(
+                        video_path=Path(project.input_video),
+                        project_folder=folder,
+                        model_size=draft if refine_clip else wcfg.model_size,
+                        language=wcfg.language,
+                        progress_callback=whisper_cb,
+                        segment_callback=streamer.feed if streamer else None,
+                        workers=wcfg.workers,
+                        cpu_threads=wcfg.cpu_threads,
+                        draft_model="" if refine_clip else draft,
+                        refine_logprob=wcfg.refine_logprob,
+                        refine_word_prob=wcfg.refine_word_prob,
+                        word_timestamps=not wcfg.clip_words,
+                        compute_type=wcfg.compute_type,
+                        batch_size=wcfg.batch_size,
+                    )
+            except BaseException:
+                if streamer:
+                    streamer.abort()
+                raise
+            if cache:
+                cache.put_file(t_key, Path(transcript["transcript_path"]))
+                if features_path.exists():
+                    cache.put_file(f_key, features_path)
+            if streamer:
+                try:
+                    streamed["analysis"] = streamer.finish(transcript.get("duration", 0))
+                except Exception as e:
+                    emit_log("Analisis streaming gagal (" + str(e) + "), analisis ulang penuh", "warn")
+        with lock:
+            project.transcript_path = transcript["transcript_path"]
 
         seg_count = len(transcript.get("segments", []))
         emit_log("Transkripsi selesai: " + str(seg_count) + " segmen, bahasa=" + transcript.get("language", "?"))
         emit_progress("gemini", 0.50)
 
-    except Exception as e:
-        pm.fail_step(project, "transcribe", str(e))
-        emit_error("Transkripsi Whisper gagal: " + str(e))
-        return
-
     # ── STEP 2b: Analisis Groq (deteksi momen) ────────────────────────────
-    emit_log("Groq AI - Analisis momen viral...")
-    pm.start_step(project, "analyze")
+    def st_analyze():
+        emit_log("Groq AI - Analisis momen viral...")
 
-    try:
         def groq_cb(step, pct):
             emit_progress("gemini", 0.50 + pct * 0.50)   # Groq = 50% sisanya
 
-        analysis = groq_analyze(
-            transcript=transcript,
-            clip_config=app_cfg.clip,
-            groq_api_key=groq_key,
-            progress_callback=groq_cb,
-        )
-        project.clips          = analysis["segments"]
-        project.video_summary  = analysis.get("video_summary", "")
-        project.dominant_theme = analysis.get("dominant_theme", "")
-        project.speaker_style  = analysis.get("speaker_style", "")
-        pm.complete_step(project, "analyze")
-        pm.save(project)
-
-        clip_count = len(project.clips)
-        emit_log(str(clip_count) + " momen ditemukan | Tema: " + project.dominant_theme)
+        a_key    = make_key("analysis", fingerprint_file(Path(project.transcript_path)),
+                            asdict(app_cfg.clip), app_cfg.groq.model, asdict(app_cfg.prerank),
+                            "refined")
+        analysis = cache.get_json(a_key) if cache else None
+        if analysis:
+            emit_log("Hasil analisis diambil dari cache")
+        else:
+            t_data = transcript_data()
+            if streamed.get("analysis"):
+                emit_log("Analisis streaming sudah selesai bersama transkripsi")
+                analysis = streamed["analysis"]
+            else:
+                with resource("groq", check_cancelled):
+                    analysis = groq_analyze(
+                        transcript=t_data,
+                        clip_config=app_cfg.clip,
+                        groq_api_key=groq_key,
+                        progress_callback=groq_cb,
+                        model=app_cfg.groq.model,
+                        prerank_config=app_cfg.prerank,
+                        audio_features_path=features_path,
+                    )
+            # Waktu dari LLM sering di tengah kata → snap ke batas kata / jeda
+            refine_boundaries(analysis["segments"], t_data.get("segments", []), app_cfg.clip)
+            if analysis.get("offline"):
+                # Ranking lokal hanya cadangan: run berikutnya coba Groq lagi
+                emit_log("Groq gagal — klip dipilih dari ranking lokal (tidak di-cache)", "warn")
+            elif analysis.get("partial"):
+                emit_log("Sebagian window analisis Groq gagal — hasil tidak lengkap (tidak di-cache)", "warn")
+            elif cache:
+                cache.put_json(a_key, analysis)
+        with lock:
+            project.clips          = analysis["segments"]
+            project.video_summary  = analysis.get("video_summary", "")
+            project.dominant_theme = analysis.get("dominant_theme", "")
+            project.speaker_style  = analysis.get("speaker_style", "")
+
+        emit_log(str(len(project.clips)) + " momen ditemukan | Tema: " + project.dominant_theme)
         emit_clips(project.clips)
         emit_progress("gemini", 1.0)
 
-    except Exception as e:
-        pm.fail_step(project, "analyze", str(e))
-        emit_error("Analisis Groq gagal: " + str(e))
-        return
-
-    # ── STEP 3: Cut ───────────────────────────────────────────────────────
-    emit_log("Memotong klip...")
-    emit_progress("cut", 0.05)
-    pm.start_step(project, "cut")
+    # ── STEP 2c: Rentang klip di-decode ulang (model besar + word timestamps)
+    refined_path = folder / REFINED_FILE
+
+    def st_refine():
+        emit_log("Transkripsi ulang rentang klip dengan Whisper " + wcfg.model_size
+                 + " (word timestamps)...")
+        draft_path = folder / TRANSCRIPT_FILE    # selalu dari draft, bukan hasil refine lama
+        clips      = snapshot()
+        r_key = make_key("refine", fingerprint_file(draft_path), clip_regions(clips),
+                         wcfg.model_size, wcfg.compute_type, wcfg.batch_size, REFINED_FILE)
+        if cache and cache.get_file(r_key, refined_path):
+            emit_log("Transkrip klip diambil dari cache")
+        else:
+            with resource("whisper", check_cancelled):
+                refine_clips(
+                    load_transcript(draft_path), clips,
+                    video_path=Path(project.input_video),
+                    out_folder=folder,
+                    model_size=wcfg.model_size,
+                    cpu_threads=wcfg.cpu_threads,
+                    progress_callback=lambda frac: check_cancelled(),
+                    compute_type=wcfg.compute_type,
+                    batch_size=wcfg.batch_size,
+                )
+            if cache:
+                cache.put_file(r_key, refined_path)
+        with lock:
+            project.transcript_path = str(refined_path)
+        emit_log("Transkrip rentang klip diperbarui")
+
+    # ── STEP 3-5 (fused / clip-major): tiap klip langsung sampai final ───
+    def st_render():
+        if render_mode == "fused":
+            emit_log("Render fused (cut + crop + subtitle, 1x encode)...")
+        else:
+            emit_log("Render clip-major (tiap klip cut → crop → subtitle)...")
+        emit_progress("subtitle", 0.05)
 
-    try:
-        td = {}
-        tp = project.transcript_path
-        if tp and Path(tp).exists():
-            with open(tp, encoding="utf-8") as f:
-                td = json.load(f)
+        common = dict(
+            clips=snapshot(),
+            video_path=Path(project.input_video),
+            final_folder=project.get_final_folder(),
+            transcript_data=transcript_data(),
+            face_config=FaceConfig(mode=crop_mode),
+            do_crop=do_crop,
+            target_w=output_w,
+            target_h=output_h,
+            style_key=style_key,
+            font_size_override=font_size if font_size > 0 else None,
+            v_position=v_position,
+            progress_callback=lambda s, p: emit_progress("subtitle", p),
+            on_clip_done=on_clip_done,
+            workers=workers,
+            threads=threads,
+        )
+        if render_mode == "fused":
+            updated = render_all_clips(loudnorm=app_cfg.render.loudnorm, **common)
+        else:
+            updated = process_clips_clip_major(
+                cuts_folder=project.get_cuts_folder(),
+                cropped_folder=(folder / "cropped").resolve(),
+                **common,
+            )
+        with lock:
+            project.clips = updated
+            for step in ("cut", "crop", "subtitle"):
+                pm.skip_step(project, step)
+        final_n = sum(1 for c in updated if c.get("final_path"))
+        emit_log(str(final_n) + " klip final")
+        emit_progress("subtitle", 1.0)
 
+    # ── STEP 3: Cut ───────────────────────────────────────────────────────
+    def st_cut():
+        emit_log("Memotong klip...")
+        emit_progress("cut", 0.05)
         updated = cut_clips(
             video_path=Path(project.input_video),
-            segments=project.clips,
+            segments=snapshot(),
             output_folder=project.get_cuts_folder(),
-            transcript_data=td,
+            transcript_data=None,
             skip_existing=True,
             progress_callback=lambda s, p: emit_progress("cut", p),
+            workers=workers,
+            threads=threads,
+            extras=False,
         )
-        project.clips = updated
+        merge_clips(updated, ("raw_cut_path", "is_cut", "cache_key"))
+        if not do_crop:
+            merge_clips([{"cropped_path": c.get("raw_cut_path")} for c in updated], ("cropped_path",))
         cut_n = sum(1 for c in updated if c.get("is_cut"))
-        pm.complete_step(project, "cut")
-        pm.save(project)
         emit_log(str(cut_n) + " klip berhasil dipotong")
-        emit_clips(project.clips)
+        emit_clips(snapshot())
         emit_progress("cut", 1.0)
-    except Exception as e:
-        pm.fail_step(project, "cut", str(e))
-        emit_error("Cut gagal: " + str(e))
-        return
+
+    # ── STEP 3b: Thumbnail & subtitle JSON (tidak menghalangi crop/burn) ─
+    def st_thumbnail():
+        updated = generate_thumbnails(snapshot(), project.get_thumbnails_folder(), workers=workers)
+        merge_clips(updated, ("thumbnail_path",))
+
+    def st_subtitle_json():
+        updated = build_subtitle_jsons(snapshot(), project.get_subs_folder(),
+                                       transcript_data())
+        merge_clips(updated, ("subtitle_json_path",))
 
     # ── STEP 4: Crop ──────────────────────────────────────────────────────
-    if do_crop:
+    def st_crop():
         emit_log("Crop ke " + str(output_w) + "x" + str(output_h) + " (" + crop_mode + ")...")
         emit_progress("crop", 0.05)
-        pm.start_step(project, "crop")
-        try:
-            face_cfg = FaceConfig(mode=crop_mode)
-            updated  = crop_all_clips(
-                clips=project.clips,
-                cuts_folder=project.get_cuts_folder(),
-                cropped_folder=(folder / "cropped").resolve(),
-                config=face_cfg,
-                progress_callback=lambda s, p: emit_progress("crop", p),
-                target_w=output_w,
-                target_h=output_h,
-            )
-            project.clips = updated
-            pm.complete_step(project, "crop")
-            pm.save(project)
-            emit_log("Crop selesai")
-            emit_progress("crop", 1.0)
-        except Exception as e:
-            emit_log("Crop gagal (" + str(e) + "), lanjut tanpa crop", "warn")
-            for i, c in enumerate(project.clips):
+        updated = crop_all_clips(
+            clips=snapshot(),
+            cuts_folder=project.get_cuts_folder(),
+            cropped_folder=(folder / "cropped").resolve(),
+            config=FaceConfig(mode=crop_mode),
+            progress_callback=lambda s, p: emit_progress("crop", p),
+            target_w=output_w,
+            target_h=output_h,
+            workers=workers,
+            threads=threads,
+        )
+        merge_clips(updated, ("cropped_path", "is_cropped", "cache_key"))
+        emit_log("Crop selesai")
+        emit_progress("crop", 1.0)
+
+    def crop_fallback(error):
+        emit_log("Crop gagal (" + str(error) + "), lanjut tanpa crop", "warn")
+        with lock:
+            for c in project.clips:
                 if not c.get("cropped_path"):
-                    project.clips[i]["cropped_path"] = c.get("raw_cut_path")
-    else:
-        for i, c in enumerate(project.clips):
-            if not c.get("cropped_path"):
-                project.clips[i]["cropped_path"] = c.get("raw_cut_path")
-        emit_log("Crop di-skip")
+                    c["cropped_path"] = c.get("raw_cut_path")
 
     # ── STEP 5: Subtitle ──────────────────────────────────────────────────
-    emit_log("Burn subtitle...")
-    emit_progress("subtitle", 0.05)
-    pm.start_step(project, "subtitle")
-
-    try:
-        td = {}
-        tp = project.transcript_path
-        if tp and Path(tp).exists():
-            with open(tp, encoding="utf-8") as f:
-                td = json.load(f)
+    def st_subtitle():
+        emit_log("Burn subtitle...")
+        emit_progress("subtitle", 0.05)
 
         clips_src = []
-        for c in project.clips:
-            c2  = dict(c)
+        for c in snapshot():
             src = c.get("cropped_path") or c.get("raw_cut_path")
             if src:
-                c2["raw_cut_path"] = src
-                c2["is_cut"]       = True
-            clips_src.append(c2)
+                c["raw_cut_path"] = src
+                c["is_cut"]       = True
+            clips_src.append(c)
 
         updated = subtitle_all_clips(
             clips=clips_src,
-            transcript_data=td,
+            transcript_data=transcript_data(),
             cuts_folder=project.get_cuts_folder(),
             final_folder=project.get_final_folder(),
             style_key=style_key,
             font_size_override=font_size if font_size > 0 else None,
             v_position=v_position,
             progress_callback=lambda s, p: emit_progress("subtitle", p),
+            workers=workers,
+            threads=threads,
+            on_clip_done=on_clip_done,
         )
-        project.clips = updated
+        merge_clips(updated, CLIP_DONE_KEYS)
         sub_n = sum(1 for c in updated if c.get("is_subtitled"))
-        pm.complete_step(project, "subtitle")
-        pm.save(project)
         emit_log(str(sub_n) + " klip final dengan subtitle")
         emit_progress("subtitle", 1.0)
-    except Exception as e:
-        pm.fail_step(project, "subtitle", str(e))
-        emit_log("Subtitle gagal: " + str(e), "warn")
+
+    # ── Graph ─────────────────────────────────────────────────────────────
+    stages = [
+        Stage("download", st_download, outputs=("video",), resource="download",
+              label="Download", valid=lambda: _file_ok(project.input_video)),
+        Stage("transcribe", st_transcribe, inputs=("video",), outputs=("transcript",),
+              label="Transkripsi Whisper",
+              valid=lambda: bool(transcript_data().get("segments"))),
+        Stage("analyze", st_analyze, inputs=("transcript",), outputs=("moments",),
+              label="Analisis Groq", valid=lambda: bool(project.clips)),
+    ]
+    # Stage subtitle memakai transkrip hasil refine kalau ada stage "refine"
+    sub_transcript = "transcript"
+    if clip_stage:
+        sub_transcript = "clip_transcript"
+        stages.append(
+            Stage("refine", st_refine, inputs=("video", "moments", "transcript"),
+                  outputs=("clip_transcript",), label="Transkrip klip", optional=True,
+                  valid=lambda: _file_ok(refined_path)
+                                and project.transcript_path == str(refined_path)),
+        )
+    if render_mode == "fused" or schedule == "clip":
+        stages.append(
+            Stage("render", st_render, inputs=("video", "moments", sub_transcript),
+                  outputs=("finals",), resource="ffmpeg", label="Render",
+                  valid=lambda: _clips_have(project, "final_path")),
+        )
+    else:
+        stages += [
+            Stage("cut", st_cut, inputs=("video", "moments"), outputs=("raw_cuts",),
+                  resource="ffmpeg", label="Cut",
+                  valid=lambda: _clips_have(project, "raw_cut_path")),
+            Stage("thumbnail", st_thumbnail, inputs=("raw_cuts",), outputs=("thumbnails",),
+                  label="Thumbnail", optional=True,
+                  valid=lambda: _clips_have(project, "thumbnail_path")),
+            Stage("subtitle_json", st_subtitle_json, inputs=("moments", sub_transcript),
+                  outputs=("subtitle_json",), label="Subtitle JSON", optional=True,
+                  valid=lambda: _clips_have(project, "subtitle_json_path")),
+        ]
+        if do_crop:
+            stages.append(
+                Stage("crop", st_crop, inputs=("raw_cuts",), outputs=("cropped",),
+                      resource="ffmpeg", label="Crop", optional=True, fallback=crop_fallback,
+                      valid=lambda: _clips_have(project, "cropped_path")),
+            )
+        else:
+            emit_log("Crop di-skip")
+        stages.append(
+            Stage("subtitle", st_subtitle,
+                  inputs=("cropped" if do_crop else "raw_cuts", sub_transcript),
+                  outputs=("finals",), resource="ffmpeg", label="Subtitle", optional=True,
+                  valid=lambda: _clips_have(project, "final_path")),
+        )
+
+    class ProjectHooks(StageHooks):
+        """Bookkeeping ProjectManager + event UI, digerakkan oleh graph."""
+
+        def is_done(self, stage):
+            return bool(resume_id) and project.step_is_done(stage.name)
+
+        def on_skip(self, stage):
+            emit_log("Resume: step '" + stage.name + "' sudah selesai, skip")
+            if stage.name == "analyze":
+                emit_clips(project.clips)
+
+        def on_start(self, stage):
+            with lock:
+                pm.start_step(project, stage.name)
+
+        def on_done(self, stage):
+            with lock:
+                pm.complete_step(project, stage.name)
+
+        def on_fail(self, stage, error, fatal):
+            # Stage opsional tidak membuat project FAILED; step-nya diulang saat resume
+            with lock:
+                if fatal:
+                    pm.fail_step(project, stage.name, str(error))
+                else:
+                    pm.warn_step(project, stage.name, str(error))
+            if fatal:
+                emit_error(stage.label + " gagal: " + str(error))
+            elif stage.fallback is None:
+                emit_log(stage.label + " gagal: " + str(error), "warn")
+
+    try:
+        StageGraph(stages).run(ProjectHooks(), check=check_cancelled)
+    except StageFailed:
+        return
 
     emit_done(pid, str(project.get_final_folder()), project.clips)
 
 
+# ─── Daemon Mode ──────────────────────────────────────────────────────────────
+
+MAX_FINISHED_JOBS = 50   # riwayat job selesai yang masih dilaporkan `status`
+
+_jobs      = {}
+_jobs_lock = threading.Lock()
+_shutdown  = threading.Event()
+
+
+class _Job:
+    """Satu run() dengan token cancel kooperatif."""
+
+    def __init__(self, cfg: dict, job_id: str = "", on_project=None):
+        self.id         = job_id or uuid.uuid4().hex[:8]
+        self.cfg        = cfg
+        self.cancel     = threading.Event()
+        self.state      = "queued"     # queued | running | done | failed | cancelled
+        self.error      = None
+        self.project_id = cfg.get("resume_project_id") or None
+        self.on_project = on_project
+        self.thread     = None
+
+    def active(self) -> bool:
+        return self.state in ("queued", "running")
+
+    def observe(self, event: str, data: dict):
+        if event == "project_created":
+            self.project_id = data.get("project_id")
+            if self.on_project:
+                self.on_project(self.project_id)
+        elif event == "error":
+            self.state = "failed"
+            self.error = data.get("msg")
+
+    def info(self) -> dict:
+        return {"job_id": self.id, "state": self.state, "project_id": self.project_id}
+
+    def execute(self):
+        """Jalankan di thread pemanggil, dengan context job sendiri."""
+        contextvars.copy_context().run(self._execute)
+
+    def _execute(self):
+        _job_var.set(self)
+        self.state = "running"
+        try:
+            run(self.cfg)
+            if self.state == "running":
+                self.state = "done"
+        except JobCancelled:
+            self.state = "cancelled"
+            emit_log("Job dibatalkan", "warn")
+        except Exception as e:
+            emit_error("Pipeline crash: " + str(e))
+        emit("job_end", {"state": self.state, "project_id": self.project_id})
+
+
+def _register(job: _Job):
+    with _jobs_lock:
+        finished = [j for j in _jobs.values() if not j.active()]
+        for old in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del _jobs[old.id]
+        _jobs[job.id] = job
+
+
+def _reply(req_id, result=None, error: str = "", code: int = -32000):
+    msg = {"jsonrpc": "2.0", "id": req_id}
+    if error:
+        msg["error"] = {"code": code, "message": error}
+    else:
+        msg["result"] = result
+    with _emit_lock:
+        print(json.dumps(msg, ensure_ascii=True), flush=True)
+
+
+def _start_job(req_id, cfg: dict):
+    job = _Job(cfg)
+    job.thread = threading.Thread(target=job.execute, name="job-" + job.id)
+    _register(job)
+    # Balasan dikirim sebelum thread jalan → event pertama selalu setelah job_id diketahui
+    _reply(req_id, job.info())
+    job.thread.start()
+
+
+# ─── Batch Queue ──────────────────────────────────────────────────────────────
+
+_queue        = None
+_queue_lock   = threading.Lock()
+_runner       = None
+_runner_lock  = threading.Lock()
+
+
+def _get_queue():
+    """Queue persistent (queue.json di root app), dibuat + di-recover sekali per proses."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            from config.settings import load_config
+            from core.job_queue import JobQueue
+            app_cfg = load_config((BASE / "../api_config.json").resolve())
+            _queue  = JobQueue((BASE / "../queue.json").resolve(),
+                               max_active=app_cfg.queue.max_active)
+            _queue.recover()
+    return _queue
+
+
+def _run_entry(entry: dict) -> str:
+    """Runner untuk JobQueue.drain: satu entry queue = satu _Job."""
+    queue = _get_queue()
+    job   = _Job(entry["cfg"], job_id=entry["id"],
+                 on_project=lambda pid: queue.update(entry["id"], project_id=pid))
+    _register(job)
+    job.execute()
+    if job.error:
+        queue.update(job.id, error=job.error)
+    if job.state == "cancelled" and _shutdown.is_set():
+        return "running"      # daemon berhenti, bukan dibatalkan user → di-resume saat start lagi
+    return job.state
+
+
+def _enqueue_sources(cfg: dict) -> list:
+    """cfg["sources"]: list URL / path file / dict override per sumber."""
+    base  = {k: v for k, v in cfg.items() if k not in ("sources", "url", "file", "project_name")}
+    queue = _get_queue()
+    ids   = []
+    for src in cfg.get("sources") or []:
+        if isinstance(src, dict):
+            job_cfg = {**base, **src}
+        else:
+            src = str(src).strip()
+            key = "url" if src.startswith(("http://", "https://")) else "file"
+            job_cfg = {**base, key: src}
+        ids.append(queue.enqueue(job_cfg)["id"])
+    return ids
+
+
+def run_batch(cfg: dict):
+    """Mode satu-proses: masukkan semua sumber ke queue lalu jalankan sampai habis."""
+    queue = _get_queue()
+    ids   = _enqueue_sources(cfg)
+    emit("batch", {"job_ids": ids, "queue": queue.summary()})
+    queue.drain(_run_entry, stop=_shutdown.is_set)
+    emit("batch_done", {"queue": queue.summary()})
+
+
+def _ensure_queue_runner():
+    """Mode daemon: satu thread yang men-drain queue selama masih ada job pending."""
+    global _runner
+    queue = _get_queue()
+    with _runner_lock:
+        if _runner is not None or not queue.has_pending():
+            return
+        _runner = threading.Thread(target=_queue_loop, args=(queue,), name="queue")
+        _runner.start()
+
+
+def _queue_loop(queue):
+    global _runner
+    while True:
+        queue.drain(_run_entry, stop=_shutdown.is_set)
+        with _runner_lock:
+            if _shutdown.is_set() or not queue.has_pending():
+                _runner = None
+                return
+
+
+def _handle_request(req: dict):
+    req_id = req.get("id")
+    method = req.get("method")
+    params = req.get("params") or {}
+
+    if method == "run":
+        _start_job(req_id, dict(params))
+
+    elif method == "resume":
+        project_id = (params.get("project_id") or "").strip()
+        if not project_id:
+            _reply(req_id, error="project_id wajib diisi", code=-32602)
+            return
+        cfg = {k: v for k, v in params.items() if k != "project_id"}
+        _start_job(req_id, {**cfg, "resume_project_id": project_id})
+
+    elif method == "batch":
+        if not params.get("sources"):
+            _reply(req_id, error="sources wajib diisi", code=-32602)
+            return
+        _reply(req_id, {"job_ids": _enqueue_sources(params)})
+        _ensure_queue_runner()
+
+    elif method == "cancel":
+        job_id = params.get("job_id")
+        with _jobs_lock:
+            targets = [j for j in _jobs.values()
+                       if j.active() and (not job_id or j.id == job_id)]
+        for j in targets:
+            j.cancel.set()
+        pending = _get_queue().cancel_pending(job_id)
+        _reply(req_id, {"cancelled": [j.id for j in targets] + pending})
+
+    elif method == "transcript":
+        # JSON view transkrip (file di disk berformat kolom, core/transcript_store)
+        from core.project import ProjectManager
+        from core.transcript_store import load_transcript, Transcript
+        project = ProjectManager(projects_dir=(BASE / "../projects").resolve()).load(
+            (params.get("project_id") or "").strip())
+        if not project or not _file_ok(project.transcript_path):
+            _reply(req_id, error="Transkrip project tidak ditemukan", code=-32602)
+            return
+        data = load_transcript(project.transcript_path)
+        _reply(req_id, data.to_dict() if isinstance(data, Transcript) else data)
+
+    elif method == "status":
+        with _jobs_lock:
+            jobs = [j.info() for j in _jobs.values()]
+        _reply(req_id, {"jobs": jobs, "queue": _get_queue().entries()})
+
+    else:
+        _reply(req_id, error="Method tidak dikenal: " + str(method), code=-32601)
+
+
+def serve():
+    """
+    Loop daemon: satu request JSON-RPC per baris stdin, balasan + event di stdout.
+    Modul & model Whisper tetap di memori antar job. Stdin EOF → cancel
+    semua job, tunggu selesai, lalu keluar (job batch yang terpotong
+    dilanjutkan saat daemon start lagi).
+    """
+    emit("ready", {"pid": os.getpid()})
+    _ensure_queue_runner()     # lanjutkan batch yang tertinggal dari proses sebelumnya
+    while True:
+        line = sys.stdin.readline()
+        if not line:
+            break
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            req = json.loads(line)
+        except json.JSONDecodeError as e:
+            _reply(None, error="Request JSON invalid: " + str(e), code=-32700)
+            continue
+        try:
+            _handle_request(req)
+        except Exception as e:
+            _reply(req.get("id"), error=str(e))
+
+    _shutdown.set()
+    with _jobs_lock:
+        running = [j for j in _jobs.values() if j.active()]
+    for j in running:
+        j.cancel.set()
+    for t in [j.thread for j in running] + [_runner]:
+        if t is not None:
+            t.join()
+    if "core.whisper_parallel" in sys.modules:
+        sys.modules["core.whisper_parallel"].shutdown()   # proses worker Whisper paralel
+
+
+def _file_ok(path) -> bool:
+    return bool(path) and Path(path).exists() and Path(path).stat().st_size > 0
+
+
+def _clips_have(project, key: str) -> bool:
+    """Semua klip approved punya file `key` yang masih ada di disk."""
+    approved = project.approved_clips()
+    return bool(approved) and all(_file_ok(c.get(key)) for c in approved)
+
+
+def calibrate(argv: list):
+    """Kalibrasi Whisper (core/whisper_calibrate); event per percobaan + hasil akhir."""
+    import argparse
+    from config.settings import load_config
+    from core.whisper_calibrate import calibrate as run_calibration, SAMPLE_SEC
+
+    app_cfg = load_config((BASE / "../api_config.json").resolve())
+    parser  = argparse.ArgumentParser(prog="run.py --calibrate")
+    parser.add_argument("sample", help="video/audio ceramah untuk sampel")
+    parser.add_argument("--model", default=app_cfg.whisper.model_size)
+    parser.add_argument("--seconds", type=float, default=SAMPLE_SEC)
+    parser.add_argument("--lang", default=app_cfg.whisper.language)
+    args = parser.parse_args(argv)
+
+    emit_log("Kalibrasi Whisper " + args.model + " (" + str(os.cpu_count()) + " core)...")
+    result = run_calibration(
+        Path(args.sample), args.model, language=args.lang, sample_sec=args.seconds,
+        trial_callback=lambda t: emit("calibrate_trial", t),
+    )
+    emit("calibrated", {"model": args.model, **result})
+
+
 if __name__ == "__main__":
+    if "--daemon" in sys.argv[1:]:
+        serve()
+        sys.exit(0)
+    if "--calibrate" in sys.argv[1:]:
+        try:
+            calibrate([a for a in sys.argv[1:] if a != "--calibrate"])
+        except Exception as e:
+            emit_error("Kalibrasi gagal: " + str(e))
+        sys.exit(0)
     try:
         raw = sys.stdin.readline()
         cfg = json.loads(raw)
-        run(cfg)
+        if cfg.get("sources"):
+            run_batch(cfg)
+        else:
+            run(cfg)
     except json.JSONDecodeError as e:
         emit_error("Config JSON invalid: " + str(e))
     except Exception as e:
@@ -19,6 +19,7 @@ contextBridge.exposeInMainWorld('app', {
   deleteProject: (id) => ipcRenderer.invoke('delete-project', id),
 
   runPipeline: (cfg) => ipcRenderer.send('run-pipeline', cfg),
+  resumePipeline: (id) => ipcRenderer.send('run-pipeline', { resume_project_id: id }),
   // Dapat path asli dari drag-drop file (Electron >= 32)
   getFilePath: (file) => {
     try { return webUtils.getPathForFile(file) }
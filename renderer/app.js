@@ -324,6 +324,13 @@ function handlePipelineEvent(data) {
       document.getElementById('clips-title').textContent =
         `🧠 ${S.clips.length} Momen Terdeteksi Gemini AI`
       break
+    case 'clip_done':
+      if (data.clip && S.clips[data.index]) {
+        S.clips[data.index] = data.clip
+        renderClipsList(S.clips)
+      }
+      appendLog('✓ Klip siap: ' + ((data.clip && data.clip.title) || data.index), 'ok')
+      break
     case 'done':
       S.finalFolder = data.final_folder
       S.clips       = data.clips || []